@@ -0,0 +1,78 @@
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from material_index import MaterialIndex
+
+logger = logging.getLogger("Assignment")
+
+Requirement = Tuple[Optional[str], Optional[str]]  # (filament type, color)
+
+
+def solve_assignment(requirements: List[Requirement], index: MaterialIndex) -> Dict[int, Tuple[str, int]]:
+    """
+    Global job -> printer assignment for one dispatch tick.
+
+    `requirements` lists the pending jobs' material requirements in priority order
+    (oldest job first). Jobs are added one by one with an augmenting-path search
+    (Kuhn's algorithm), so earlier assignments can be re-routed to other compatible
+    printers to make room for a later job. The result is a maximum-cardinality
+    matching, and because jobs are inserted by age, the matched job set is the
+    oldest-first best among all maximum matchings.
+
+    Returns {position in requirements: (serial, slot_idx)}.
+    """
+    capacity = len(index)
+    candidates_by_req: Dict[Requirement, Dict[str, int]] = {}
+
+    def candidates(pos: int) -> Dict[str, int]:
+        req = requirements[pos]
+        found = candidates_by_req.get(req)
+        if found is None:
+            found = candidates_by_req[req] = index.candidates(*req)
+        return found
+
+    job_to_printer: Dict[int, str] = {}
+    printer_to_job: Dict[str, int] = {}
+    # A job that finds no augmenting path never will later in the same pass,
+    # and neither will any job with the identical requirement.
+    failed = set()
+
+    for pos, req in enumerate(requirements):
+        if len(job_to_printer) >= capacity:
+            break
+        if req in failed or not candidates(pos):
+            failed.add(req)
+            continue
+
+        # BFS over alternating paths: job -> compatible printer -> job holding it -> ...
+        reached_from: Dict[str, int] = {}
+        queue = deque([pos])
+        free_printer = None
+        while queue and free_printer is None:
+            job = queue.popleft()
+            for serial in candidates(job):
+                if serial in reached_from:
+                    continue
+                reached_from[serial] = job
+                if serial not in printer_to_job:
+                    free_printer = serial
+                    break
+                queue.append(printer_to_job[serial])
+
+        if free_printer is None:
+            failed.add(req)
+            continue
+
+        # Augment: shift every job on the path to its new printer
+        serial = free_printer
+        while True:
+            job = reached_from[serial]
+            previous = job_to_printer.get(job)
+            job_to_printer[job] = serial
+            printer_to_job[serial] = job
+            if job == pos:
+                break
+            serial = previous
+
+    return {pos: (serial, candidates(pos)[serial]) for pos, serial in job_to_printer.items()}
@@ -1,19 +1,50 @@
 import asyncio
 import json
+import os
+import re
 import ssl
 import socket
 import logging
-from ftplib import FTP_TLS
-from typing import Optional, Callable, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ftplib import FTP, FTP_TLS, error_perm
+from typing import Optional, Callable, Dict, Any, Iterable, List
 import aiomqtt
 
+from bambu_report import ReportParser
+from three_mf import file_md5
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("BambuClient")
+
+# FTPS upload settings
+FTPS_BACKEND = os.getenv("BAMBU_FTPS_BACKEND", "pool").lower()  # pool | curl
+FTPS_MAX_CONNECTIONS = int(os.getenv("BAMBU_FTPS_MAX_CONNECTIONS", "1"))  # Concurrent uploads per printer
+FTPS_KEEPALIVE_INTERVAL = float(os.getenv("BAMBU_FTPS_KEEPALIVE", "30"))  # Idle seconds before a NOOP check
+
+def make_ftps_context() -> ssl.SSLContext:
+    """Permissive TLS context for the printers' self-signed certs."""
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    # Bambu's FTPS server speaks TLS 1.2; pinning it also keeps session resumption reliable
+    ctx.maximum_version = ssl.TLSVersion.TLSv1_2
+    return ctx
+
 class ImplicitFTP_TLS(FTP_TLS):
     """
     FTP_TLS subclass that supports Implicit SSL (Port 990).
     Wraps the socket in SSL immediately upon connection.
+    Data connections reuse the control connection's TLS session (required by the
+    printer's server), and `tls_session` lets a new control connection resume a
+    previous session instead of doing a full handshake.
     """
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, tls_session: Optional[ssl.SSLSession] = None, **kwargs):
+        kwargs.setdefault("context", make_ftps_context())
         super().__init__(*args, **kwargs)
+        self.tls_session = tls_session
         
     def connect(self, host='', port=0, timeout=-999):
         if host != '':
@@ -28,31 +59,286 @@ class ImplicitFTP_TLS(FTP_TLS):
         self.af = self.sock.family
         
         # Wrap it in SSL immediately (Implicit Mode)
-        # We use a permissive context for self-signed certs
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        
-        self.sock = ctx.wrap_socket(self.sock, server_hostname=self.host)
+        self.sock = self.context.wrap_socket(self.sock, server_hostname=self.host, session=self.tls_session)
         
         # Resume standard connect process (get welcome msg)
         self.file = self.sock.makefile('r', encoding=self.encoding)
         self.welcome = self.getresp()
         return self.welcome 
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("BambuClient")
+    def ntransfercmd(self, cmd, rest=None):
+        # Same as FTP.ntransfercmd + TLS wrap, but resuming the control channel's session
+        conn, size = FTP.ntransfercmd(self, cmd, rest)
+        if self._prot_p:
+            conn = self.context.wrap_socket(conn, server_hostname=self.host, session=self.sock.session)
+        return conn, size
+
+class UploadCancelled(Exception):
+    """Raised on the transfer thread when the awaiting task was cancelled."""
+
+class FTPSPool:
+    """
+    Reusable implicit-FTPS sessions for one printer.
+
+    - Up to `max_connections` logged-in sessions are kept open and reused between uploads.
+    - A session idle for longer than `keepalive_interval` is probed with NOOP before reuse.
+    - New connections resume the last TLS session (abbreviated handshake).
+    - Uploads run on the pool's own threads; concurrency is bounded per printer.
+    """
+    def __init__(self, host: str, password: str, port: int = 990, user: str = "bblp",
+                 max_connections: int = 1, keepalive_interval: float = 30.0,
+                 chunk_size: int = 256 * 1024, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.max_connections = max_connections
+        self.keepalive_interval = keepalive_interval
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+        self._context = make_ftps_context()
+        self._tls_session: Optional[ssl.SSLSession] = None
+        self._idle: list = []  # [(ftp, last_used)]
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix=f"ftps-{host}")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _connect(self) -> ImplicitFTP_TLS:
+        ftp = ImplicitFTP_TLS(context=self._context, tls_session=self._tls_session)
+        ftp.connect(self.host, self.port, timeout=self.timeout)
+        ftp.login(self.user, self.password)
+        ftp.prot_p()
+        ftp.voidcmd("TYPE I")
+        self._tls_session = ftp.sock.session
+        logger.debug(f"FTPS connected to {self.host} (TLS session reused: {ftp.sock.session_reused})")
+        return ftp
+
+    def _checkout(self):
+        """Returns (ftp, reused). Stale idle sessions are dropped."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                ftp, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.keepalive_interval:
+                return ftp, True
+            try:
+                ftp.voidcmd("NOOP")
+                return ftp, True
+            except Exception:
+                self._discard(ftp)
+        return self._connect(), False
+
+    def _checkin(self, ftp):
+        with self._lock:
+            self._idle.append((ftp, time.monotonic()))
+
+    def _discard(self, ftp):
+        try:
+            ftp.close()
+        except Exception:
+            pass
+
+    def _with_session(self, operation: Callable[[FTP_TLS], Any], retry_stale: Callable[[], bool] = lambda: True):
+        """Runs operation(ftp) on a pooled session. Blocking; called on the pool's threads."""
+        for attempt in range(2):
+            ftp, reused = self._checkout()
+            try:
+                result = operation(ftp)
+            except Exception as e:
+                self._discard(ftp)
+                # A kept-alive session may have been closed by the printer: retry once on a fresh one
+                if reused and attempt == 0 and retry_stale():
+                    logger.info(f"FTPS session to {self.host} went stale ({e}), reconnecting...")
+                    continue
+                raise
+            self._checkin(ftp)
+            return result
+
+    def _upload_blocking(self, local_path: str, remote_path: str, progress: Optional[Callable[[int, int], None]],
+                         cancelled: Optional[threading.Event] = None):
+        total = os.path.getsize(local_path)
+        state = {"sent": 0}
+
+        def _check_cancelled():
+            if cancelled is not None and cancelled.is_set():
+                raise UploadCancelled(remote_path)
+
+        def _on_chunk(block):
+            state["sent"] += len(block)
+            _check_cancelled()
+            if progress:
+                progress(state["sent"], total)
+
+        def _store(ftp):
+            state["sent"] = 0
+            _check_cancelled()
+            with open(local_path, "rb") as f:
+                ftp.storbinary(f"STOR {remote_path}", f, blocksize=self.chunk_size, callback=_on_chunk)
+
+        # Only retry if nothing was sent yet (a half-written file is a real failure)
+        self._with_session(_store, retry_stale=lambda: state["sent"] == 0 and not (cancelled and cancelled.is_set()))
+
+    @staticmethod
+    def _size(ftp, remote_path: str) -> Optional[int]:
+        try:
+            return ftp.size(remote_path)
+        except error_perm:
+            return None  # 550: no such file
+
+    @staticmethod
+    def _delete(ftp, remote_path: str) -> bool:
+        try:
+            ftp.delete(remote_path)
+            return True
+        except error_perm:
+            return False  # 550: already gone
+
+    @staticmethod
+    def _list(ftp) -> list:
+        """LIST -> [(name, size)] from unix-style listing lines."""
+        lines = []
+        ftp.retrlines("LIST", lines.append)
+        entries = []
+        for line in lines:
+            parts = line.split(None, 8)
+            if len(parts) == 9 and not parts[0].startswith("d"):
+                try:
+                    entries.append((parts[8], int(parts[4])))
+                except ValueError:
+                    continue
+        return entries
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        async with self._semaphore:
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def upload(self, local_path: str, remote_path: str, progress: Optional[Callable[[int, int], None]] = None):
+        """Streams `local_path` to `remote_path` in chunks; `progress(sent, total)` runs on the event loop."""
+        thread_progress = None
+        if progress:
+            loop = asyncio.get_running_loop()
+            thread_progress = lambda sent, total: loop.call_soon_threadsafe(progress, sent, total)
+        cancelled = threading.Event()
+        try:
+            await self._run(self._upload_blocking, local_path, remote_path, thread_progress, cancelled)
+        except asyncio.CancelledError:
+            # The transfer thread stops at the next chunk; its session is discarded
+            cancelled.set()
+            raise
+
+    async def size(self, remote_path: str) -> Optional[int]:
+        """SIZE of a remote file, None if it does not exist."""
+        return await self._run(self._with_session, lambda ftp: self._size(ftp, remote_path))
+
+    async def delete(self, remote_path: str) -> bool:
+        """DELE; False if the file did not exist."""
+        return await self._run(self._with_session, lambda ftp: self._delete(ftp, remote_path))
+
+    async def list_files(self) -> list:
+        """[(name, size)] of the files in the SD card root."""
+        return await self._run(self._with_session, self._list)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for ftp, _ in idle:
+            try:
+                ftp.quit()
+            except Exception:
+                self._discard(ftp)
+        self._executor.shutdown(wait=False)
+
+# Remote files are named after their content hash, so "same name" means "same bytes"
+CONTENT_NAME_RE = re.compile(r"^fos-([0-9a-f]{32})\.3mf$")
+MANIFEST_LIST_TTL = float(os.getenv("BAMBU_SD_MANIFEST_TTL", "300"))  # Seconds before the SD listing is refreshed
+# Budget for our fos-* files per printer (least recently used go first); 0 = unlimited
+SD_CACHE_MAX_FILES = int(os.getenv("BAMBU_SD_CACHE_MAX_FILES", "20"))
+SD_CACHE_MAX_BYTES = int(os.getenv("BAMBU_SD_CACHE_MAX_MB", "0")) * 1024 * 1024
+
+def content_addressed_path(md5: str) -> str:
+    return f"/fos-{md5.lower()}.3mf"
+
+class SDCardManifest:
+    """
+    What we believe is on a printer's SD card.
+    Structure: { "/name.3mf": {"size": int, "md5": str or None} }
+    Fed by FTPS LIST responses and by our own uploads.
+    `used_at` orders our content-addressed files by last upload/reuse for LRU eviction;
+    files only seen in a listing count as least recently used.
+    """
+    def __init__(self):
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.used_at: Dict[str, float] = {}
+        self.listed_at: Optional[float] = None
+
+    def needs_listing(self) -> bool:
+        return self.listed_at is None or (time.monotonic() - self.listed_at) > MANIFEST_LIST_TTL
+
+    def load_listing(self, entries: list):
+        """Replaces the manifest with a fresh LIST result [(name, size)]."""
+        self.files = {}
+        for name, size in entries:
+            match = CONTENT_NAME_RE.match(name)
+            self.files[f"/{name}"] = {"size": size, "md5": match.group(1) if match else None}
+        self.used_at = {path: used for path, used in self.used_at.items() if path in self.files}
+        self.listed_at = time.monotonic()
+
+    def record(self, path: str, size: int, md5: Optional[str] = None):
+        self.files[path] = {"size": size, "md5": md5}
+        self.touch(path)
+
+    def touch(self, path: str):
+        self.used_at[path] = time.monotonic()
+
+    def forget(self, path: str):
+        self.files.pop(path, None)
+        self.used_at.pop(path, None)
+
+    def eviction_candidates(self, incoming_size: int, keep: Iterable[str] = ()) -> List[str]:
+        """
+        Our content-addressed files to delete, least recently used first, so that one more
+        file of `incoming_size` bytes fits SD_CACHE_MAX_FILES / SD_CACHE_MAX_BYTES. Files in
+        `keep` and files we did not name ourselves are never returned.
+        """
+        max_files, max_bytes = SD_CACHE_MAX_FILES, SD_CACHE_MAX_BYTES
+        ours = [path for path, info in self.files.items() if info["md5"] is not None]
+        count = len(ours) + 1
+        total = sum(self.files[path]["size"] for path in ours) + incoming_size
+
+        candidates = []
+        keep = set(keep)
+        for path in sorted(ours, key=lambda p: self.used_at.get(p, 0.0)):
+            if (not max_files or count <= max_files) and (not max_bytes or total <= max_bytes):
+                break
+            if path in keep:
+                continue
+            candidates.append(path)
+            count -= 1
+            total -= self.files[path]["size"]
+        return candidates
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        return self.files.get(path)
 
 class BambuPrinterClient:
-    def __init__(self, ip: str, access_code: str, serial: str, update_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+    def __init__(self, ip: str, access_code: str, serial: str, update_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 mqtt_port: int = 8883):
         self.ip = ip
+        self.mqtt_port = mqtt_port
         self.access_code = access_code
         self.serial = serial
         self.update_callback = update_callback
         self.connected = False
         self._mqtt_client: Optional[aiomqtt.Client] = None
         self._stop_event = asyncio.Event()
+        self._ftps_pools: Dict[int, FTPSPool] = {}
+        self.sd_manifest = SDCardManifest()
+        self._report_parser = ReportParser(serial)
 
     async def connect_mqtt(self):
         """Connects to the printer's MQTT broker with auto-reconnect."""
@@ -72,12 +358,12 @@ class BambuPrinterClient:
         while not self._stop_event.is_set():
             try:
                 # Debug Logging for Connection Details
-                logger.info(f"Connecting to MQTT broker at {self.ip}:8883...")
+                logger.info(f"Connecting to MQTT broker at {self.ip}:{self.mqtt_port}...")
                 logger.debug(f"SSL Params: Version={tls_params.tls_version}, CertReqs={tls_params.cert_reqs}")
                 
                 async with aiomqtt.Client(
                     hostname=self.ip,
-                    port=8883,
+                    port=self.mqtt_port,
                     username="bblp",
                     password=self.access_code,
                     tls_params=tls_params,
@@ -89,6 +375,7 @@ class BambuPrinterClient:
                     self.connected = True
                     retry_delay = 1 # Reset backoff on success
                     logger.info("MQTT Connected!")
+                    self._report_parser.reset()
 
                     # Subscribe to report topic
                     full_topic = f"device/{self.serial}/report"
@@ -125,80 +412,22 @@ class BambuPrinterClient:
     async def _on_message(self, message: aiomqtt.Message):
         """Handles incoming MQTT messages."""
         try:
-            payload = message.payload
-            if isinstance(payload, bytes):
-               payload = payload.decode()
-            
-            data = json.loads(payload)
-            # Extract relevant fields
-            # The structure of Bambu reports is typically wrapped in 'print' or 'print_type'
-            # We look for specific keys in the nested naming structure if needed, or flat.
-            # Usually it comes as {"print": {"command": "push_status", ...}} or just flat fields depending on firmware.
-            # We'll try to find keys recursively or checking known locations.
-            
-            report = data.get("print", {})
-            if not report and "print" not in data: 
-                 # Sometimes it's directly in root if not a push_status wrapper? 
-                 # But typically it is inside "print". Let's assume standard structure.
-                 report = data
-            
-            logger.info(f"Report Keys: {list(report.keys())}")
-            if "gcode_state" in report:
-                logger.info(f"Gcode State: {report['gcode_state']}")
-            
-            extracted = {}
-            if "gcode_state" in report:
-                extracted["print_status"] = report.get("gcode_state")
-            if "nozzle_temper" in report:
-                extracted["nozzle_temper"] = report.get("nozzle_temper")
-            if "bed_temper" in report:
-                extracted["bed_temper"] = report.get("bed_temper")
-            
-            # --- AMS Parsing ---
-            # Structure: print.ams.ams[0].tray[0...3]
-            # Each tray has: { "id": "0", "cols": ["FF0000"], "tray_type": "PLA", ... }
-            if "ams" in report and "ams" in report["ams"]:
-                ams_list = report["ams"]["ams"]
-                if ams_list and len(ams_list) > 0:
-                    trays = ams_list[0].get("tray", [])
-                    parsed_ams = []
-                    for t in trays:
-                        # Bambu colors are often 8 hex chars (RRGGBB + Alpha/padded?), usually we want last 6
-                        raw_color = t.get("tray_color", "000000") # Start simple
-                        # If generic color provided
-                        
-                        filament_type = t.get("tray_type", "Unknown")
-                        # remaining might not be in basic report, but we'll look for it
-                        
-                        parsed_ams.append({
-                            "slot": t.get("id"),
-                            "color": f"#{raw_color[:6]}", # Assuming standard hex format
-                            "type": filament_type,
-                            "remaining": t.get("remain", -1), # -1 = Unknown/Generic (Assume full/available) # Percentage?
-                        })
-                    
-                    extracted["ams_data"] = parsed_ams
-
-            # Additional fields commonly needed
-            if "mc_percent" in report:
-                extracted["progress"] = report.get("mc_percent")
-            if "mc_remaining_time" in report:
-                extracted["remaining_time"] = report.get("mc_remaining_time")
-
+            extracted = self._report_parser.parse(message.payload)
             if extracted and self.update_callback:
                 self.update_callback(extracted)
 
-        except json.JSONDecodeError:
+        except ValueError:
             logger.warning("Received invalid JSON payload")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
 
-    async def start_print(self, path: str, ams_mapping: list = None, gcode_internal_path: str = "Metadata/plate_1.gcode"):
+    async def start_print(self, path: str, ams_mapping: list = None, gcode_internal_path: str = "Metadata/plate_1.gcode", plate_id: int = 1):
         """
         Sends a request to start printing a file from the SD card.
         :param path: Full path on SD (e.g., /filename.3mf)
         :param ams_mapping: List of AMS slot indices corresponding to objects in 3mf (e.g. [2])
         :param gcode_internal_path: Path to gcode inside 3mf (e.g. Metadata/plate_1.gcode)
+        :param plate_id: Plate number matching gcode_internal_path
         """
         if not self._mqtt_client or not self.connected:
             logger.error("Cannot send gcode: MQTT not connected")
@@ -218,7 +447,7 @@ class BambuPrinterClient:
                 "param": gcode_internal_path, 
                 
                 "url": f"file:///sdcard/{cleaned_path}",
-                "plate_id": 1,
+                "plate_id": plate_id,
                 "use_ams": True if ams_mapping else False,
                 "ams_mapping": ams_mapping if ams_mapping else [0],
                 "bed_type": "auto",
@@ -240,13 +469,88 @@ class BambuPrinterClient:
         logger.info(f"Payload: {json.dumps(payload, indent=2)}")
         await self._mqtt_client.publish(topic, json.dumps(payload))
 
-    async def upload_file(self, local_path: str, target_path: str, port: int = 990):
-        """Uploads a file via FTPS (Implicit SSL). Runs in executor."""
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(None, self._upload_sync, local_path, target_path, port)
+    def ftps_pool(self, port: int = 990) -> FTPSPool:
+        pool = self._ftps_pools.get(port)
+        if pool is None:
+            pool = self._ftps_pools[port] = FTPSPool(
+                self.ip, self.access_code, port=port,
+                max_connections=FTPS_MAX_CONNECTIONS,
+                keepalive_interval=FTPS_KEEPALIVE_INTERVAL
+            )
+        return pool
+
+    async def upload_file(self, local_path: str, target_path: str, port: int = 990,
+                          progress_callback: Optional[Callable[[int, int], None]] = None):
+        """
+        Uploads a file via FTPS (Implicit SSL) over this printer's pooled session.
+        progress_callback(sent_bytes, total_bytes) is called per chunk.
+        Set BAMBU_FTPS_BACKEND=curl to use the legacy curl subprocess instead.
+        """
+        if FTPS_BACKEND == "curl":
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._upload_sync, local_path, target_path, port)
+            return
+
+        logger.info(f"Uploading {local_path} to ftps://{self.ip}:{port}{target_path}")
+        await self.ftps_pool(port).upload(local_path, target_path, progress=progress_callback)
+        logger.info(f"Uploaded {local_path} to {target_path} successfully.")
+
+    async def ensure_uploaded(self, local_path: str, md5: Optional[str] = None, port: int = 990,
+                              progress_callback: Optional[Callable[[int, int], None]] = None,
+                              keep: Iterable[str] = ()) -> str:
+        """
+        Makes sure the file is on the SD card under its content-addressed name and
+        returns that remote path. Skips the upload when the printer already has it
+        (known from LIST/upload history and confirmed with SIZE).
+        Before uploading, least recently used fos-* files beyond the SD budget are
+        deleted; `keep` lists remote paths that must survive (e.g. the file being printed).
+        """
+        if md5 is None:
+            md5 = await asyncio.to_thread(file_md5, local_path)
+        remote_path = content_addressed_path(md5)
+        size = os.path.getsize(local_path)
+
+        if FTPS_BACKEND != "curl":
+            pool = self.ftps_pool(port)
+            if self.sd_manifest.needs_listing():
+                try:
+                    self.sd_manifest.load_listing(await pool.list_files())
+                except Exception as e:
+                    logger.warning(f"Could not list SD card of {self.serial}: {e}")
+
+            known = self.sd_manifest.get(remote_path)
+            if known and known["size"] == size:
+                # Trust but verify: the file may have been deleted on the printer
+                if await pool.size(remote_path) == size:
+                    logger.info(f"{remote_path} already on {self.serial} ({size} bytes), skipping upload.")
+                    self.sd_manifest.touch(remote_path)
+                    return remote_path
+            # Stale entry (if any) is replaced by the upload below
+            self.sd_manifest.forget(remote_path)
+
+            for old_path in self.sd_manifest.eviction_candidates(size, keep=keep):
+                try:
+                    await self.delete_file(old_path, port=port)
+                except Exception as e:
+                    logger.warning(f"Could not evict {old_path} from {self.serial}: {e}")
+
+        await self.upload_file(local_path, remote_path, port=port, progress_callback=progress_callback)
+        self.sd_manifest.record(remote_path, size, md5)
+        return remote_path
+
+    async def delete_file(self, remote_path: str, port: int = 990) -> bool:
+        """Removes a file from the SD card (pooled backend only). Returns True if it was deleted."""
+        self.sd_manifest.forget(remote_path)
+        if FTPS_BACKEND == "curl":
+            logger.debug(f"Not deleting {remote_path}: unsupported with the curl backend.")
+            return False
+        deleted = await self.ftps_pool(port).delete(remote_path)
+        if deleted:
+            logger.info(f"Deleted {remote_path} from {self.serial}.")
+        return deleted
 
     def _upload_sync(self, local_path: str, target_path: str, port: int):
-        """Blocking FTPS upload using system curl for stability."""
+        """Blocking FTPS upload using system curl (legacy backend)."""
         import subprocess
         
         # Use implicit FTPS (port 990)
@@ -290,3 +594,5 @@ class BambuPrinterClient:
 
     def stop(self):
         self._stop_event.set()
+        for pool in self._ftps_pools.values():
+            pool.close()
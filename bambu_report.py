@@ -0,0 +1,109 @@
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+# orjson is optional; it parses bytes directly and is several times faster on push_status
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+logger = logging.getLogger("BambuClient")
+
+# Report key -> key in the dict handed to the update callback
+REPORT_FIELDS = {
+    "gcode_state": "print_status",
+    "nozzle_temper": "nozzle_temper",
+    "bed_temper": "bed_temper",
+    "mc_percent": "progress",
+    "mc_remaining_time": "remaining_time",
+}
+
+STATS_LOG_INTERVAL = 60.0  # Seconds between per-printer message rate logs
+
+
+def parse_ams(ams_list: list) -> List[Dict[str, Any]]:
+    """
+    print.ams.ams[0].tray[0...3] -> [{"slot", "color", "type", "remaining"}].
+    Each tray has: { "id": "0", "cols": ["FF0000"], "tray_type": "PLA", ... }
+    """
+    if not ams_list:
+        return []
+    parsed_ams = []
+    for t in ams_list[0].get("tray", []):
+        # Bambu colors are 8 hex chars (RRGGBB + Alpha), we want the first 6
+        raw_color = t.get("tray_color", "000000")
+        parsed_ams.append({
+            "slot": t.get("id"),
+            "color": f"#{raw_color[:6]}",
+            "type": t.get("tray_type", "Unknown"),
+            "remaining": t.get("remain", -1),  # -1 = Unknown/Generic (Assume full/available)
+        })
+    return parsed_ams
+
+
+class ReportParser:
+    """
+    Turns one printer's MQTT payloads into the telemetry dict for the update callback.
+
+    - Payload bytes go straight to orjson (json as fallback), no str decode.
+    - Only REPORT_FIELDS and the AMS trays are looked at.
+    - The AMS sub-document is re-parsed only when it differs from the last one;
+      an unchanged AMS is left out of the result.
+    - gcode_state is logged on transitions only, plus a message count every STATS_LOG_INTERVAL.
+    """
+
+    def __init__(self, serial: str = ""):
+        self.serial = serial
+        self._last_ams_raw: Optional[list] = None
+        self._last_state: Optional[str] = None
+        self._messages = 0
+        self._stats_since = time.monotonic()
+
+    def parse(self, payload) -> Dict[str, Any]:
+        """Raises ValueError (json.JSONDecodeError) for invalid JSON."""
+        data = _loads(payload)
+        self._count()
+
+        # The structure of Bambu reports is typically wrapped in "print" ({"print": {"command": "push_status", ...}})
+        report = data.get("print", {})
+        if not report and "print" not in data:
+            report = data
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{self.serial} report keys: {list(report.keys())}")
+
+        extracted = {}
+        for key, name in REPORT_FIELDS.items():
+            if key in report:
+                extracted[name] = report[key]
+
+        state = extracted.get("print_status")
+        if state is not None and state != self._last_state:
+            logger.info(f"{self.serial} Gcode State: {self._last_state} -> {state}")
+            self._last_state = state
+
+        ams = report.get("ams")
+        if isinstance(ams, dict) and "ams" in ams:
+            ams_list = ams["ams"]
+            # Deep compare of the raw trays runs in C and is far cheaper than re-parsing.
+            # An empty list (spools removed, AMS unplugged) is emitted too, as [].
+            if ams_list is not None and ams_list != self._last_ams_raw:
+                extracted["ams_data"] = parse_ams(ams_list)
+                self._last_ams_raw = ams_list
+
+        return extracted
+
+    def reset(self):
+        """Forget the last AMS state, e.g. after a reconnect, so the next report is re-emitted."""
+        self._last_ams_raw = None
+
+    def _count(self):
+        self._messages += 1
+        now = time.monotonic()
+        if now - self._stats_since >= STATS_LOG_INTERVAL:
+            logger.debug(f"{self.serial}: {self._messages} MQTT messages in the last {now - self._stats_since:.0f}s")
+            self._messages = 0
+            self._stats_since = now
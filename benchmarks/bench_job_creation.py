@@ -0,0 +1,117 @@
+"""
+Benchmark for STEP 1.5 of the dispatcher (OPEN orders -> PENDING jobs).
+
+Usage:
+    python benchmarks/bench_job_creation.py [--database-url URL] [--sizes 1000 10000]
+
+Defaults to a throw-away SQLite file. Point --database-url at a scratch Postgres
+(postgresql+asyncpg://...) for numbers that include real network round-trips.
+The legacy per-order implementation is run for comparison.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlmodel import SQLModel, select, delete
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import Order, Job, Product, OrderStatusEnum, JobStatusEnum, PlatformEnum
+from worker_service import create_jobs_from_open_orders
+
+SKU_COUNT = 20
+
+
+async def legacy_create_jobs(session) -> int:
+    """The pre-batching implementation: two queries per OPEN order."""
+    result = await session.execute(
+        select(Order).where(Order.status == OrderStatusEnum.OPEN).order_by(Order.purchase_date.asc())
+    )
+    created = 0
+    for order in result.scalars().all():
+        existing_job = await session.execute(select(Job).where(Job.order_id == order.id))
+        if existing_job.scalars().first():
+            order.status = OrderStatusEnum.QUEUED
+            session.add(order)
+            continue
+        product_result = await session.execute(select(Product).where(Product.sku == order.sku))
+        product = product_result.scalars().first()
+        if product:
+            session.add(Job(order_id=order.id, gcode_path=product.file_path_3mf, status=JobStatusEnum.PENDING, created_at=datetime.now()))
+            order.status = OrderStatusEnum.QUEUED
+            created += 1
+        else:
+            order.status = OrderStatusEnum.DONE
+        session.add(order)
+    return created
+
+
+async def seed(session_maker, count: int):
+    async with session_maker() as session:
+        await session.execute(delete(Job))
+        await session.execute(delete(Order))
+        await session.execute(delete(Product))
+        for i in range(SKU_COUNT):
+            session.add(Product(name=f"Bench {i}", sku=f"BENCH_{i}", file_path_3mf=f"storage/3mf/bench_{i}.3mf"))
+        start = datetime.now() - timedelta(days=1)
+        for i in range(count):
+            session.add(Order(
+                platform=PlatformEnum.EBAY,
+                platform_order_id=f"BENCH-{count}-{i}",
+                # ~1% of orders reference an unknown SKU
+                sku=f"BENCH_{i % SKU_COUNT}" if i % 100 else "UNKNOWN",
+                quantity=1,
+                purchase_date=start + timedelta(seconds=i),
+                status=OrderStatusEnum.OPEN
+            ))
+        await session.commit()
+
+
+async def timed(session_maker, step) -> tuple:
+    async with session_maker() as session:
+        t0 = time.perf_counter()
+        created = await step(session)
+        await session.commit()
+        return time.perf_counter() - t0, created
+
+
+async def main(database_url: str, sizes):
+    # Per-order INFO/ERROR logs would dominate the timings
+    logging.getLogger("WorkerService").setLevel(logging.CRITICAL)
+
+    engine = create_async_engine(database_url, echo=False, future=True)
+    session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    print(f"{'orders':>8} | {'legacy':>10} | {'batched':>10} | speedup")
+    for count in sizes:
+        await seed(session_maker, count)
+        legacy_s, legacy_created = await timed(session_maker, legacy_create_jobs)
+
+        await seed(session_maker, count)
+        batched_s, batched_created = await timed(session_maker, create_jobs_from_open_orders)
+
+        assert legacy_created == batched_created
+        print(f"{count:>8} | {legacy_s:>9.3f}s | {batched_s:>9.3f}s | {legacy_s / batched_s:.1f}x")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(url, args.sizes))
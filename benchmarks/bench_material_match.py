@@ -0,0 +1,125 @@
+"""
+Microbenchmark for STEP 2 material matching: linear check_material_match scan
+vs. MaterialIndex lookups.
+
+Usage:
+    python benchmarks/bench_material_match.py [--printers 200] [--jobs 5000]
+
+Most jobs request colors that are not loaded anywhere, which is the case that
+made the linear scan walk every idle printer's AMS for every pending job.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import Printer, Product, PrinterTypeEnum
+from worker_service import check_material_match
+from material_index import MaterialIndex
+
+TYPES = ["PLA", "PETG", "ABS"]
+LOADED_COLORS = [f"#{i * 0x111111:06X}" for i in range(12)]
+REQUESTED_COLORS = LOADED_COLORS + [f"#{0xA00000 + i:06X}" for i in range(28)]
+
+
+def build_fleet(count: int, rng: random.Random) -> list:
+    return [
+        Printer(
+            serial=f"BENCH{i:04d}",
+            name=f"Bench {i}",
+            type=PrinterTypeEnum.A1,
+            ams_data=[
+                {"slot": str(s), "type": rng.choice(TYPES), "color": rng.choice(LOADED_COLORS), "remaining": 100}
+                for s in range(4)
+            ]
+        )
+        for i in range(count)
+    ]
+
+
+def build_jobs(count: int, rng: random.Random) -> list:
+    return [
+        Product(
+            name=f"Job {i}",
+            sku=f"JOB{i}",
+            file_path_3mf="bench.3mf",
+            required_filament_type=rng.choice(TYPES),
+            required_filament_color=rng.choice(REQUESTED_COLORS)
+        )
+        for i in range(count)
+    ]
+
+
+def linear_pass(printers: list, jobs: list) -> list:
+    idle = list(printers)
+    assignments = []
+    for product in jobs:
+        if not idle:
+            break
+        for p in idle:
+            slot = check_material_match(p, product)
+            if slot is not None:
+                assignments.append((p.serial, slot))
+                idle.remove(p)
+                break
+    return assignments
+
+
+def indexed_pass(index: MaterialIndex, printers: list, jobs: list) -> list:
+    index.reset(printers)
+    assignments = []
+    for product in jobs:
+        if not index:
+            break
+        match = index.find(product.required_filament_type, product.required_filament_color)
+        if match is not None:
+            assignments.append(match)
+            index.remove_printer(match[0])
+    return assignments
+
+
+def best_of(runs: int, fn, *args):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--printers", type=int, default=200)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=2.3, help="Delta E for the color-tolerant run")
+    args = parser.parse_args()
+
+    # check_material_match logs a warning per failed printer; don't time the log handler
+    logging.getLogger("WorkerService").setLevel(logging.CRITICAL)
+
+    rng = random.Random(42)
+    printers = build_fleet(args.printers, rng)
+    jobs = build_jobs(args.jobs, rng)
+
+    linear_s, linear_result = best_of(args.runs, linear_pass, printers, jobs)
+    index = MaterialIndex()
+    # First reset parses every AMS; steady-state ticks reuse the parsed slots
+    index.reset(printers)
+    indexed_s, indexed_result = best_of(args.runs, indexed_pass, index, printers, jobs)
+
+    tolerant_index = MaterialIndex(color_tolerance=args.tolerance)
+    tolerant_index.reset(printers)
+    tolerant_s, tolerant_result = best_of(args.runs, indexed_pass, tolerant_index, printers, jobs)
+
+    assert linear_result == indexed_result, "Index must assign exactly like the linear scan"
+    print(f"{args.printers} printers x {args.jobs} pending jobs, {len(indexed_result)} assignments")
+    print(f"  linear scan : {linear_s * 1000:9.1f} ms")
+    print(f"  indexed     : {indexed_s * 1000:9.1f} ms")
+    print(f"  speedup     : {linear_s / indexed_s:9.1f}x")
+    print(f"  indexed, dE <= {args.tolerance}: {tolerant_s * 1000:.1f} ms ({len(tolerant_result)} assignments)")
@@ -0,0 +1,124 @@
+"""
+Microbenchmark for MQTT push_status handling: the old _on_message parsing
+(str decode + json.loads + INFO log of the report keys on every message)
+vs. ReportParser (orjson on bytes, selective extraction, AMS skip when unchanged).
+
+Usage:
+    python benchmarks/bench_mqtt_parse.py [--messages 50000] [--full-every 10]
+
+Payloads are the fixtures in tests/fixtures/mqtt. Runs on a single core, so
+messages/s is per core. A printer sends about 1 message per second.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bambu_report
+from bambu_report import ReportParser, parse_ams
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', 'mqtt')
+
+# Logs go nowhere, but records are still created/formatted like in production
+bench_logger = logging.getLogger("BenchLegacy")
+bench_logger.addHandler(logging.NullHandler())
+bench_logger.propagate = False
+bench_logger.setLevel(logging.INFO)
+logging.getLogger("BambuClient").addHandler(logging.NullHandler())
+logging.getLogger("BambuClient").propagate = False
+
+
+def load(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, f"{name}.json"), "rb") as f:
+        return f.read()
+
+
+def legacy_parse(payload) -> dict:
+    """The pre-ReportParser _on_message body."""
+    if isinstance(payload, bytes):
+        payload = payload.decode()
+    data = json.loads(payload)
+    report = data.get("print", {})
+    if not report and "print" not in data:
+        report = data
+
+    bench_logger.info(f"Report Keys: {list(report.keys())}")
+    if "gcode_state" in report:
+        bench_logger.info(f"Gcode State: {report['gcode_state']}")
+
+    extracted = {}
+    if "gcode_state" in report:
+        extracted["print_status"] = report.get("gcode_state")
+    if "nozzle_temper" in report:
+        extracted["nozzle_temper"] = report.get("nozzle_temper")
+    if "bed_temper" in report:
+        extracted["bed_temper"] = report.get("bed_temper")
+    if "ams" in report and "ams" in report["ams"]:
+        extracted["ams_data"] = parse_ams(report["ams"]["ams"])
+    if "mc_percent" in report:
+        extracted["progress"] = report.get("mc_percent")
+    if "mc_remaining_time" in report:
+        extracted["remaining_time"] = report.get("mc_remaining_time")
+    return extracted
+
+
+def build_stream(count: int, full_every: int) -> list:
+    """Mostly partial pushes, a full push_status every `full_every` messages, AMS swaps now and then."""
+    full, partial, finish, swap = (load(n) for n in
+                                   ("push_status_full", "push_status_partial", "push_status_finish", "push_status_ams_swap"))
+    stream = []
+    for i in range(count):
+        if i % (full_every * 50) == 0:
+            stream.append(swap if (i // (full_every * 50)) % 2 else full)
+        elif i % full_every == 0:
+            stream.append(full)
+        elif i % 500 == 0:
+            stream.append(finish)
+        else:
+            stream.append(partial)
+    return stream
+
+
+def timed(label: str, fn, stream: list) -> float:
+    start = time.perf_counter()
+    for payload in stream:
+        fn(payload)
+    elapsed = time.perf_counter() - start
+    rate = len(stream) / elapsed
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {rate:12,.0f} msg/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--full-every", type=int, default=10, help="one full push_status per N messages")
+    args = parser.parse_args()
+
+    stream = build_stream(args.messages, args.full_every)
+    size = sum(len(p) for p in stream) / len(stream)
+    print(f"{len(stream)} messages, {size:.0f} bytes avg, full push every {args.full_every}\n")
+
+    legacy = timed("legacy (json + INFO log)", legacy_parse, stream)
+
+    original = bambu_report._loads
+    bambu_report._loads = json.loads
+    fallback = timed("ReportParser (json)", ReportParser("BENCH").parse, stream)
+    bambu_report._loads = original
+
+    fast = None
+    if bambu_report.orjson is not None:
+        fast = timed("ReportParser (orjson)", ReportParser("BENCH").parse, stream)
+    else:
+        print("orjson not installed, skipping")
+
+    best = fast or fallback
+    print(f"\nSpeedup: {best / legacy:.1f}x  (json fallback: {fallback / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
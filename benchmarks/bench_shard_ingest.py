@@ -0,0 +1,104 @@
+"""
+Ingest scaling demo for sharded worker mode (WORKER_SHARDS).
+
+Starts flooding MQTT broker stand-ins (tests/mqtt_standin.py, one process per
+shard, each on its own loopback address) and a ShardSupervisor with 1..N
+telemetry shards. Every printer is sent push_status reports at --rate messages/s,
+far above the real ~1/s so that the offered load exceeds what one core can
+ingest; the shards' message counters give the achieved ingest rate.
+
+Usage:
+    python benchmarks/bench_shard_ingest.py [--printers 32] [--rate 500] [--shards 1,2,4] [--duration 10]
+
+Needs Linux (127.0.0.x aliases) and the openssl CLI. Scaling is bounded by
+the number of cores: run it on a machine with at least max(--shards) * 2 cores,
+since the broker stand-ins need CPU too.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'tests'))
+
+from shard_worker import ShardSupervisor
+from mqtt_standin import run_broker_process
+
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures', 'mqtt')
+BROKER_PORT = 18883
+
+
+def flood_payloads() -> list:
+    """Partial pushes with changing progress/temperature, plus a full push now and then."""
+    with open(os.path.join(FIXTURES, "push_status_partial.json"), "rb") as f:
+        partial = json.loads(f.read())
+    with open(os.path.join(FIXTURES, "push_status_full.json"), "rb") as f:
+        full = f.read()
+    payloads = []
+    for i in range(100):
+        partial["print"]["mc_percent"] = i
+        partial["print"]["nozzle_temper"] = 200 + i % 30
+        payloads.append(json.dumps(partial).encode())
+    payloads[0] = full
+    return payloads
+
+
+async def measure(shards: int, printers: int, rate: float, duration: float, warmup: float) -> float:
+    mp = multiprocessing.get_context("spawn")
+    payloads = flood_payloads()
+    brokers = []
+    for i in range(shards):
+        ready, stop = mp.Event(), mp.Event()
+        process = mp.Process(target=run_broker_process,
+                             args=(f"127.0.0.{i + 1}", BROKER_PORT, payloads, rate, ready, stop), daemon=True)
+        process.start()
+        brokers.append((process, ready, stop))
+    for _, ready, _ in brokers:
+        await asyncio.to_thread(ready.wait, 30)
+
+    supervisor = ShardSupervisor(shards, lambda serial, fields: None, mqtt_port=BROKER_PORT)
+    specs = [(f"BENCH{i:04d}", f"127.0.0.{i % shards + 1}", "12345678") for i in range(printers)]
+    try:
+        await supervisor.start(specs)
+        await asyncio.sleep(warmup)
+        start_count, start = supervisor.total_messages, time.perf_counter()
+        await asyncio.sleep(duration)
+        count, elapsed = supervisor.total_messages - start_count, time.perf_counter() - start
+    finally:
+        await supervisor.stop()
+        for process, _, stop in brokers:
+            stop.set()
+            process.join(timeout=5)
+    return count / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--printers", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=500.0, help="messages/s sent to each printer's client")
+    parser.add_argument("--shards", default="1,2,4", help="comma-separated shard counts")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    args = parser.parse_args()
+
+    # Keep connection/state logs of this process and the shard processes out of the table
+    logging.disable(logging.INFO)
+    os.environ["SHARD_LOG_LEVEL"] = "WARNING"
+
+    print(f"{args.printers} printers x {args.rate:.0f} msg/s offered, {os.cpu_count()} cores\n")
+    print(f"{'shards':>6} {'msg/s':>12} {'per shard':>12} {'speedup':>8}")
+    baseline = None
+    for shards in (int(s) for s in args.shards.split(",")):
+        rate = await measure(shards, args.printers, args.rate, args.duration, args.warmup)
+        baseline = baseline or rate
+        print(f"{shards:>6} {rate:12,.0f} {rate / shards:12,.0f} {rate / baseline:7.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
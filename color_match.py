@@ -0,0 +1,96 @@
+import logging
+import math
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# numpy is optional (pulled in by pandas for init_df.py); fall back to pure Python
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger("ColorMatch")
+
+# Max perceptual distance (CIE76 Delta E in CIELAB) between a required and a loaded color.
+# 0 = exact hex match only. ~2.3 is a just-noticeable difference.
+COLOR_TOLERANCE = float(os.getenv("COLOR_TOLERANCE_DE", "0"))
+
+Lab = Tuple[float, float, float]
+
+# D65 reference white
+_XN, _YN, _ZN = 0.95047, 1.0, 1.08883
+
+
+def _srgb_to_linear(c: float) -> float:
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def _f(t: float) -> float:
+    return t ** (1 / 3) if t > 0.008856 else (7.787 * t + 16 / 116)
+
+
+@lru_cache(maxsize=4096)
+def hex_to_lab(color: Optional[str]) -> Optional[Lab]:
+    """'#RRGGBB' (or 'RRGGBB', any case) -> CIELAB. None for anything that isn't a hex color."""
+    if not color:
+        return None
+    value = color.strip().lstrip('#')
+    if len(value) != 6:
+        return None
+    try:
+        r, g, b = (int(value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+    except ValueError:
+        return None
+
+    r, g, b = _srgb_to_linear(r), _srgb_to_linear(g), _srgb_to_linear(b)
+    x = (0.4124 * r + 0.3576 * g + 0.1805 * b) / _XN
+    y = (0.2126 * r + 0.7152 * g + 0.0722 * b) / _YN
+    z = (0.0193 * r + 0.1192 * g + 0.9505 * b) / _ZN
+
+    fx, fy, fz = _f(x), _f(y), _f(z)
+    return (116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+
+def delta_e(color_a: Optional[str], color_b: Optional[str]) -> Optional[float]:
+    lab_a, lab_b = hex_to_lab(color_a), hex_to_lab(color_b)
+    if lab_a is None or lab_b is None:
+        return None
+    return math.dist(lab_a, lab_b)
+
+
+def colors_match(required: Optional[str], loaded: Optional[str], tolerance: float = COLOR_TOLERANCE) -> bool:
+    """Exact (case-insensitive) match, or within `tolerance` Delta E when both are hex colors."""
+    if not required or not loaded:
+        return False
+    if required.strip().lower() == loaded.strip().lower():
+        return True
+    if tolerance <= 0:
+        return False
+    distance = delta_e(required, loaded)
+    return distance is not None and distance <= tolerance
+
+
+def colors_within(required: str, loaded: List[str], tolerance: float = COLOR_TOLERANCE) -> List[str]:
+    """
+    Filters `loaded` down to the colors within `tolerance` of `required`, closest first.
+    Distances against all candidates are computed in one vectorized pass.
+    """
+    ref = hex_to_lab(required)
+    if ref is None or not loaded:
+        return []
+
+    labs = [(color, hex_to_lab(color)) for color in loaded]
+    labs = [(color, lab) for color, lab in labs if lab is not None]
+    if not labs:
+        return []
+
+    if np is not None:
+        distances = np.linalg.norm(np.array([lab for _, lab in labs]) - np.array(ref), axis=1).tolist()
+    else:
+        distances = [math.dist(lab, ref) for _, lab in labs]
+
+    ranked = sorted(
+        (distance, color) for distance, (color, _) in zip(distances, labs) if distance <= tolerance
+    )
+    return [color for _, color in ranked]
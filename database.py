@@ -1,15 +1,22 @@
 
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import sessionmaker
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Any, Dict
+import logging
 import os
+import time
+
+logger = logging.getLogger("Database")
 
 # PostgreSQL Connection String
 POSTGRES_USER = os.getenv("POSTGRES_USER", "factory_user")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "factory_password")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "factory_db")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST", "127.0.0.1") 
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "127.0.0.1")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 
 DEFAULT_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
@@ -18,20 +25,146 @@ DEFAULT_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD
 # Use DATABASE_URL env var if available, otherwise default to constructed string
 DATABASE_URL = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
 
+# Connection pool profiles. main.py defaults to "api", main_daemon.py and worker_service.py to "daemon",
+# everything else (check_*.py, scripts/) to "script". Override with DB_POOL_PROFILE.
+# - api: many short concurrent requests; bursty order ingest needs overflow headroom
+# - daemon: a handful of long-lived tasks repeating the same dispatcher queries
+# - script: one-shot tools, keep the footprint small
+POOL_PROFILES: Dict[str, Dict[str, Any]] = {
+    "api": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 10, "pool_recycle": 1800,
+            "pool_pre_ping": True, "statement_cache_size": 200, "prepared_statement_cache_size": 200},
+    "daemon": {"pool_size": 5, "max_overflow": 5, "pool_timeout": 30, "pool_recycle": 1800,
+               "pool_pre_ping": True, "statement_cache_size": 500, "prepared_statement_cache_size": 500},
+    "script": {"pool_size": 2, "max_overflow": 0, "pool_timeout": 30, "pool_recycle": -1,
+               "pool_pre_ping": False, "statement_cache_size": 100, "prepared_statement_cache_size": 100},
+}
+DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "script")
+
+# Checkouts waiting longer than this (seconds) are logged as warnings
+POOL_WAIT_WARNING = float(os.getenv("DB_POOL_WAIT_WARNING", "1.0"))
+
+
+def pool_settings(profile: str = None) -> Dict[str, Any]:
+    """The profile's settings, with per-setting overrides from DB_POOL_SIZE, DB_MAX_OVERFLOW, etc."""
+    profile = profile or DB_POOL_PROFILE
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown DB_POOL_PROFILE '{profile}' (expected one of {', '.join(POOL_PROFILES)})")
+    settings = dict(POOL_PROFILES[profile])
+    overrides = {
+        "pool_size": ("DB_POOL_SIZE", int),
+        "max_overflow": ("DB_MAX_OVERFLOW", int),
+        "pool_timeout": ("DB_POOL_TIMEOUT", float),
+        "pool_recycle": ("DB_POOL_RECYCLE", int),
+        "pool_pre_ping": ("DB_POOL_PRE_PING", lambda v: v.lower() in ("1", "true", "yes")),
+        "statement_cache_size": ("DB_STATEMENT_CACHE_SIZE", int),
+        "prepared_statement_cache_size": ("DB_PREPARED_STATEMENT_CACHE_SIZE", int),
+    }
+    for key, (env, convert) in overrides.items():
+        if os.getenv(env):
+            settings[key] = convert(os.environ[env])
+    return settings
+
+
+class PoolStats:
+    """Counters for connection checkouts from the pool, see pool_status()."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.misses = 0          # Checkouts that found no idle connection (opened one or queued)
+        self.wait_seconds = 0.0  # Total time spent in checkouts, including connect / pre-ping
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that measures how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def connect(self):
+        idle = self.checkedin() > 0
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            stats = self.stats
+            stats.checkouts += 1
+            stats.wait_seconds += waited
+            stats.max_wait = max(stats.max_wait, waited)
+            if not idle:
+                stats.misses += 1
+            if waited >= POOL_WAIT_WARNING:
+                logger.warning(f"Waited {waited:.2f}s for a database connection "
+                               f"({self.checkedout()} checked out, pool {self.size()} + overflow {self._max_overflow}).")
+
+
+def _engine_options() -> Dict[str, Any]:
+    if make_url(DATABASE_URL).get_backend_name() != "postgresql":
+        return {}  # SQLite dev setups keep SQLAlchemy's defaults
+    settings = pool_settings()
+    return {
+        "poolclass": MeteredQueuePool,
+        "pool_size": settings["pool_size"],
+        "max_overflow": settings["max_overflow"],
+        "pool_timeout": settings["pool_timeout"],
+        "pool_recycle": settings["pool_recycle"],
+        "pool_pre_ping": settings["pool_pre_ping"],
+        "connect_args": {
+            # asyncpg's own per-connection cache, and SQLAlchemy's prepared statement cache on top
+            "statement_cache_size": settings["statement_cache_size"],
+            "prepared_statement_cache_size": settings["prepared_statement_cache_size"],
+        },
+    }
+
+
 # Create Async Engine
 engine = create_async_engine(
     DATABASE_URL,
     echo=False, # Set to False in production
-    future=True
+    future=True,
+    **_engine_options()
 )
 
 # Async Session Factory
 async_session_maker = sessionmaker(
-    engine, 
-    class_=AsyncSession, 
+    engine,
+    class_=AsyncSession,
     expire_on_commit=False
 )
 
+
+def pool_status(async_engine=None) -> Dict[str, Any]:
+    """Live pool occupancy plus checkout counters (when the pool is metered)."""
+    pool = (async_engine or engine).sync_engine.pool
+    status: Dict[str, Any] = {"profile": DB_POOL_PROFILE, "pool": type(pool).__name__}
+    if isinstance(pool, MeteredQueuePool):
+        stats = pool.stats
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),  # Connections opened beyond pool_size
+            "checkouts": stats.checkouts,
+            "misses": stats.misses,
+            "timeouts": stats.timeouts,
+            "avg_wait_ms": round(stats.wait_seconds / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+            "max_wait_ms": round(stats.max_wait * 1000, 3),
+        })
+    return status
+
+
 # Dependency for FastAPI
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
@@ -1,6 +1,7 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 // import useSWR from 'swr';
-import { fetchOrders, fetchPrinters } from './api';
+import { fetchOrders } from './api';
+import usePrinterStream from './usePrinterStream';
 import { LayoutDashboard, RefreshCw, Printer, Package, ShoppingCart } from 'lucide-react';
 import { Sidebar } from './components/layout/Sidebar';
 import { TopBar } from './components/layout/TopBar';
@@ -10,6 +11,9 @@ import ProductView from './components/views/ProductView';
 import OrdersView from './components/views/OrdersView';
 import AddPrinterModal from './components/modals/AddPrinterModal';
 
+// Orders loaded initially (newest); later changes stream in through the `since` cursor
+const ORDER_FEED_SIZE = 500;
+
 function App() {
   const [currentView, setCurrentView] = useState('Dashboard');
   const [orders, setOrders] = useState([]);
@@ -18,30 +22,13 @@ function App() {
   const [localPrinters, setLocalPrinters] = useState([]);
 
   // --- Global Data Fetching ---
-  const [fetchedPrinters, setFetchedPrinters] = useState([]);
-  const [isValidating, setIsValidating] = useState(false);
-
-  const refreshPrinters = async () => {
-    setIsValidating(true);
-    try {
-      const data = await fetchPrinters();
-      setFetchedPrinters(data || []);
-    } catch (e) {
-      console.error("Printer Fetch Error", e);
-    } finally {
-      setIsValidating(false);
-    }
-  };
+  // Printer state is pushed by the backend (snapshot + deltas), no polling.
+  // The only stream of the page: components get the printers as props.
+  const { printers: fetchedPrinters, connected } = usePrinterStream();
 
   // Merge fetched and local printers
   const printers = [...localPrinters, ...fetchedPrinters];
 
-  useEffect(() => {
-    refreshPrinters();
-    const interval = setInterval(refreshPrinters, 2000);
-    return () => clearInterval(interval);
-  }, []);
-
   const handleAddPrinter = (newPrinter) => {
     // Check if printer with same serial already exists in either list
     if (printers.some(p => p.serial === newPrinter.serial)) {
@@ -51,10 +38,25 @@ function App() {
     setLocalPrinters(prev => [newPrinter, ...prev]);
   };
 
+  // Orders: newest page once, then only what changed since the last cursor
+  const ordersById = useRef(new Map());
+  const ordersSince = useRef(null);
+
   const refreshOrders = async () => {
     try {
-      const o = await fetchOrders();
-      setOrders(Array.isArray(o) ? o : []);
+      let page;
+      do {
+        page = await fetchOrders(ordersSince.current
+          ? { since: ordersSince.current, compact: true, limit: 500 }
+          : { compact: true, limit: ORDER_FEED_SIZE });
+        if (!page) return;
+        page.orders.forEach(o => ordersById.current.set(o.id, o));
+        ordersSince.current = page.since;
+      } while (page.has_more && page.next_cursor === null); // More queued changes (since mode only)
+
+      // Oldest first, as the views expect
+      setOrders(Array.from(ordersById.current.values())
+        .sort((a, b) => new Date(a.purchase_date) - new Date(b.purchase_date) || a.id - b.id));
     } catch (e) { console.error(e) }
   };
 
@@ -91,7 +93,7 @@ function App() {
             </h2>
 
             <div className="text-xs text-slate-400 flex gap-2 items-center bg-slate-800/50 px-3 py-1 rounded-full border border-slate-700">
-              <RefreshCw size={12} className={isValidating ? "animate-spin" : ""} />
+              <RefreshCw size={12} className={!connected ? "animate-spin" : ""} />
               <span className={!printers.length ? "text-amber-500" : "text-emerald-500"}>
                 {printers.length} Systems Active
               </span>
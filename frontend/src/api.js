@@ -18,16 +18,51 @@ export const fetchPrinters = async () => {
     }
 };
 
-export const fetchOrders = async () => {
+// Live printer state: a snapshot, then field-level deltas (server push instead of polling /printers).
+// Calls onPrinters(list) on every change. Returns a function that closes the stream.
+export const subscribePrinters = (onPrinters, onConnectionChange = () => { }) => {
+    const source = new EventSource(`${API_BASE_URL}/stream/printers`);
+    let printers = new Map();
+    const emit = () => onPrinters(Array.from(printers.values()));
+
+    source.addEventListener('snapshot', (e) => {
+        const { printers: list } = JSON.parse(e.data);
+        printers = new Map(list.map(p => [p.serial, p]));
+        onConnectionChange(true);
+        emit();
+    });
+
+    source.addEventListener('delta', (e) => {
+        const { printers: deltas } = JSON.parse(e.data);
+        for (const [serial, fields] of Object.entries(deltas)) {
+            // New object only for changed printers, so unchanged cards keep their props
+            printers.set(serial, { ...(printers.get(serial) || { serial }), ...fields });
+        }
+        emit();
+    });
+
+    // EventSource reconnects by itself; the server then sends a fresh snapshot
+    source.onerror = () => onConnectionChange(false);
+
+    return () => source.close();
+};
+
+// One page of orders: { orders, next_cursor, since, has_more }.
+// params: { limit, cursor, since, status, platform, sku, compact }. Returns null on failure.
+export const fetchOrders = async (params = {}) => {
+    const query = new URLSearchParams();
+    for (const [key, value] of Object.entries(params)) {
+        if (value !== undefined && value !== null) query.append(key, value);
+    }
     try {
-        const response = await fetch(`${API_BASE_URL}/orders`);
+        const response = await fetch(`${API_BASE_URL}/orders?${query}`);
         if (!response.ok) {
             console.warn('Failed to fetch orders');
-            return [];
+            return null;
         }
         return response.json();
     } catch (e) {
-        return [];
+        return null;
     }
 };
 
@@ -1,26 +1,13 @@
 import React, { useMemo } from 'react';
-import useSWR from 'swr';
 import PrinterCard from '../PrinterCard';
 import { Filter, Activity, Power, AlertCircle, Server } from 'lucide-react';
-import { fetchPrinters } from '../../api';
 
-// SWR Fetcher Wrapper
-const fetcher = () => fetchPrinters();
-
-const DashboardGrid = ({ initialPrinters = [] }) => {
-    // Use SWR for data fetching with polling
-    const { data: printers, error, isLoading } = useSWR('printers', fetcher, {
-        fallbackData: initialPrinters,
-        refreshInterval: 2000,
-        keepPreviousData: true,
-        revalidateOnFocus: false
-    });
-
-    const activeData = printers || [];
+// `printers` / `connected` come from App's usePrinterStream (one stream per dashboard)
+const DashboardGrid = ({ printers = [], connected = false }) => {
 
     // Memoized Stats Calculation (Efficient O(N))
     const stats = useMemo(() => {
-        return activeData.reduce((acc, p) => {
+        return printers.reduce((acc, p) => {
             const status = (p.current_status || 'offline').toLowerCase();
 
             if (status === 'printing') {
@@ -33,10 +20,9 @@ const DashboardGrid = ({ initialPrinters = [] }) => {
             }
             return acc;
         }, { online: 0, printing: 0, offline: 0 });
-    }, [activeData]);
+    }, [printers]);
 
-    if (isLoading && !activeData.length) return <div className="text-slate-500">Loading Fleet Data...</div>;
-    if (error && !activeData.length) return <div className="text-red-500">Failed to load fleet data. Is the backend running?</div>;
+    if (!connected && !printers.length) return <div className="text-slate-500">Connecting to fleet stream... Is the backend running?</div>;
 
     return (
         <div className="space-y-6">
@@ -58,7 +44,7 @@ const DashboardGrid = ({ initialPrinters = [] }) => {
 
             {/* Auto-fill Optimized Grid */}
             <div className="grid gap-4" style={{ gridTemplateColumns: 'repeat(auto-fill, minmax(300px, 1fr))' }}>
-                {activeData.map((printer) => (
+                {printers.map((printer) => (
                     // Pass raw printer object directly to allow strict prop comparison in child
                     <PrinterCard
                         key={printer.serial || printer.id}
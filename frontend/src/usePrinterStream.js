@@ -0,0 +1,14 @@
+import { useEffect, useState } from 'react';
+import { subscribePrinters } from './api';
+
+// Printers from GET /stream/printers, kept up to date by server push
+const usePrinterStream = () => {
+  const [printers, setPrinters] = useState([]);
+  const [connected, setConnected] = useState(false);
+
+  useEffect(() => subscribePrinters(setPrinters, setConnected), []);
+
+  return { printers, connected };
+};
+
+export default usePrinterStream;
@@ -1,8 +1,9 @@
 
 import asyncio
 import sys
-from sqlmodel import select, SQLModel
+from sqlmodel import select
 from database import engine, async_session_maker
+from migrations import run_migrations
 from models import Printer, Order, Product, PlatformEnum, PrinterTypeEnum, PrinterStatusEnum, OrderStatusEnum
 from datetime import datetime
 import uuid
@@ -10,8 +11,8 @@ import uuid
 async def init_db():
     print("Creating tables...")
     async with engine.begin() as conn:
-        # Create all tables defined in models.py (imported via SQLModel)
-        await conn.run_sync(SQLModel.metadata.create_all)
+        # Create all tables defined in models.py (imported via SQLModel) + schema upgrades
+        await run_migrations(conn)
     print("Tables created successfully.")
     
     # Seed data
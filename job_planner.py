@@ -0,0 +1,123 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, union
+from sqlmodel import select, col
+
+from models import Job, JobOrder, JobStatusEnum, Product
+
+logger = logging.getLogger("JobPlanner")
+
+
+def batch_size(product: Product) -> int:
+    """Copies per plate of the product's batched variant (1 = no usable variant)."""
+    if product.batch_file_path_3mf and (product.batch_copies or 0) > 1:
+        return product.batch_copies
+    return 1
+
+
+def plan_jobs(orders: Iterable[Tuple[int, str, Optional[int]]], products: Dict[str, Product]) -> List[Dict[str, Any]]:
+    """
+    Turns orders (order_id, sku, quantity), oldest first, into print jobs:
+    one job per unit, except that full batches of a SKU's units - also from different
+    orders - go onto its batched plate when the product declares one. Leftover units
+    print singly rather than waiting for more orders.
+    Returns [{"order_id", "gcode_path", "copies", "units": [(order_id, units), ...]}];
+    orders whose SKU has no product are left out.
+    """
+    units_by_sku: Dict[str, List[List[int]]] = {}
+    for order_id, sku, quantity in orders:
+        if sku in products:
+            units_by_sku.setdefault(sku, []).append([order_id, max(quantity or 1, 1)])
+
+    planned = []
+    for sku, queue in units_by_sku.items():
+        product = products[sku]
+        size = batch_size(product)
+        remaining = sum(units for _, units in queue)
+
+        while queue:
+            if remaining >= size > 1:
+                # Take the next `size` units, oldest orders first
+                take, covered = size, []
+                while take:
+                    order_units = queue[0]
+                    used = min(take, order_units[1])
+                    covered.append((order_units[0], used))
+                    order_units[1] -= used
+                    take -= used
+                    if not order_units[1]:
+                        queue.pop(0)
+                remaining -= size
+                planned.append({"order_id": covered[0][0], "gcode_path": product.batch_file_path_3mf,
+                                "copies": size, "units": covered})
+            else:
+                order_id, units = queue.pop(0)
+                planned.extend({"order_id": order_id, "gcode_path": product.file_path_3mf,
+                                "copies": 1, "units": [(order_id, 1)]} for _ in range(units))
+                remaining -= units
+    return planned
+
+
+async def add_planned_jobs(session, planned: List[Dict[str, Any]], now: Optional[datetime] = None) -> int:
+    """
+    Bulk-inserts planned jobs as PENDING, plus the job_orders rows of jobs that cover
+    several orders. Caller commits. Returns the number of jobs.
+    """
+    if not planned:
+        return 0
+    now = now or datetime.now()
+    rows = [{"order_id": p["order_id"], "gcode_path": p["gcode_path"], "copies": p["copies"],
+             "status": JobStatusEnum.PENDING, "created_at": now} for p in planned]
+
+    if not any(len(p["units"]) > 1 for p in planned):
+        await session.execute(insert(Job), rows)
+        return len(rows)
+
+    # Need the new ids for the links (in parameter order)
+    result = await session.execute(insert(Job).returning(Job.id, sort_by_parameter_order=True), rows)
+    links = [
+        {"job_id": job_id, "order_id": order_id, "units": units}
+        for job_id, p in zip(result.scalars().all(), planned) if len(p["units"]) > 1
+        for order_id, units in p["units"]
+    ]
+    await session.execute(insert(JobOrder), links)
+    return len(rows)
+
+
+async def job_order_ids(session, job: Job) -> List[int]:
+    """The orders a job prints units for."""
+    if (job.copies or 1) > 1:
+        result = await session.execute(select(JobOrder.order_id).where(JobOrder.job_id == job.id))
+        linked = result.scalars().all()
+        if linked:
+            return list(linked)
+    return [job.order_id]
+
+
+async def completed_order_ids(session, job: Job) -> List[int]:
+    """Orders of a finished job that have no other unfinished job left."""
+    order_ids = await job_order_ids(session, job)
+    unfinished = union(
+        select(Job.order_id).where(
+            col(Job.order_id).in_(order_ids), Job.id != job.id, Job.status != JobStatusEnum.FINISHED),
+        select(JobOrder.order_id).join(Job, Job.id == JobOrder.job_id).where(
+            col(JobOrder.order_id).in_(order_ids), Job.id != job.id, Job.status != JobStatusEnum.FINISHED),
+    )
+    pending = set((await session.execute(unfinished)).scalars().all())
+    return [order_id for order_id in order_ids if order_id not in pending]
+
+
+def print_variant(job: Job, product: Product) -> Product:
+    """The product as this job prints it: its batched variant's file metadata for multi-copy jobs."""
+    if (job.copies or 1) > 1 and product.batch_file_path_3mf and job.gcode_path == product.batch_file_path_3mf:
+        return Product(
+            id=product.id, name=product.name, sku=product.sku,
+            file_path_3mf=product.batch_file_path_3mf,
+            required_filament_type=product.required_filament_type,
+            required_filament_color=product.required_filament_color,
+            file_md5=product.batch_file_md5,
+            plates=product.batch_plates,
+        )
+    return product
@@ -0,0 +1,126 @@
+import logging
+import math
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Set
+
+from sqlalchemy import and_, delete, func, or_, update
+from sqlmodel import select, col
+
+from models import Printer, Job, JobStatusEnum, DispatcherNode
+
+logger = logging.getLogger("Leases")
+
+# Seconds a printer lease lasts without renewal. Set > 0 when running several dispatchers
+# (main_daemon.py instances) against one database; 0 = single dispatcher, no leases.
+PRINTER_LEASE_TTL = float(os.getenv("PRINTER_LEASE_TTL", "0"))
+
+# Must be unique per running dispatcher
+DISPATCHER_ID = os.getenv("DISPATCHER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def leases_enabled() -> bool:
+    return PRINTER_LEASE_TTL > 0
+
+
+def leased_by_us(now: datetime):
+    """SQL condition: printer is leased to this dispatcher."""
+    return and_(Printer.lease_owner == DISPATCHER_ID, Printer.lease_expires_at > now)
+
+
+async def renew_leases(session, ttl: float = None, dispatcher_id: str = None) -> Set[str]:
+    """
+    Heartbeats this dispatcher, renews its printer leases and rebalances them:
+    - takes free or expired printers up to a fair share (printers / live dispatchers),
+      locking candidates with FOR UPDATE SKIP LOCKED so two dispatchers never take the same one
+    - releases printers above the share, except those with a job mid-upload
+    Commits. Returns the serials this dispatcher holds.
+    """
+    ttl = PRINTER_LEASE_TTL if ttl is None else ttl
+    dispatcher_id = dispatcher_id or DISPATCHER_ID
+    now = datetime.now()
+    expires = now + timedelta(seconds=ttl)
+
+    node = await session.get(DispatcherNode, dispatcher_id)
+    if node is None:
+        session.add(DispatcherNode(id=dispatcher_id, heartbeat_at=now))
+    else:
+        node.heartbeat_at = now
+    await session.flush()
+
+    live = await session.scalar(
+        select(func.count()).select_from(DispatcherNode)
+        .where(DispatcherNode.heartbeat_at > now - timedelta(seconds=ttl))
+    )
+    total = await session.scalar(select(func.count()).select_from(Printer))
+    share = math.ceil(total / max(live, 1))
+
+    await session.execute(
+        update(Printer)
+        .where(Printer.lease_owner == dispatcher_id)
+        .values(lease_expires_at=expires)
+        .execution_options(synchronize_session=False)
+    )
+    result = await session.execute(select(Printer.serial).where(Printer.lease_owner == dispatcher_id))
+    owned = set(result.scalars().all())
+
+    if len(owned) < share:
+        result = await session.execute(
+            select(Printer.serial)
+            .where(or_(Printer.lease_owner.is_(None), Printer.lease_expires_at <= now))
+            .order_by(Printer.serial)
+            .limit(share - len(owned))
+            .with_for_update(skip_locked=True)
+        )
+        taken = result.scalars().all()
+        if taken:
+            await session.execute(
+                update(Printer)
+                .where(col(Printer.serial).in_(taken))
+                .values(lease_owner=dispatcher_id, lease_expires_at=expires)
+                .execution_options(synchronize_session=False)
+            )
+            owned.update(taken)
+            logger.info(f"{dispatcher_id} leased {len(taken)} printers (now {len(owned)}, share {share}).")
+
+    elif len(owned) > share:
+        uploading = select(Job.assigned_printer_serial).where(
+            Job.status == JobStatusEnum.UPLOADING,
+            Job.assigned_printer_serial.is_not(None)
+        )
+        result = await session.execute(
+            select(Printer.serial)
+            .where(Printer.lease_owner == dispatcher_id, col(Printer.serial).not_in(uploading))
+            .order_by(Printer.serial.desc())
+            .limit(len(owned) - share)
+        )
+        released = result.scalars().all()
+        if released:
+            await _release(session, dispatcher_id, released)
+            owned.difference_update(released)
+            logger.info(f"{dispatcher_id} released {len(released)} printers to other dispatchers (share {share}).")
+
+    # Dispatchers that stopped heartbeating long ago
+    await session.execute(
+        delete(DispatcherNode).where(DispatcherNode.heartbeat_at < now - timedelta(seconds=ttl * 10))
+    )
+    await session.commit()
+    return owned
+
+
+async def _release(session, dispatcher_id: str, serials=None):
+    query = update(Printer).where(Printer.lease_owner == dispatcher_id)
+    if serials is not None:
+        query = query.where(col(Printer.serial).in_(serials))
+    await session.execute(
+        query.values(lease_owner=None, lease_expires_at=None).execution_options(synchronize_session=False)
+    )
+
+
+async def release_leases(session, dispatcher_id: str = None):
+    """Gives up all leases on shutdown, so other dispatchers take over without waiting for expiry."""
+    dispatcher_id = dispatcher_id or DISPATCHER_ID
+    await _release(session, dispatcher_id)
+    await session.execute(delete(DispatcherNode).where(DispatcherNode.id == dispatcher_id))
+    await session.commit()
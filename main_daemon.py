@@ -1,10 +1,16 @@
 
 import asyncio
 import logging
+import os
 import sys
+
+# Pool profile for the daemon process (see database.py); must be set before database is imported
+os.environ.setdefault("DB_POOL_PROFILE", "daemon")
+
 from init_db import init_db
 import worker_service
 import order_service
+import marketplace_sync
 
 # Configure Logging
 logging.basicConfig(
@@ -13,6 +19,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger("MainDaemon")
 
+# Seconds between connection pool metric log lines (0 = off)
+POOL_LOG_INTERVAL = float(os.getenv("DB_POOL_LOG_INTERVAL", "300"))
+
+async def log_pool_status():
+    from database import pool_status
+    while POOL_LOG_INTERVAL > 0:
+        await asyncio.sleep(POOL_LOG_INTERVAL)
+        logger.info(f"DB pool: {pool_status()}")
+
 async def main():
     logger.info("FactoryOS Daemon starting...")
     
@@ -30,7 +45,9 @@ async def main():
     
     await asyncio.gather(
         worker_service.main(),       # The Smart Dispatcher & Printer Manager
-        order_service.run_service_loop() # The Order Generator
+        order_service.run_service_loop(), # The Order Generator
+        marketplace_sync.run_sync_loop(), # Incremental eBay / Etsy order ingest
+        log_pool_status()
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import pandas as pd
+
+from models import PlatformEnum, OrderStatusEnum
+
+logger = logging.getLogger("MarketplaceConnectors")
+
+# Normalized order frame: one row per order, in Order's column names (order_ingest.ingest_dataframe)
+ORDER_COLUMNS = ["platform", "platform_order_id", "sku", "quantity", "purchase_date", "status"]
+CONNECTOR_MAX_RETRIES = 3  # Per request, on 429 / 5xx / connection errors
+# Orders re-read at the start of each page, to find the previous page's last order again
+CONNECTOR_PAGE_OVERLAP = 10
+
+
+def load_env(env_path: str = ".env"):
+    """Simple .env loader to avoid dependencies"""
+    if os.path.exists(env_path):
+        with open(env_path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"): continue
+                if "=" in line:
+                    key, value = line.split("=", 1)
+                    os.environ[key] = value
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart (rate <= 0: unlimited)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+            self._next = max(now, self._next) + self.interval
+
+
+class MarketplaceConnector:
+    """
+    One marketplace's order API, as used by marketplace_sync:
+    fetch_page() returns the raw orders modified in a window plus a continuation token,
+    normalize() turns them into the shared order frame, and the token is checkpointed
+    in the platform's SyncCursor between pages.
+    Requests share a per-connector rate limit and back off on throttling / transient errors.
+    """
+    platform: PlatformEnum
+    base_url: str
+    page_size: int
+
+    def __init__(self, rate: float, concurrency: int = 1):
+        self.rate_limiter = RateLimiter(rate)
+        self.concurrency = concurrency
+
+    @property
+    def enabled(self) -> bool:
+        """Credentials are configured."""
+        raise NotImplementedError
+
+    def headers(self) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def client(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        """Pooled client; one keep-alive connection per concurrent request."""
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers(),
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            timeout=30,
+            transport=transport
+        )
+
+    async def request(self, client: httpx.AsyncClient, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """GET with rate limiting, retried with exponential backoff (or Retry-After)."""
+        for attempt in range(CONNECTOR_MAX_RETRIES + 1):
+            await self.rate_limiter.wait()
+            try:
+                response = await client.get(path, params=params)
+            except httpx.TransportError:
+                if attempt == CONNECTOR_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+                continue
+            if (response.status_code == 429 or response.status_code >= 500) and attempt < CONNECTOR_MAX_RETRIES:
+                retry_after = response.headers.get("Retry-After", "")
+                logger.warning(f"{self.platform.value} API returned {response.status_code}, retrying.")
+                await asyncio.sleep(float(retry_after) if retry_after.isdigit() else 0.5 * 2 ** attempt)
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    async def list_orders(self, client: httpx.AsyncClient, window_start: datetime, window_end: datetime,
+                          offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """One offset page of the raw orders modified in [window_start, window_end] (UTC), and their total."""
+        raise NotImplementedError
+
+    def order_id(self, order: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    async def fetch_page(self, client: httpx.AsyncClient, window_start: datetime, window_end: datetime,
+                         continuation: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Raw orders of the window not returned by earlier pages, and the next token (None = last page).
+        The window is fixed but its contents are not: an order modified during the sync leaves it,
+        and every later order moves up one offset. So each page re-reads CONNECTOR_PAGE_OVERLAP
+        orders and continues after the previous page's last order ("<offset>:<order id>");
+        if that order is not among them, the window is paged again from the start
+        (orders already stored are skipped by the bulk insert).
+        """
+        offset, anchor = 0, None
+        if continuation:
+            offset_text, _, anchor = continuation.partition(":")
+            offset = int(offset_text)
+        start = max(offset - min(CONNECTOR_PAGE_OVERLAP, self.page_size - 1), 0) if anchor else offset
+
+        orders, total = await self.list_orders(client, window_start, window_end, start)
+        new_orders = orders
+        if anchor:
+            ids = [self.order_id(o) for o in orders]
+            if anchor in ids:
+                new_orders = orders[ids.index(anchor) + 1:]
+            elif start > 0:
+                logger.warning(f"{self.platform.value} orders moved more than {offset - start} places during "
+                               f"the sync; paging the window again.")
+                start = 0
+                orders, total = await self.list_orders(client, window_start, window_end, 0)
+                new_orders = orders
+
+        next_offset = start + len(orders)
+        if not orders or next_offset >= total:
+            return new_orders, None
+        return new_orders, f"{next_offset}:{self.order_id(orders[-1])}"
+
+    def normalize(self, orders: List[Dict[str, Any]]) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def _frame(self, order_ids: pd.Series, skus: pd.Series, quantities: pd.Series, purchase_dates: pd.Series) -> pd.DataFrame:
+        """The shared order frame from per-line-item columns (purchase_dates: tz-aware UTC)."""
+        df = pd.DataFrame({
+            "platform": self.platform.value,
+            "platform_order_id": order_ids.astype(str),
+            "sku": skus.mask(skus == "").fillna("UNKNOWN_SKU").astype(str),
+            "quantity": pd.to_numeric(quantities, errors="coerce").fillna(1).astype(int),
+            # Naive local time like the rest of the DB
+            "purchase_date": purchase_dates.dt.tz_convert(datetime.now().astimezone().tzinfo).dt.tz_localize(None)
+                                           .fillna(pd.Timestamp(datetime.now())),
+            "status": OrderStatusEnum.OPEN.value,
+        }, columns=ORDER_COLUMNS)
+
+        # Orders keep their first line item (platform_order_id is unique per order)
+        deduped = df.drop_duplicates("platform_order_id", keep="first")
+        if len(deduped) < len(df):
+            logger.warning(f"Ignored {len(df) - len(deduped)} additional line items of multi-item {self.platform.value} orders.")
+        return deduped.reset_index(drop=True)
+
+
+class EbayConnector(MarketplaceConnector):
+    """
+    eBay Fulfillment API getOrders, filtered by lastmodifieddate, offset pagination.
+    Docs: https://developer.ebay.com/api-docs/sell/fulfillment/resources/order/methods/getOrders
+    """
+    platform = PlatformEnum.EBAY
+    orders_path = "/sell/fulfillment/v1/order"
+    page_size = 200  # getOrders maximum
+
+    def __init__(self):
+        super().__init__(rate=float(os.getenv("EBAY_RATE_LIMIT", "10")),
+                         concurrency=int(os.getenv("EBAY_FETCH_CONCURRENCY", "4")))
+        self.user_token = os.getenv("EBAY_USER_TOKEN")
+        self.base_url = "https://api.sandbox.ebay.com" if os.getenv("EBAY_ENV", "SANDBOX") == "SANDBOX" else "https://api.ebay.com"
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.user_token)
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.user_token}",
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+
+    @staticmethod
+    def _time(value: datetime) -> str:
+        # 2024-12-25T10:00:00.000Z
+        return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+    async def list_orders(self, client, window_start, window_end, offset):
+        page = await self.request(client, self.orders_path, {
+            "filter": f"lastmodifieddate:[{self._time(window_start)}..{self._time(window_end)}]",
+            "limit": self.page_size,
+            "offset": offset,
+        })
+        return page.get("orders", []), int(page.get("total", 0))
+
+    def order_id(self, order):
+        return str(order.get("orderId"))
+
+    def normalize(self, orders):
+        orders = [o for o in orders if o.get("lineItems")]
+        if not orders:
+            return pd.DataFrame(columns=ORDER_COLUMNS)
+        items = pd.json_normalize(orders, record_path="lineItems", meta=["orderId", "creationDate"])
+        items = items.reindex(columns=["orderId", "creationDate", "sku", "quantity"])
+        # ISO 8601 from eBay: 2024-12-25T10:00:00.000Z
+        dates = pd.to_datetime(items["creationDate"], utc=True, errors="coerce", format="ISO8601")
+        return self._frame(items["orderId"], items["sku"], items["quantity"], dates)
+
+
+class EtsyConnector(MarketplaceConnector):
+    """
+    Etsy Open API v3 getShopReceipts, filtered by min/max_last_modified, offset pagination.
+    Docs: https://developers.etsy.com/documentation/reference#operation/getShopReceipts
+    """
+    platform = PlatformEnum.ETSY
+    base_url = "https://openapi.etsy.com"
+    page_size = 100  # getShopReceipts maximum
+
+    def __init__(self):
+        # Etsy allows 10 requests/second per app
+        super().__init__(rate=float(os.getenv("ETSY_RATE_LIMIT", "5")))
+        self.api_key = os.getenv("ETSY_API_KEY")
+        self.access_token = os.getenv("ETSY_ACCESS_TOKEN")
+        self.shop_id = os.getenv("ETSY_SHOP_ID")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key and self.access_token and self.shop_id)
+
+    @property
+    def receipts_path(self) -> str:
+        return f"/v3/application/shops/{self.shop_id}/receipts"
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": self.api_key or "",
+            "Authorization": f"Bearer {self.access_token}",
+            "Accept": "application/json"
+        }
+
+    @staticmethod
+    def _epoch(value: datetime) -> int:
+        # Windows are naive UTC
+        return int((value - datetime(1970, 1, 1)).total_seconds())
+
+    async def list_orders(self, client, window_start, window_end, offset):
+        page = await self.request(client, self.receipts_path, {
+            "min_last_modified": self._epoch(window_start),
+            "max_last_modified": self._epoch(window_end),
+            "limit": self.page_size,
+            "offset": offset,
+        })
+        return page.get("results", []), int(page.get("count", 0))
+
+    def order_id(self, order):
+        return str(order.get("receipt_id"))
+
+    def normalize(self, orders):
+        orders = [o for o in orders if o.get("transactions")]
+        if not orders:
+            return pd.DataFrame(columns=ORDER_COLUMNS)
+        items = pd.json_normalize(orders, record_path="transactions", meta=["receipt_id", "create_timestamp"],
+                                  meta_prefix="receipt.")
+        items = items.reindex(columns=["receipt.receipt_id", "receipt.create_timestamp", "sku", "quantity"])
+        dates = pd.to_datetime(pd.to_numeric(items["receipt.create_timestamp"], errors="coerce"), unit="s", utc=True)
+        return self._frame(items["receipt.receipt_id"], items["sku"], items["quantity"], dates)
+
+
+def connectors() -> List[MarketplaceConnector]:
+    """Every known connector, configured from the environment."""
+    return [EbayConnector(), EtsyConnector()]
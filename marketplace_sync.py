@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlmodel import select
+from database import async_session_maker
+from models import PlatformEnum, SyncCursor
+from order_ingest import ingest_dataframe
+
+logger = logging.getLogger("MarketplaceSync")
+
+# Seconds between incremental syncs in main_daemon (0 = off)
+MARKETPLACE_SYNC_INTERVAL = float(os.getenv("MARKETPLACE_SYNC_INTERVAL", "300"))
+# First run (no cursor yet): how far back to fetch
+SYNC_INITIAL_LOOKBACK = timedelta(days=float(os.getenv("SYNC_INITIAL_LOOKBACK_DAYS", "30")))
+# Each window starts this far before the high-water mark, for orders the API indexes late.
+# Re-fetched orders are skipped by the bulk upsert.
+SYNC_OVERLAP = timedelta(seconds=float(os.getenv("SYNC_OVERLAP", "300")))
+
+
+def _utcnow() -> datetime:
+    # Millisecond precision, like the API's filter, so a stored window is exactly what was requested
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+async def lock_cursor(session, platform: PlatformEnum) -> Optional[SyncCursor]:
+    """
+    The platform's cursor row, locked for this transaction (created on first use).
+    None if another process holds it, i.e. is syncing this platform right now.
+    """
+    result = await session.execute(
+        select(SyncCursor).where(SyncCursor.platform == platform).with_for_update(skip_locked=True)
+    )
+    cursor = result.scalars().first()
+    if cursor is None:
+        if await session.get(SyncCursor, platform) is not None:
+            return None
+        cursor = SyncCursor(platform=platform)
+        session.add(cursor)
+    return cursor
+
+
+def _position(cursor: Optional[SyncCursor]) -> tuple:
+    if cursor is None:
+        return None, None, None, None
+    return cursor.last_modified, cursor.window_start, cursor.window_end, cursor.continuation
+
+
+async def sync_connector(connector, client, session_maker=async_session_maker) -> int:
+    """
+    Ingests the connector's orders modified since its cursor's high-water mark, one page per
+    transaction: the page's orders and the advanced cursor commit together, so an
+    interrupted run resumes at the next page. Each page is fetched before the cursor is
+    locked, so no transaction stays open during the HTTP request; a cursor that moved
+    meanwhile means another process is syncing the platform. Returns the number of new orders.
+    """
+    platform = connector.platform.value
+    created = 0
+    while True:
+        async with session_maker() as session:
+            position = _position(await session.get(SyncCursor, connector.platform))
+        last_modified, window_start, window_end, continuation = position
+
+        if window_end is None:
+            # New window: from the high-water mark (minus overlap) up to now
+            window_start = last_modified - SYNC_OVERLAP if last_modified else _utcnow() - SYNC_INITIAL_LOOKBACK
+            window_end = _utcnow()
+
+        orders, next_continuation = await connector.fetch_page(client, window_start, window_end, continuation)
+        frame = connector.normalize(orders)
+
+        async with session_maker() as session:
+            cursor = await lock_cursor(session, connector.platform)
+            if cursor is None or _position(cursor) != position:
+                logger.info(f"{platform} sync already running elsewhere.")
+                return created
+
+            counts = await ingest_dataframe(session, frame)
+            created += counts["created"]
+
+            done = next_continuation is None
+            if done:
+                cursor.last_modified = window_end
+                cursor.window_start = cursor.window_end = None
+            else:
+                cursor.window_start, cursor.window_end = window_start, window_end
+            cursor.continuation = next_continuation
+            cursor.updated_at = datetime.now()
+            session.add(cursor)
+            await session.commit()
+
+        if done:
+            logger.info(f"{platform} sync: {created} new orders, up to date as of {cursor.last_modified} UTC.")
+            return created
+
+
+async def _connector_loop(connector):
+    async with connector.client() as client:
+        while True:
+            try:
+                await sync_connector(connector, client)
+            except Exception as e:
+                logger.error(f"{connector.platform.value} sync failed: {e}")
+            await asyncio.sleep(MARKETPLACE_SYNC_INTERVAL)
+
+
+async def run_sync_loop():
+    """Incremental sync of every configured marketplace connector, concurrently; scheduled by main_daemon."""
+    if MARKETPLACE_SYNC_INTERVAL <= 0:
+        return
+    try:
+        import marketplace_connectors  # Needs pandas
+    except ImportError:
+        logger.warning("pandas not installed; marketplace sync disabled.")
+        return
+
+    marketplace_connectors.load_env()
+    enabled = [c for c in marketplace_connectors.connectors() if c.enabled]
+    if not enabled:
+        logger.info("No marketplace credentials configured; marketplace sync disabled.")
+        return
+
+    logger.info(f"Marketplace sync started for {', '.join(c.platform.value for c in enabled)} "
+                f"(every {MARKETPLACE_SYNC_INTERVAL:.0f}s).")
+    await asyncio.gather(*(_connector_loop(c) for c in enabled))
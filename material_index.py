@@ -0,0 +1,168 @@
+import logging
+from typing import Dict, List, Optional, Tuple, Any
+
+from color_match import COLOR_TOLERANCE, colors_within
+
+logger = logging.getLogger("MaterialIndex")
+
+# (filament type, color) with both normalized; color None = "any color"
+MaterialKey = Tuple[str, Optional[str]]
+
+
+def normalize_type(filament_type: Optional[str]) -> str:
+    return (filament_type or "").strip().lower()
+
+
+def normalize_color(color: Optional[str]) -> Optional[str]:
+    return color.strip().lower() if color else None
+
+
+def parse_slots(ams_data: Optional[List[dict]]) -> List[Tuple[int, str, Optional[str]]]:
+    """
+    Normalizes raw AMS slot dicts once into (slot_idx, type, color) tuples.
+    Same rules as worker_service.check_material_match.
+    """
+    slots = []
+    for slot in ams_data or []:
+        if not isinstance(slot, dict):
+            continue
+        try:
+            slot_idx = int(slot.get('slot', '0'))
+        except (TypeError, ValueError):
+            slot_idx = 0
+        slots.append((slot_idx, normalize_type(slot.get('type', 'UNKNOWN')), normalize_color(slot.get('color'))))
+    return slots
+
+
+class MaterialIndex:
+    """
+    Maps normalized (filament type, color) -> available (printer serial, slot) pairs,
+    so matching a job is a dict lookup instead of a scan over printers x AMS slots.
+
+    - reset() makes the given idle printers available (once per dispatch tick).
+    - remove_printer() takes a printer out when it gets assigned.
+    - update_printer() applies new AMS telemetry incrementally.
+    Parsed slots are cached per serial, so a reset only re-parses printers whose AMS changed.
+
+    With a color tolerance > 0, a requirement also matches buckets of the same type whose
+    color is within that Delta E, closest color first.
+    """
+
+    def __init__(self, color_tolerance: float = COLOR_TOLERANCE):
+        self.color_tolerance = color_tolerance
+        # serial -> (raw ams_data it was parsed from, parsed slots)
+        self._slots: Dict[str, Tuple[Any, List[Tuple[int, str, Optional[str]]]]] = {}
+        # key -> {serial: slot_idx}; dicts keep insertion order = idle printer order
+        self._buckets: Dict[MaterialKey, Dict[str, int]] = {}
+        # Available printers in order (dict used as an ordered set)
+        self._available: Dict[str, None] = {}
+        # Every color seen per type, and the tolerant key lists derived from them
+        self._colors_by_type: Dict[str, set] = {}
+        self._tolerant_keys: Dict[MaterialKey, List[MaterialKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._available)
+
+    def __contains__(self, serial: str) -> bool:
+        return serial in self._available
+
+    def _parsed(self, serial: str, ams_data) -> List[Tuple[int, str, Optional[str]]]:
+        cached = self._slots.get(serial)
+        if cached is not None and cached[0] == ams_data:
+            return cached[1]
+        slots = parse_slots(ams_data)
+        self._slots[serial] = (ams_data, slots)
+        for _, slot_type, slot_color in slots:
+            known = self._colors_by_type.setdefault(slot_type, set())
+            if slot_color and slot_color not in known:
+                known.add(slot_color)
+                self._tolerant_keys.clear()
+        return slots
+
+    def _keys_for(self, req_type: str, req_color: Optional[str]) -> List[MaterialKey]:
+        key = (normalize_type(req_type), normalize_color(req_color))
+        if self.color_tolerance <= 0 or key[1] is None:
+            return [key]
+
+        keys = self._tolerant_keys.get(key)
+        if keys is None:
+            others = sorted(self._colors_by_type.get(key[0], set()) - {key[1]})
+            keys = [key] + [(key[0], color) for color in colors_within(key[1], others, self.color_tolerance)]
+            self._tolerant_keys[key] = keys
+        return keys
+
+    def _add(self, serial: str, slots):
+        self._available[serial] = None
+        for slot_idx, slot_type, slot_color in slots:
+            # First matching slot per printer wins, like the linear scan did
+            self._buckets.setdefault((slot_type, slot_color), {}).setdefault(serial, slot_idx)
+            self._buckets.setdefault((slot_type, None), {}).setdefault(serial, slot_idx)
+
+    def reset(self, printers: list):
+        """Rebuilds the available set from this tick's idle printers."""
+        self._buckets.clear()
+        self._available.clear()
+        for printer in printers:
+            self._add(printer.serial, self._parsed(printer.serial, printer.ams_data))
+
+    def remove_printer(self, serial: str):
+        if serial not in self._available:
+            return
+        del self._available[serial]
+        for slot_idx, slot_type, slot_color in self._slots.get(serial, (None, []))[1]:
+            for key in ((slot_type, slot_color), (slot_type, None)):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.pop(serial, None)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def update_printer(self, serial: str, ams_data) -> bool:
+        """
+        Applies fresh AMS telemetry; re-buckets the printer if it is currently available.
+        Returns whether the loaded materials (slot, type, color) changed, i.e. not just
+        the remaining filament.
+        """
+        cached = self._slots.get(serial)
+        old_slots = cached[1] if cached is not None else None
+        was_available = serial in self._available
+        if was_available:
+            self.remove_printer(serial)
+        slots = self._parsed(serial, ams_data)
+        if was_available:
+            # Note: printer moves to the end of the available order
+            self._add(serial, slots)
+        return slots != old_slots
+
+    def candidates(self, req_type: Optional[str], req_color: Optional[str]) -> Dict[str, int]:
+        """
+        All available printers that can run the material, as {serial: slot_idx}.
+        Returns the live bucket for speed - callers must not modify it.
+        """
+        if not req_type:
+            return {serial: 0 for serial in self._available}
+
+        keys = self._keys_for(req_type, req_color)
+        if len(keys) == 1:
+            return self._buckets.get(keys[0], {})
+
+        merged: Dict[str, int] = {}
+        for key in keys:
+            for serial, slot_idx in self._buckets.get(key, {}).items():
+                merged.setdefault(serial, slot_idx)
+        return merged
+
+    def find(self, req_type: Optional[str], req_color: Optional[str]) -> Optional[Tuple[str, int]]:
+        """
+        Returns (serial, slot_idx) of the first available printer that has the material loaded,
+        or None. No type requirement -> any available printer, slot 0.
+        """
+        if not req_type:
+            for serial in self._available:
+                return serial, 0
+            return None
+
+        for key in self._keys_for(req_type, req_color):
+            for serial, slot_idx in self._buckets.get(key, {}).items():
+                return serial, slot_idx
+        return None
@@ -0,0 +1,52 @@
+import logging
+
+from sqlalchemy import inspect, text
+from sqlmodel import SQLModel
+
+logger = logging.getLogger("Migrations")
+
+
+def _add_missing_columns(sync_conn):
+    """
+    create_all() only creates missing tables. New nullable columns on existing
+    tables are added here, so older databases keep working after a model change.
+    """
+    inspector = inspect(sync_conn)
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                logger.warning(f"Cannot auto-add NOT NULL column {table.name}.{column.name}; migrate manually.")
+                continue
+            ddl_type = column.type.compile(dialect=sync_conn.dialect)
+            logger.info(f"Adding column {table.name}.{column.name} ({ddl_type})")
+            sync_conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {ddl_type}'))
+
+
+def _add_missing_indexes(sync_conn):
+    """
+    create_all() only creates the indexes of new tables. Indexes declared on the
+    models (index=True, __table_args__) but missing from existing tables are created here.
+    Note: plain CREATE INDEX blocks writes to the table while it builds.
+    """
+    inspector = inspect(sync_conn)
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name in existing:
+                continue
+            logger.info(f"Creating index {index.name} on {table.name}")
+            index.create(sync_conn)
+
+
+async def run_migrations(conn):
+    """Creates tables and applies schema upgrades. `conn` is an AsyncConnection (engine.begin())."""
+    await conn.run_sync(SQLModel.metadata.create_all)
+    await conn.run_sync(_add_missing_columns)
+    await conn.run_sync(_add_missing_indexes)
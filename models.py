@@ -1,8 +1,8 @@
 
 from typing import Optional, List
 from datetime import datetime
-from sqlalchemy import JSON, Column
-from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import JSON, Column, Index, bindparam, literal, text
+from sqlmodel import SQLModel, Field, Relationship, col
 from enum import Enum
 
 class PlatformEnum(str, Enum):
@@ -36,15 +36,27 @@ class JobStatusEnum(str, Enum):
 
 class Order(SQLModel, table=True):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Job creation (OPEN orders, oldest first) and listing by status
+        Index("ix_orders_status_purchase_date", "status", "purchase_date"),
+        # Keyset pagination of GET /orders, and its incremental `since` mode
+        Index("ix_orders_purchase_date_id", "purchase_date", "id"),
+        Index("ix_orders_updated_at_id", "updated_at", "id"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     platform: PlatformEnum
     platform_order_id: str = Field(unique=True, index=True)
-    sku: str
+    sku: str = Field(index=True)
     quantity: int
     purchase_date: datetime
     status: OrderStatusEnum = Field(default=OrderStatusEnum.OPEN)
     error_message: Optional[str] = None
+    # Set on insert and on every UPDATE (ORM or Core), for incremental fetches
+    updated_at: Optional[datetime] = Field(
+        default_factory=datetime.now,
+        sa_column_kwargs={"default": datetime.now, "onupdate": datetime.now}
+    )
     
     jobs: List["Job"] = Relationship(back_populates="order")
 
@@ -56,7 +68,7 @@ class Printer(SQLModel, table=True):
     ip_address: Optional[str] = None
     access_code: Optional[str] = None
     type: PrinterTypeEnum
-    current_status: PrinterStatusEnum = Field(default=PrinterStatusEnum.IDLE)
+    current_status: PrinterStatusEnum = Field(default=PrinterStatusEnum.IDLE, index=True)
     current_temp_nozzle: float = Field(default=0.0)
     current_temp_bed: float = Field(default=0.0)
     
@@ -66,23 +78,56 @@ class Printer(SQLModel, table=True):
     # Stores AMS state as JSON
     # Example: [{"slot": 0, "type": "PLA", "color": "#FF0000", "remaining": 100}, ...]
     ams_data: List[dict] = Field(default=[], sa_column=Column(JSON))
+
+    # Dispatcher allowed to assign jobs to this printer (multi-dispatcher mode, see leases.py)
+    lease_owner: Optional[str] = Field(default=None)
+    lease_expires_at: Optional[datetime] = Field(default=None)
     
     jobs: List["Job"] = Relationship(back_populates="assigned_printer")
 
 class Job(SQLModel, table=True):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Dispatch: PENDING jobs, oldest first
+        Index("ix_jobs_pending_created_at", "created_at",
+              postgresql_where=text("status = 'PENDING'"), sqlite_where=text("status = 'PENDING'")),
+        # Telemetry flush / pre-staging / leases: the active job of a printer
+        Index("ix_jobs_active_printer_status", "assigned_printer_serial", "status",
+              postgresql_where=text("status IN ('PRINTING', 'UPLOADING')"),
+              sqlite_where=text("status IN ('PRINTING', 'UPLOADING')")),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    order_id: int = Field(foreign_key="orders.id")
+    order_id: int = Field(foreign_key="orders.id", index=True)
     assigned_printer_serial: Optional[str] = Field(default=None, foreign_key="printers.serial")
     gcode_path: str
     status: JobStatusEnum = Field(default=JobStatusEnum.PENDING)
     error_message: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.now)
+    # Units this job prints: > 1 for a batched multi-copy plate (None on older rows = 1)
+    copies: Optional[int] = Field(default=1)
 
     order: Optional[Order] = Relationship(back_populates="jobs")
     assigned_printer: Optional[Printer] = Relationship(back_populates="jobs")
 
+# Filters matching the partial indexes above. The statuses are rendered into the SQL
+# (literal_execute) rather than bound: the planner only uses a partial index if the query
+# implies its predicate, which a parameter does not once PostgreSQL switches asyncpg's
+# prepared statements to a generic plan.
+JOB_IS_PENDING = col(Job.status) == literal(JobStatusEnum.PENDING, Job.__table__.c.status.type, literal_execute=True)
+JOB_IS_ACTIVE = col(Job.status).in_(
+    bindparam("active_job_statuses", [JobStatusEnum.PRINTING, JobStatusEnum.UPLOADING],
+              type_=Job.__table__.c.status.type, expanding=True, literal_execute=True))
+
+class JobOrder(SQLModel, table=True):
+    __tablename__ = "job_orders"
+
+    # Orders a batched job prints units for, when it covers more than one order.
+    # Single-order jobs only have Job.order_id (which is also the first row here otherwise).
+    job_id: int = Field(foreign_key="jobs.id", primary_key=True)
+    order_id: int = Field(foreign_key="orders.id", primary_key=True, index=True)
+    units: int
+
 class Product(SQLModel, table=True):
     __tablename__ = "products"
 
@@ -96,4 +141,40 @@ class Product(SQLModel, table=True):
     required_filament_type: str = Field(default="PLA") # e.g. PLA, PETG, ABS
     required_filament_color: Optional[str] = Field(default=None) # Hex Code or Name, e.g. "#FF0000"
 
+    # 3MF Metadata (parsed once at upload, see three_mf.py)
+    # plates example: [{"index": 1, "gcode_path": "Metadata/plate_1.gcode", "gcode_md5": "...",
+    #                   "print_time_s": 755, "filament_g": 0.59, "filaments": [{"type": "PLA", "color": "#FFFFFF", ...}]}]
+    file_md5: Optional[str] = Field(default=None)
+    plate_count: Optional[int] = Field(default=None)
+    plates: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON))
+    estimated_print_time: Optional[int] = Field(default=None) # Seconds, all plates
+    filament_grams: Optional[float] = Field(default=None) # All plates
+
+    # Batched variant: a 3MF whose plate holds batch_copies of the product (same material).
+    # job_planner.py merges pending units of this SKU onto it, across orders.
+    batch_file_path_3mf: Optional[str] = Field(default=None)
+    batch_copies: Optional[int] = Field(default=None)
+    batch_file_md5: Optional[str] = Field(default=None)
+    batch_plates: Optional[List[dict]] = Field(default=None, sa_column=Column(JSON))
+
     created_at: datetime = Field(default_factory=datetime.now)
+
+class DispatcherNode(SQLModel, table=True):
+    __tablename__ = "dispatchers"
+
+    # Running dispatcher processes, for splitting printer leases fairly
+    id: str = Field(primary_key=True)
+    heartbeat_at: datetime = Field(default_factory=datetime.now)
+
+class SyncCursor(SQLModel, table=True):
+    __tablename__ = "sync_cursors"
+
+    # Incremental marketplace sync position, one row per platform (marketplace_sync.py).
+    # Times are UTC, as the marketplace APIs filter on them.
+    platform: PlatformEnum = Field(primary_key=True)
+    last_modified: Optional[datetime] = Field(default=None)  # High-water mark: orders modified up to here are ingested
+    # Window being ingested; set while a sync is in progress, so an interrupted run resumes it
+    window_start: Optional[datetime] = Field(default=None)
+    window_end: Optional[datetime] = Field(default=None)
+    continuation: Optional[str] = Field(default=None)  # Connector's next-page token within the window
+    updated_at: datetime = Field(default_factory=datetime.now)
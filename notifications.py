@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import Callable
+
+from sqlmodel import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import engine, DATABASE_URL
+
+logger = logging.getLogger("Notifications")
+
+# Postgres LISTEN/NOTIFY channels shared between the API and the daemon process.
+DISPATCH_CHANNEL = "factoryos_dispatch"
+PRODUCT_CHANNEL = "factoryos_products"
+PRINTER_CHANNEL = "factoryos_printers"  # Payload: comma-separated serials, "" = all printers
+ORDER_CHANNEL = "factoryos_orders"  # Any order row written
+
+# NOTIFY payloads must stay below 8000 bytes
+MAX_PAYLOAD = 7900
+
+
+def notifications_supported() -> bool:
+    """LISTEN/NOTIFY only exists on Postgres (SQLite dev setups just skip it)."""
+    return engine.dialect.name == "postgresql"
+
+
+async def notify(session: AsyncSession, channel: str, payload: str = "") -> None:
+    """
+    Queues a NOTIFY on the session's transaction.
+    Postgres delivers it on COMMIT, so listeners never see rows that were rolled back.
+    """
+    bind = session.bind or engine  # The session's own database, which may not be the default engine's
+    if bind.dialect.name != "postgresql":
+        return
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": payload}
+    )
+
+
+async def notify_printers(session: AsyncSession, serials) -> None:
+    """Tells API workers which printer rows this transaction changed (see printer_stream.py)."""
+    payload = ",".join(sorted(serials))
+    if len(payload) > MAX_PAYLOAD:
+        payload = ""  # Too many to list -> listeners reload all printers
+    await notify(session, PRINTER_CHANNEL, payload)
+
+
+async def listen(channel: str, callback: Callable[[str], None]):
+    """
+    Long-running task: LISTENs on `channel` with a dedicated asyncpg connection
+    and calls `callback(payload)` for every notification. Reconnects with backoff.
+    """
+    if not notifications_supported():
+        logger.info(f"LISTEN {channel} disabled (database is not Postgres).")
+        return
+
+    import asyncpg
+
+    # asyncpg wants a plain DSN without the SQLAlchemy driver suffix
+    dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    def _on_notification(connection, pid, ch, payload):
+        try:
+            callback(payload)
+        except Exception as e:
+            logger.error(f"Listener callback for {ch} failed: {e}")
+
+    retry_delay = 1
+    max_delay = 30
+
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn)
+            await conn.add_listener(channel, _on_notification)
+            logger.info(f"Listening on channel '{channel}'")
+            retry_delay = 1
+
+            # Catch up on anything we may have missed while disconnected
+            callback("reconnect")
+
+            # Keep the connection alive; asyncpg dispatches notifications on its own.
+            while not conn.is_closed():
+                await asyncio.sleep(15)
+                await conn.execute("SELECT 1")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"LISTEN {channel} error: {e}. Reconnecting in {retry_delay}s...")
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, max_delay)
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
@@ -0,0 +1,161 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Set
+
+from pydantic import ValidationError
+from sqlalchemy import any_, bindparam, String
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import select, col
+
+import product_cache
+from models import Order, OrderStatusEnum
+from job_planner import plan_jobs, add_planned_jobs
+from notifications import notify, DISPATCH_CHANNEL, ORDER_CHANNEL
+
+logger = logging.getLogger("OrderIngest")
+
+# Rows per INSERT statement (8 columns -> 8000 bind parameters, below asyncpg's 32767)
+ORDER_INGEST_CHUNK = 1000
+
+# Fields a client may set; id / updated_at are the database's
+ORDER_INPUT_FIELDS = ("platform", "platform_order_id", "sku", "quantity", "purchase_date", "status", "error_message")
+
+
+def _upsert_insert(session):
+    """INSERT construct with ON CONFLICT support for the session's database."""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise RuntimeError(f"Bulk order ingest does not support {dialect}")
+    return dialect_insert(Order)
+
+
+def _naive(value: datetime) -> datetime:
+    # Columns are timezone-naive local time (datetime.now()); asyncpg rejects aware values
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+
+async def ingest_orders(session, payloads: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Inserts many orders at once. Per chunk, one INSERT ... ON CONFLICT (platform_order_id)
+    DO NOTHING RETURNING adds the new orders and skips known ones, and one multi-row INSERT
+    adds the PENDING jobs (job_planner) of each new OPEN order whose SKU has a product
+    (the order becomes QUEUED).
+    Returns one result per payload, in order:
+    {"index", "platform_order_id", "result": "created" | "duplicate" | "invalid", "order_id", "job_created", "error"}
+    Queues the dispatch/order notifications; caller commits.
+    """
+    results: List[Dict[str, Any]] = [None] * len(payloads)
+    valid = []  # (index, Order)
+    seen = set()
+
+    for index, payload in enumerate(payloads):
+        platform_order_id = payload.get("platform_order_id") if isinstance(payload, dict) else None
+        result = {"index": index, "platform_order_id": platform_order_id, "result": "invalid",
+                  "order_id": None, "job_created": False, "error": None}
+        results[index] = result
+        try:
+            if not isinstance(payload, dict):
+                raise TypeError("Order must be an object")
+            order = Order.model_validate({k: payload[k] for k in ORDER_INPUT_FIELDS if k in payload})
+        except (ValidationError, TypeError) as e:
+            result["error"] = str(e)
+            continue
+        if order.platform_order_id in seen:
+            result.update(result="duplicate", error="Duplicate platform_order_id in request")
+            continue
+        seen.add(order.platform_order_id)
+        valid.append((index, order))
+
+    products = await product_cache.get_products_by_sku(session)
+    now = datetime.now()
+    created = 0
+
+    for start in range(0, len(valid), ORDER_INGEST_CHUNK):
+        chunk = valid[start:start + ORDER_INGEST_CHUNK]
+        rows = []
+        for _, order in chunk:
+            queue = order.status == OrderStatusEnum.OPEN and order.sku in products
+            rows.append({
+                "platform": order.platform,
+                "platform_order_id": order.platform_order_id,
+                "sku": order.sku,
+                "quantity": order.quantity,
+                "purchase_date": _naive(order.purchase_date),
+                "status": OrderStatusEnum.QUEUED if queue else order.status,
+                "error_message": order.error_message,
+                "updated_at": now,
+            })
+
+        statement = (
+            _upsert_insert(session)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["platform_order_id"])
+            .returning(Order.id, Order.platform_order_id)
+        )
+        result = await session.execute(statement)
+        inserted = {platform_order_id: order_id for order_id, platform_order_id in result.all()}
+
+        to_plan = []
+        for (index, order), row in zip(chunk, rows):
+            order_id = inserted.get(order.platform_order_id)
+            if order_id is None:
+                results[index].update(result="duplicate", error="Order already exists")
+                continue
+            results[index].update(result="created", order_id=order_id)
+            if row["status"] == OrderStatusEnum.QUEUED:
+                to_plan.append((order_id, order.sku, order.quantity))
+                results[index]["job_created"] = True
+        # One job per unit; full batches of a SKU within the chunk share a batched plate
+        await add_planned_jobs(session, plan_jobs(to_plan, products), now)
+        created += len(inserted)
+
+    if created:
+        # Wake the dispatcher and the API response caches (delivered on commit)
+        await notify(session, DISPATCH_CHANNEL, f"bulk {created} orders")
+        await notify(session, ORDER_CHANNEL)
+    logger.info(f"Ingested {len(payloads)} orders: {created} created, {len(payloads) - created} skipped.")
+    return results
+
+
+async def existing_order_ids(session, platform_order_ids: List[str]) -> Set[str]:
+    """Which of these platform_order_ids are already stored: one = ANY(:ids) query on Postgres."""
+    if not platform_order_ids:
+        return set()
+    if session.bind.dialect.name == "postgresql":
+        ids = bindparam("ids", platform_order_ids, type_=ARRAY(String))
+        result = await session.execute(select(Order.platform_order_id).where(Order.platform_order_id == any_(ids)))
+        return set(result.scalars().all())
+
+    existing = set()
+    for start in range(0, len(platform_order_ids), ORDER_INGEST_CHUNK):
+        chunk = platform_order_ids[start:start + ORDER_INGEST_CHUNK]
+        result = await session.execute(select(Order.platform_order_id).where(col(Order.platform_order_id).in_(chunk)))
+        existing.update(result.scalars().all())
+    return existing
+
+
+async def ingest_dataframe(session, df) -> Dict[str, int]:
+    """
+    Inserts a normalized order frame's new orders (and their jobs) in bulk: the shared path
+    of every marketplace connector (marketplace_connectors.ORDER_COLUMNS). Returns counts; caller commits.
+    """
+    if df.empty:
+        return {"created": 0, "existing": 0}
+
+    existing = await existing_order_ids(session, df["platform_order_id"].tolist())
+    new = df[~df["platform_order_id"].isin(existing)]
+
+    payloads = [
+        {"platform": platform, "platform_order_id": order_id, "sku": sku, "quantity": quantity,
+         "purchase_date": purchase_date.to_pydatetime(), "status": status}
+        for platform, order_id, sku, quantity, purchase_date, status in zip(
+            new["platform"], new["platform_order_id"], new["sku"], new["quantity"].tolist(),
+            new["purchase_date"], new["status"])
+    ]
+    results = await ingest_orders(session, payloads)
+    created = sum(1 for r in results if r["result"] == "created")
+    return {"created": created, "existing": len(df) - created}
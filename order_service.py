@@ -6,6 +6,8 @@ from datetime import datetime
 from sqlmodel import select, func
 from database import async_session_maker
 from models import Order, Product, OrderStatusEnum, PlatformEnum
+from notifications import notify, DISPATCH_CHANNEL, ORDER_CHANNEL
+from worker_service import request_dispatch
 
 # Configure Logging
 logging.basicConfig(
@@ -40,10 +42,17 @@ async def create_dummy_order():
         )
         
         session.add(new_order)
+        await session.flush()
+        # Wake dispatchers in other processes and the API response caches (delivered on commit)
+        await notify(session, DISPATCH_CHANNEL, f"order {new_order.id}")
+        await notify(session, ORDER_CHANNEL)
         await session.commit()
         await session.refresh(new_order)
         logger.info(f"New Order created: ID {new_order.id} for SKU {product.sku}")
 
+    # ...and the one in this process (main_daemon), which also covers SQLite without NOTIFY
+    request_dispatch(f"order {new_order.id}")
+
 async def run_service_loop():
     """Simulates incoming orders"""
     logger.info("Order Service (Async) started.")
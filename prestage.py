@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from bambu_client import BambuPrinterClient, content_addressed_path
+from material_index import MaterialIndex
+from three_mf import file_md5
+
+logger = logging.getLogger("Prestage")
+
+# Start uploading a busy printer's predicted next job this many minutes before its print ends.
+# 0 disables pre-staging.
+PRESTAGE_LEAD_TIME = int(os.getenv("PRESTAGE_LEAD_MINUTES", "10"))
+PRESTAGE_QUEUE_WINDOW = 500  # Pending jobs considered per planning pass (oldest first)
+# A file that failed to stage on a printer is retried after this many seconds, doubling per failure
+PRESTAGE_RETRY_BASE = 30
+PRESTAGE_RETRY_MAX = 900
+
+
+def predict_next_jobs(busy_printers: list, pending: List[tuple]) -> Dict[str, tuple]:
+    """
+    Guesses which pending job each busy printer will get once it finishes.
+    Mirrors greedy dispatch: printers free up in order of remaining_time and the
+    oldest job takes the first compatible one.
+    `pending` = [(job, product)] oldest first. Returns {serial: (job, product)}.
+    """
+    index = MaterialIndex()
+    index.reset(sorted(busy_printers, key=lambda p: p.remaining_time))
+
+    predictions = {}
+    for job, product in pending:
+        if not index:
+            break
+        match = index.find(product.required_filament_type, product.required_filament_color)
+        if match is None:
+            continue
+        serial, _ = match
+        predictions[serial] = (job, product)
+        index.remove_printer(serial)
+    return predictions
+
+
+class StagedFile:
+    """A predicted job's 3MF being (or already) uploaded to a busy printer."""
+
+    def __init__(self, job_id: int, local_path: str, md5: Optional[str] = None):
+        self.job_id = job_id
+        self.local_path = local_path
+        self.md5 = md5
+        self.remote_path: Optional[str] = None
+        # Resolves to the remote path, or None if staging failed
+        self.task: Optional[asyncio.Task] = None
+
+    def matches(self, local_path: str, md5: Optional[str]) -> bool:
+        return self.local_path == local_path or (md5 is not None and self.md5 == md5)
+
+
+class PrestageScheduler:
+    """
+    Keeps at most one pre-staged file per busy printer.
+
+    - apply() is fed fresh predictions each dispatch pass: new ones start a background
+      upload, stale ones are cancelled (in flight) or deleted from the SD card (done).
+    - take() hands the staging task to the dispatcher when the printer gets its job,
+      so the upload is skipped (or joined, if still running).
+    Files a printer is printing from are never evicted, and eviction waits for
+    dispatch_lock(), so it cannot delete a file between a dispatch's upload check and
+    mark_in_use().
+    A failed staging is not retried for the same printer and file until its backoff
+    expires, so an unreachable printer is not hit with an upload every pass.
+    """
+
+    def __init__(self, port: int = 990):
+        self.port = port
+        self.staged: Dict[str, StagedFile] = {}
+        # serial -> remote path of the file it was last started with
+        self.in_use: Dict[str, str] = {}
+        self._dispatch_locks: Dict[str, asyncio.Lock] = {}
+        # serial -> (failed StagedFile, consecutive failures, monotonic time of next attempt)
+        self._failures: Dict[str, Tuple[StagedFile, int, float]] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def apply(self, predictions: Dict[str, tuple], clients: Dict[str, BambuPrinterClient]):
+        for serial in list(self.staged):
+            staged = self.staged[serial]
+            prediction = predictions.get(serial)
+            if prediction is None or not staged.matches(prediction[0].gcode_path, prediction[1].file_md5):
+                logger.info(f"Pre-staged job {staged.job_id} on {serial} is no longer predicted.")
+                self.discard(clients.get(serial), serial)
+            elif staged.task.done() and staged.task.result() is None:
+                del self.staged[serial]  # Failed: retried below once the backoff expires
+                self._record_failure(serial, staged)
+
+        for serial, (job, product) in predictions.items():
+            client = clients.get(serial)
+            if serial in self.staged or client is None:
+                continue
+            failure = self._failures.get(serial)
+            if failure is not None and failure[0].matches(job.gcode_path, product.file_md5):
+                if time.monotonic() < failure[2]:
+                    continue
+            logger.info(f"Pre-staging job {job.id} ({job.gcode_path}) on {serial}.")
+            staged = StagedFile(job.id, job.gcode_path, product.file_md5)
+            staged.task = asyncio.create_task(self._stage(client, staged))
+            self.staged[serial] = staged
+
+    def take(self, client: BambuPrinterClient, local_path: str, md5: Optional[str] = None) -> Optional[asyncio.Task]:
+        """
+        Called when a job is dispatched to the client's printer. Returns the staging task
+        if it covers this job's file; staging of any other file is cancelled/evicted.
+        """
+        staged = self.staged.get(client.serial)
+        if staged is None:
+            return None
+        if not staged.matches(local_path, md5):
+            self.discard(client, client.serial)
+            return None
+        del self.staged[client.serial]
+        return staged.task
+
+    def dispatch_lock(self, serial: str) -> asyncio.Lock:
+        """Held by the dispatcher from ensuring a job's file is on the printer until mark_in_use()."""
+        return self._dispatch_locks.setdefault(serial, asyncio.Lock())
+
+    def mark_in_use(self, serial: str, remote_path: str):
+        self.in_use[serial] = remote_path
+
+    def discard(self, client: Optional[BambuPrinterClient], serial: str):
+        staged = self.staged.pop(serial, None)
+        if staged is None:
+            return
+        if not staged.task.done():
+            staged.task.cancel()  # _stage removes the partial upload
+        elif staged.task.result() and client is not None:
+            self._spawn(self._evict(client, staged.task.result()))
+
+    def cancel_all(self):
+        for staged in self.staged.values():
+            if not staged.task.done():
+                staged.task.cancel()
+        self.staged.clear()
+
+    def _record_failure(self, serial: str, staged: StagedFile):
+        previous = self._failures.get(serial)
+        attempts = 1
+        if previous is not None and previous[0].matches(staged.local_path, staged.md5):
+            attempts = previous[1] + 1
+        delay = min(PRESTAGE_RETRY_BASE * 2 ** (attempts - 1), PRESTAGE_RETRY_MAX)
+        logger.info(f"Retrying pre-staging of job {staged.job_id} on {serial} in {delay}s.")
+        self._failures[serial] = (staged, attempts, time.monotonic() + delay)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _evict(self, client: BambuPrinterClient, remote_path: str):
+        async with self.dispatch_lock(client.serial):
+            # A dispatch that got the lock first may have started printing this file
+            if remote_path == self.in_use.get(client.serial):
+                return
+            try:
+                await client.delete_file(remote_path, port=self.port)
+            except Exception as e:
+                logger.warning(f"Could not evict {remote_path} from {client.serial}: {e}")
+
+    async def _stage(self, client: BambuPrinterClient, staged: StagedFile) -> Optional[str]:
+        try:
+            if staged.md5 is None:
+                staged.md5 = await asyncio.to_thread(file_md5, staged.local_path)
+            staged.remote_path = content_addressed_path(staged.md5)
+            # Making room on the SD card must not delete what the printer is printing
+            in_use = self.in_use.get(client.serial)
+            await client.ensure_uploaded(staged.local_path, md5=staged.md5, port=self.port,
+                                         keep=[in_use] if in_use else [])
+            logger.info(f"Job {staged.job_id} staged on {client.serial} as {staged.remote_path}.")
+            self._failures.pop(client.serial, None)
+            return staged.remote_path
+        except asyncio.CancelledError:
+            if staged.remote_path:
+                # Queued behind the aborted transfer on the printer's pool
+                self._spawn(self._evict(client, staged.remote_path))
+            raise
+        except Exception as e:
+            logger.warning(f"Pre-staging job {staged.job_id} on {client.serial} failed: {e}")
+            return None
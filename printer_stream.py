@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from sqlmodel import select, col
+
+from models import Printer
+from notifications import notifications_supported
+from telemetry import TelemetryState
+
+logger = logging.getLogger("PrinterStream")
+
+# Without LISTEN/NOTIFY (SQLite) the stream re-reads all printers this often (seconds)
+STREAM_POLL_INTERVAL = float(os.getenv("STREAM_POLL_INTERVAL", "2"))
+# With NOTIFY, a full re-read still runs this often in case a notification was missed
+STREAM_RESYNC_INTERVAL = float(os.getenv("STREAM_RESYNC_INTERVAL", "30"))
+# Dispatcher bookkeeping, not printer state (renewed every few seconds with leases enabled)
+STREAM_EXCLUDE = {"lease_owner", "lease_expires_at"}
+STREAM_KEEPALIVE = 15.0  # Seconds between SSE comments on an idle stream (keeps proxies from closing it)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class PrinterStream:
+    """
+    Printer state shared by every /stream/printers client of this API worker.
+
+    One refresh task reads the printers table (only the rows named in a
+    PRINTER_CHANNEL notification passed to on_notification(), or everything on resync/poll) into a
+    TelemetryState. Each client gets a snapshot, then field-level deltas via
+    deltas_since(), so the DB load does not grow with the number of open dashboards.
+    """
+
+    def __init__(self, session_maker):
+        self.session_maker = session_maker
+        self.state = TelemetryState(deadbands={})
+        self.generation = 0  # Bumped when printers are removed -> clients get a fresh snapshot
+        self.refreshes = 0
+        self._pending: Set[str] = set()
+        self._pending_all = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._started: Optional[asyncio.Future] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Loads the first snapshot and starts the refresh task (once, on first use)."""
+        if self._started is None:
+            self._started = asyncio.get_running_loop().create_future()
+            self._wakeup = asyncio.Event()
+            self._pending.clear()  # Notifications from before the first client; covered by the full read
+            try:
+                await self.refresh()
+            except Exception as e:
+                self._started.set_exception(e)
+                self._started = None
+                raise
+            self._tasks.append(asyncio.create_task(self._refresh_loop()))
+            self._started.set_result(True)
+        await self._started
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        self._started = None
+
+    def on_notification(self, payload: str):
+        """PRINTER_CHANNEL listener (wired up in main.py)."""
+        # "" = everything; "reconnect" = listener came back and may have missed notifications
+        if payload in ("", "reconnect"):
+            self.request_refresh()
+        else:
+            self.request_refresh(payload.split(","))
+
+    def request_refresh(self, serials: Optional[Iterable[str]] = None):
+        """Schedules a re-read of `serials` (None = all printers). Bursts are coalesced."""
+        if serials is None:
+            self._pending_all = True
+        else:
+            self._pending.update(serials)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _refresh_loop(self):
+        interval = STREAM_RESYNC_INTERVAL if notifications_supported() else STREAM_POLL_INTERVAL
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                self._pending_all = True
+            self._wakeup.clear()
+
+            serials = None if self._pending_all else set(self._pending)
+            self._pending.clear()
+            self._pending_all = False
+            try:
+                await self.refresh(serials)
+            except Exception as e:
+                logger.error(f"Printer stream refresh failed: {e}")
+                self.request_refresh(serials)
+                await asyncio.sleep(interval)
+
+    async def refresh(self, serials: Optional[Set[str]] = None) -> int:
+        """Reads printers (all, or `serials`) and applies them. Returns the number of printers changed."""
+        query = select(Printer)
+        if serials is not None:
+            if not serials:
+                return 0
+            query = query.where(col(Printer.serial).in_(serials))
+        async with self.session_maker() as session:
+            result = await session.execute(query)
+            rows = {p.serial: p.model_dump(mode="json", exclude=STREAM_EXCLUDE) for p in result.scalars().all()}
+        self.refreshes += 1
+
+        expected = set(self.state.values) if serials is None else set(serials) & set(self.state.values)
+        removed = expected - rows.keys()
+        if removed:
+            self.generation += 1  # Set before remove() wakes the clients
+            for serial in removed:
+                self.state.remove(serial)
+
+        return sum(1 for serial, row in rows.items() if self.state.apply(serial, row))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"version": self.state.version, "printers": list(self.state.values.values())}
+
+    async def events(self, request=None) -> AsyncIterator[str]:
+        """SSE stream: one `snapshot` event, then `delta` events {serial: {field: value}}."""
+        await self.start()
+        snapshot = self.snapshot()
+        version, generation = snapshot["version"], self.generation
+        yield _sse("snapshot", snapshot)
+
+        while True:
+            changed = await self.state.wait_for_change(version, timeout=STREAM_KEEPALIVE)
+            if request is not None and await request.is_disconnected():
+                return
+            if self.generation != generation:
+                snapshot = self.snapshot()
+                version, generation = snapshot["version"], self.generation
+                yield _sse("snapshot", snapshot)
+            elif changed:
+                version, deltas = self.state.deltas_since(version)
+                if deltas:
+                    yield _sse("delta", {"version": version, "printers": deltas})
+            else:
+                yield ": keepalive\n\n"
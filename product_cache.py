@@ -0,0 +1,65 @@
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from sqlmodel import select
+from models import Product
+
+logger = logging.getLogger("ProductCache")
+
+# Safety net in case an invalidation NOTIFY is missed (e.g. listener reconnecting)
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "300"))
+
+# Structure: { sku: Product } (detached instances, treat as read-only)
+_PRODUCTS: Dict[str, Product] = {}
+_loaded_at: Optional[float] = None
+_generation = 0
+
+
+def invalidate(sku: str = ""):
+    """
+    Drops the cached catalog. Called by the product endpoints and by the
+    LISTEN task on PRODUCT_CHANNEL, so it accepts the NOTIFY payload.
+    """
+    global _loaded_at, _generation
+    _generation += 1
+    _loaded_at = None
+    _PRODUCTS.clear()
+    logger.debug(f"Product cache invalidated ({sku or 'all'})")
+
+
+def _is_fresh() -> bool:
+    return _loaded_at is not None and (time.monotonic() - _loaded_at) < PRODUCT_CACHE_TTL
+
+
+async def get_products_by_sku(session) -> Dict[str, Product]:
+    """
+    Returns the full SKU -> Product catalog, loading it with a single query on a miss.
+    The catalog is small and rarely changes, so it is cached as a whole.
+    """
+    global _loaded_at
+    if _is_fresh():
+        return _PRODUCTS
+
+    generation = _generation
+    result = await session.execute(select(Product))
+    products = result.scalars().all()
+    for product in products:
+        session.expunge(product)
+
+    # An invalidation raced with the load -> serve this result but don't keep it
+    if generation != _generation:
+        return {p.sku: p for p in products}
+
+    _PRODUCTS.clear()
+    _PRODUCTS.update({p.sku: p for p in products})
+    _loaded_at = time.monotonic()
+    logger.debug(f"Product cache loaded ({len(_PRODUCTS)} SKUs)")
+    return _PRODUCTS
+
+
+async def get_product(session, sku: str) -> Optional[Product]:
+    """Cached equivalent of select(Product).where(Product.sku == sku)."""
+    products = await get_products_by_sku(session)
+    return products.get(sku)
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+# Without change notifications (SQLite) versions cannot be trusted across processes:
+# they then expire after this many seconds, like the old polling interval.
+# With LISTEN/NOTIFY this is only a safety net against missed notifications.
+RESPONSE_CACHE_MAX_AGE = float(os.getenv("RESPONSE_CACHE_MAX_AGE", "2"))
+RESPONSE_CACHE_MAX_AGE_NOTIFY = float(os.getenv("RESPONSE_CACHE_MAX_AGE_NOTIFY", "60"))
+RESPONSE_CACHE_ENTRIES = 256  # Cached bodies per resource (one per distinct query string)
+
+
+class ResponseCache:
+    """
+    Version counters per resource ("printers", "orders", "products") plus their
+    pre-serialized JSON responses, for ETag / If-None-Match on read endpoints.
+
+    Writers call bump(resource) (directly, or through a NOTIFY listener for writes
+    made by other processes). A request whose ETag matches the current version gets
+    a 304 without touching the database; otherwise a cached body for the same
+    version and query string is served, and only a miss runs the query.
+    """
+
+    def __init__(self, max_age: float = RESPONSE_CACHE_MAX_AGE):
+        self.max_age = max_age
+        # Distinguishes this process's counters from another worker's or a previous run's
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+        self._bumped_at: Dict[str, float] = {}
+        self._bodies: Dict[str, "OrderedDict[str, Tuple[int, bytes]]"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def bump(self, resource: str):
+        self._versions[resource] = self._versions.get(resource, 0) + 1
+        self._bumped_at[resource] = time.monotonic()
+        self._bodies.pop(resource, None)
+
+    def bump_all(self):
+        for resource in list(self._versions):
+            self.bump(resource)
+
+    def version(self, resource: str) -> int:
+        if time.monotonic() - self._bumped_at.get(resource, float("-inf")) >= self.max_age:
+            self.bump(resource)
+        return self._versions[resource]
+
+    def etag(self, resource: str, variant: str = "") -> str:
+        digest = hashlib.blake2s(variant.encode(), digest_size=6).hexdigest()
+        return f'W/"{resource}-{self.epoch}-{self.version(resource)}-{digest}"'
+
+    async def respond(self, request: Request, resource: str, build: Callable[[], Awaitable[Any]]) -> Response:
+        """304 if the client's ETag is current, else the (cached) JSON body of build()."""
+        variant = str(request.url.query)
+        version = self.version(resource)
+        etag = self.etag(resource, variant)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag in request.headers.get("if-none-match", ""):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        bodies = self._bodies.setdefault(resource, OrderedDict())
+        cached = bodies.get(variant)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            bodies.move_to_end(variant)
+            body = cached[1]
+        else:
+            self.misses += 1
+            data = await build()
+            body = json.dumps(jsonable_encoder(data), separators=(",", ":")).encode()
+            # Only if nothing was written meanwhile (bump() drops the resource's bodies)
+            if self._versions.get(resource) == version:
+                bodies = self._bodies.setdefault(resource, OrderedDict())
+                bodies[variant] = (version, body)
+                if len(bodies) > RESPONSE_CACHE_ENTRIES:
+                    bodies.popitem(last=False)
+            else:
+                headers.pop("ETag")
+        return Response(content=body, media_type="application/json", headers=headers)
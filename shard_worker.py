@@ -0,0 +1,296 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import tempfile
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bambu_client import BambuPrinterClient
+from telemetry import TelemetryState
+
+# orjson is optional (see bambu_report.py)
+try:
+    import orjson
+    _dumps, _loads = orjson.dumps, orjson.loads
+except ImportError:
+    _dumps, _loads = (lambda obj: json.dumps(obj).encode()), json.loads
+
+logger = logging.getLogger("ShardWorker")
+
+# Number of telemetry processes. 0 = all MQTT clients run in the dispatcher process.
+WORKER_SHARDS = int(os.getenv("WORKER_SHARDS", "0"))
+SHARD_FLUSH_INTERVAL = 0.05  # Seconds a shard coalesces changes before sending a delta frame
+SHARD_STATS_INTERVAL = 1.0   # Seconds between message counters sent to the dispatcher
+SHARD_RESPAWN_DELAY = 2.0    # Seconds before a crashed shard is restarted
+COMMAND_TIMEOUT = 30.0       # Seconds to wait for a shard to acknowledge a printer command
+SHARD_LOG_LEVEL = os.getenv("SHARD_LOG_LEVEL", "INFO")
+
+# Frames are a 4-byte big-endian length + JSON body
+HEADER = struct.Struct("!I")
+
+# (serial, ip, access_code)
+PrinterSpec = Tuple[str, str, str]
+
+
+def shard_for(serial: str, shards: int) -> int:
+    """Stable hash partition (same result in every process, unlike hash())."""
+    return zlib.crc32(serial.encode()) % shards
+
+
+def write_frame(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    body = _dumps(message)
+    writer.write(HEADER.pack(len(body)) + body)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return _loads(await reader.readexactly(length))
+
+
+async def _open_connection(address):
+    if isinstance(address, str):
+        return await asyncio.open_unix_connection(address)
+    return await asyncio.open_connection(*address)
+
+
+# --- Shard process ---
+
+def run_shard(index: int, address, printers: List[PrinterSpec], mqtt_port: int = 8883):
+    """Process entry point: owns the MQTT clients of `printers` and streams their deltas to `address`."""
+    logging.basicConfig(
+        level=SHARD_LOG_LEVEL,
+        format=f'%(asctime)s - shard{index} - %(name)s - %(levelname)s - %(message)s',
+        force=True  # bambu_client configures logging on import
+    )
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    try:
+        asyncio.run(_shard_main(index, address, printers, mqtt_port))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _shard_main(index: int, address, printers: List[PrinterSpec], mqtt_port: int):
+    reader, writer = await _open_connection(address)
+    loop = asyncio.get_running_loop()
+    state = TelemetryState()
+    messages = [0]
+
+    clients: Dict[str, BambuPrinterClient] = {}
+    for serial, ip, access_code in printers:
+        def callback(data, serial=serial):
+            messages[0] += 1
+            state.apply(serial, data)
+        clients[serial] = BambuPrinterClient(ip, access_code, serial, update_callback=callback, mqtt_port=mqtt_port)
+
+    tasks = [asyncio.create_task(client.connect_mqtt()) for client in clients.values()]
+    write_frame(writer, {"t": "hello", "shard": index, "serials": list(clients)})
+    logger.info(f"Shard {index} running {len(clients)} printers.")
+
+    async def pump():
+        cursor = 0
+        last_stats = loop.time()
+        while True:
+            if await state.wait_for_change(cursor, timeout=SHARD_STATS_INTERVAL):
+                await asyncio.sleep(SHARD_FLUSH_INTERVAL)  # Coalesce a burst into one frame
+                cursor, deltas = state.deltas_since(cursor)
+                state.dirty.clear()  # DB flushing is the dispatcher's job
+                write_frame(writer, {"t": "delta", "d": deltas})
+            if loop.time() - last_stats >= SHARD_STATS_INTERVAL:
+                write_frame(writer, {"t": "stats", "messages": messages[0]})
+                last_stats = loop.time()
+            await writer.drain()
+
+    async def start_print(frame):
+        error = None
+        try:
+            await clients[frame["serial"]].start_print(**frame["args"])
+        except Exception as e:
+            error = str(e)
+        write_frame(writer, {"t": "ack", "id": frame["id"], "error": error})
+
+    tasks.append(asyncio.create_task(pump()))
+    try:
+        while True:
+            frame = await read_frame(reader)
+            if frame["t"] == "start_print":
+                tasks.append(asyncio.create_task(start_print(frame)))
+            elif frame["t"] == "stop":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        logger.warning(f"Shard {index}: dispatcher connection lost, exiting.")
+    finally:
+        for client in clients.values():
+            client.stop()
+        for task in tasks:
+            task.cancel()
+        writer.close()
+
+
+# --- Dispatcher side ---
+
+class ShardSupervisor:
+    """
+    Runs the MQTT clients in `shards` child processes, each owning a hash partition
+    of the printer serials, and feeds their telemetry deltas to `on_delta(serial, fields)`
+    in this process. Printer commands (start_print) are routed back to the owning shard.
+    IPC is a Unix socket, or loopback TCP where Unix sockets are unavailable (Windows).
+    """
+
+    def __init__(self, shards: int, on_delta: Callable[[str, Dict[str, Any]], None], mqtt_port: int = 8883):
+        self.shards = shards
+        self.on_delta = on_delta
+        self.mqtt_port = mqtt_port
+        self.address = None
+        self.messages: Dict[int, int] = {}  # shard -> MQTT messages parsed (from its stats frames)
+
+        self._partitions: Dict[int, List[PrinterSpec]] = {}
+        self._processes: Dict[int, multiprocessing.Process] = {}
+        self._writers: Dict[int, asyncio.StreamWriter] = {}
+        self._connected: Dict[int, asyncio.Event] = {}
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._running = False
+        self._mp = multiprocessing.get_context("spawn")
+
+    @property
+    def total_messages(self) -> int:
+        return sum(self.messages.values())
+
+    async def start(self, printers: List[PrinterSpec], timeout: float = 60.0):
+        """Spawns the shards and waits until all of them are connected."""
+        if hasattr(socket, "AF_UNIX"):
+            self.address = os.path.join(tempfile.gettempdir(), f"factoryos-shards-{os.getpid()}.sock")
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            self._server = await asyncio.start_unix_server(self._serve, path=self.address)
+        else:
+            self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+            self.address = self._server.sockets[0].getsockname()[:2]
+
+        self._partitions = {index: [] for index in range(self.shards)}
+        for spec in printers:
+            self._partitions[shard_for(spec[0], self.shards)].append(spec)
+
+        self._running = True
+        for index in range(self.shards):
+            self._connected[index] = asyncio.Event()
+            self._spawn(index)
+
+        await asyncio.wait_for(asyncio.gather(*(e.wait() for e in self._connected.values())), timeout)
+        logger.info(f"{self.shards} telemetry shards running "
+                    f"({', '.join(str(len(p)) for p in self._partitions.values())} printers).")
+
+    def _spawn(self, index: int):
+        process = self._mp.Process(
+            target=run_shard,
+            args=(index, self.address, self._partitions[index], self.mqtt_port),
+            name=f"factoryos-shard-{index}",
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        index = None
+        try:
+            hello = await read_frame(reader)
+            index = hello["shard"]
+            self._writers[index] = writer
+            self._connected[index].set()
+
+            while True:
+                frame = await read_frame(reader)
+                kind = frame["t"]
+                if kind == "delta":
+                    for serial, fields in frame["d"].items():
+                        self.on_delta(serial, fields)
+                elif kind == "stats":
+                    self.messages[index] = frame["messages"]
+                elif kind == "ack":
+                    future = self._pending.pop(frame["id"], None)
+                    if future is not None and not future.done():
+                        future.set_result(frame["error"])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            if index is not None and self._writers.get(index) is writer:
+                del self._writers[index]
+                self._connected[index].clear()
+                if self._running:
+                    logger.error(f"Shard {index} disconnected, restarting in {SHARD_RESPAWN_DELAY}s...")
+                    asyncio.create_task(self._respawn(index))
+
+    async def _respawn(self, index: int):
+        await asyncio.sleep(SHARD_RESPAWN_DELAY)
+        old = self._processes.get(index)
+        if old is not None and old.is_alive():
+            old.terminate()
+        if self._running:
+            self._spawn(index)
+
+    async def start_print(self, serial: str, **args):
+        """Sends start_print to the shard owning `serial` and waits for its acknowledgement."""
+        index = shard_for(serial, self.shards)
+        writer = self._writers.get(index)
+        if writer is None:
+            raise RuntimeError(f"Telemetry shard {index} for {serial} is not connected")
+
+        self._next_id += 1
+        command_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[command_id] = future
+        write_frame(writer, {"t": "start_print", "id": command_id, "serial": serial, "args": args})
+        await writer.drain()
+
+        try:
+            error = await asyncio.wait_for(future, COMMAND_TIMEOUT)
+        finally:
+            self._pending.pop(command_id, None)
+        if error:
+            raise RuntimeError(error)
+
+    async def stop(self):
+        self._running = False
+        for writer in list(self._writers.values()):
+            try:
+                write_frame(writer, {"t": "stop"})
+                await writer.drain()
+            except ConnectionError:
+                pass
+        for process in self._processes.values():
+            await asyncio.to_thread(process.join, 5)
+            if process.is_alive():
+                process.terminate()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class ShardedPrinterClient(BambuPrinterClient):
+    """
+    Dispatcher-side client in sharded mode: FTPS uploads run here as usual,
+    while MQTT (telemetry and commands) lives in the owning shard process.
+    """
+
+    def __init__(self, ip: str, access_code: str, serial: str, supervisor: ShardSupervisor):
+        super().__init__(ip=ip, access_code=access_code, serial=serial)
+        self.supervisor = supervisor
+
+    async def connect_mqtt(self):
+        raise RuntimeError("MQTT runs in the telemetry shard for sharded clients")
+
+    async def start_print(self, path: str, ams_mapping: list = None, gcode_internal_path: str = "Metadata/plate_1.gcode", plate_id: int = 1):
+        await self.supervisor.start_print(
+            self.serial, path=path, ams_mapping=ams_mapping,
+            gcode_internal_path=gcode_internal_path, plate_id=plate_id
+        )
@@ -0,0 +1,112 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional, Set, Tuple
+
+# Minimum change before a temperature is propagated (cache, DB, delta stream).
+# Bambu reports temperatures in 1/16 degree steps, which would otherwise mark
+# the printer dirty on nearly every message while heating or holding.
+TEMP_DEADBAND = float(os.getenv("TELEMETRY_TEMP_DEADBAND", "1.0"))
+
+DEFAULT_DEADBANDS = {
+    "nozzle_temper": TEMP_DEADBAND,
+    "bed_temper": TEMP_DEADBAND,
+}
+
+
+class TelemetryState:
+    """
+    Latest propagated telemetry per printer, with per-field versions and dirty bits.
+
+    - apply() keeps only real changes: equal values and numeric moves inside the
+      field's deadband are dropped.
+    - Changed fields are marked dirty until the sync loop takes them, so a burst of
+      updates between two flushes becomes one DB write per field.
+    - Every change bumps a global version; deltas_since(version) returns only the
+      fields changed after it, for consumers that poll or wait_for_change().
+    Structure of values: { serial: { "print_status": ..., "nozzle_temper": ..., ... } }
+    """
+
+    def __init__(self, deadbands: Optional[Dict[str, float]] = None):
+        self.deadbands = DEFAULT_DEADBANDS if deadbands is None else deadbands
+        self.values: Dict[str, Dict[str, Any]] = {}
+        self.dirty: Dict[str, Set[str]] = {}
+        self.version = 0
+        # serial -> {field: version of its last change}, and serial -> newest of those
+        self._field_versions: Dict[str, Dict[str, int]] = {}
+        self._printer_versions: Dict[str, int] = {}
+        self._changed: Optional[asyncio.Event] = None
+
+    def _significant(self, key: str, old: Any, new: Any) -> bool:
+        if old == new:
+            return False
+        band = self.deadbands.get(key)
+        if band and old is not None and isinstance(new, (int, float)) and isinstance(old, (int, float)):
+            return abs(new - old) >= band
+        return True
+
+    def apply(self, serial: str, data: Dict[str, Any]) -> Set[str]:
+        """Merges a telemetry update. Returns the fields that changed (and are now dirty)."""
+        cached = self.values.setdefault(serial, {})
+        changed = {key for key, value in data.items() if self._significant(key, cached.get(key), value)}
+        if not changed:
+            return changed
+
+        self.version += 1
+        versions = self._field_versions.setdefault(serial, {})
+        for key in changed:
+            cached[key] = data[key]
+            versions[key] = self.version
+        self._printer_versions[serial] = self.version
+        self.dirty.setdefault(serial, set()).update(changed)
+
+        if self._changed is not None:
+            self._changed.set()
+        return changed
+
+    def remove(self, serial: str):
+        """Forgets a printer. Bumps the version so waiting consumers notice."""
+        if serial not in self.values:
+            return
+        del self.values[serial]
+        self._field_versions.pop(serial, None)
+        self._printer_versions.pop(serial, None)
+        self.dirty.pop(serial, None)
+        self.version += 1
+        if self._changed is not None:
+            self._changed.set()
+
+    def take_dirty(self) -> Dict[str, Set[str]]:
+        dirty = dict(self.dirty)
+        self.dirty.clear()
+        return dirty
+
+    def restore_dirty(self, dirty: Dict[str, Set[str]]):
+        """Puts back fields whose flush failed."""
+        for serial, fields in dirty.items():
+            self.dirty.setdefault(serial, set()).update(fields)
+
+    def deltas_since(self, version: int) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+        """Returns (current version, {serial: {field: value}} changed after `version`)."""
+        deltas = {}
+        for serial, printer_version in self._printer_versions.items():
+            if printer_version <= version:
+                continue
+            cached = self.values.get(serial, {})
+            deltas[serial] = {
+                key: cached[key]
+                for key, field_version in self._field_versions[serial].items()
+                if field_version > version and key in cached
+            }
+        return self.version, deltas
+
+    async def wait_for_change(self, version: int, timeout: Optional[float] = None) -> bool:
+        """Waits until the state moves past `version`. Returns False on timeout."""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        while self.version <= version:
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
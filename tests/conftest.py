@@ -0,0 +1,29 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+import models  # Registers the tables on SQLModel.metadata
+
+# Shared setup for the test modules. pytest loads this file on its own; the modules
+# also import it directly, so each of them still runs as a plain script.
+
+# Use SQLite for testing (in-memory)
+TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+
+async def create_test_database(database_url: str = TEST_DATABASE_URL):
+    """
+    Creates all tables on a fresh engine (dropping leftovers first, for scratch databases
+    such as LOCKING_DATABASE_URL). Returns (engine, session_maker); seed data is up to the test.
+    """
+    engine = create_async_engine(database_url, echo=False, future=True)
+    session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    return engine, session_maker
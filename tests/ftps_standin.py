@@ -0,0 +1,182 @@
+"""
+Minimal implicit-FTPS server standing in for a printer's SD card (port 990 style).
+Only what BambuPrinterClient uses: USER/PASS, PBSZ/PROT, TYPE, PASV, STOR, SIZE, LIST, DELE, NOOP, QUIT.
+Files are kept in memory. Test helper only.
+"""
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+
+def make_self_signed_cert(directory: str) -> Optional[tuple]:
+    """Returns (certfile, keyfile) or None when the openssl CLI is unavailable."""
+    if not shutil.which("openssl"):
+        return None
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=localhost"],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+class StandInFTPSServer:
+    def __init__(self, password: str = "12345678", user: str = "bblp"):
+        self._tmp = tempfile.mkdtemp()
+        cert = make_self_signed_cert(self._tmp)
+        if cert is None:
+            raise RuntimeError("openssl CLI not available")
+
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(*cert)
+
+        self.user = user
+        self.password = password
+        self.files: Dict[str, bytes] = {}
+        self.mtimes: Dict[str, str] = {}
+
+        # Observations for tests
+        self.control_connections = 0
+        self.control_sessions_reused: List[bool] = []
+        self.data_sessions_reused: List[bool] = []
+        self.stor_count = 0
+
+        self._clients: List[ssl.SSLSocket] = []
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self._listener.getsockname()[1]
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, raw):
+        try:
+            tls = self.context.wrap_socket(raw, server_side=True)
+        except (ssl.SSLError, OSError):
+            raw.close()
+            return
+        self.control_connections += 1
+        self.control_sessions_reused.append(tls.session_reused)
+        self._clients.append(tls)
+
+        reader = tls.makefile("r", encoding="utf-8", newline="\r\n")
+        data_listener = None
+
+        def reply(line: str):
+            tls.sendall((line + "\r\n").encode())
+
+        try:
+            reply("220 Stand-in FTPS ready")
+            logged_in = False
+            for line in reader:
+                cmd, _, arg = line.strip().partition(" ")
+                cmd = cmd.upper()
+
+                if cmd == "USER":
+                    reply("331 Password required")
+                elif cmd == "PASS":
+                    logged_in = arg == self.password
+                    reply("230 Logged in" if logged_in else "530 Login incorrect")
+                elif not logged_in and cmd != "QUIT":
+                    reply("530 Please login")
+                elif cmd in ("PBSZ", "PROT", "TYPE", "NOOP"):
+                    reply("200 OK")
+                elif cmd == "PASV":
+                    data_listener = socket.create_server(("127.0.0.1", 0))
+                    port = data_listener.getsockname()[1]
+                    reply(f"227 Entering Passive Mode (127,0,0,1,{port // 256},{port % 256})")
+                elif cmd == "STOR":
+                    reply("150 Ok to send data")
+                    self.files[arg] = self._receive(data_listener)
+                    self.stor_count += 1
+                    data_listener = None
+                    reply("226 Transfer complete")
+                elif cmd == "LIST":
+                    reply("150 Here comes the directory listing")
+                    listing = "".join(
+                        f"-rw-r--r--    1 root     root     {len(body):>10} Jan 01 00:00 {name.lstrip('/')}\r\n"
+                        for name, body in self.files.items()
+                    )
+                    self._send(data_listener, listing.encode())
+                    data_listener = None
+                    reply("226 Directory send OK")
+                elif cmd == "SIZE":
+                    if arg in self.files:
+                        reply(f"213 {len(self.files[arg])}")
+                    else:
+                        reply("550 Could not get file size")
+                elif cmd == "DELE":
+                    if self.files.pop(arg, None) is not None:
+                        reply("250 Delete operation successful")
+                    else:
+                        reply("550 Delete operation failed")
+                elif cmd == "QUIT":
+                    reply("221 Goodbye")
+                    break
+                else:
+                    reply("502 Command not implemented")
+        except (OSError, ssl.SSLError, ValueError):
+            pass
+        finally:
+            try:
+                tls.close()
+            except OSError:
+                pass
+
+    def _accept_data(self, data_listener) -> ssl.SSLSocket:
+        conn, _ = data_listener.accept()
+        data_listener.close()
+        data = self.context.wrap_socket(conn, server_side=True)
+        self.data_sessions_reused.append(data.session_reused)
+        return data
+
+    def _receive(self, data_listener) -> bytes:
+        data = self._accept_data(data_listener)
+        chunks = []
+        while True:
+            chunk = data.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self._close_data(data)
+        return b"".join(chunks)
+
+    def _send(self, data_listener, body: bytes):
+        data = self._accept_data(data_listener)
+        data.sendall(body)
+        self._close_data(data)
+
+    def _close_data(self, data):
+        try:
+            data.unwrap().close()
+        except (OSError, ssl.SSLError):
+            data.close()
+
+    def drop_connections(self):
+        """Simulates the printer closing idle sessions."""
+        for tls in self._clients:
+            try:
+                tls.shutdown(socket.SHUT_RDWR)
+                tls.close()
+            except OSError:
+                pass
+        self._clients.clear()
+
+    def close(self):
+        self._running = False
+        self._listener.close()
+        self.drop_connections()
+        shutil.rmtree(self._tmp, ignore_errors=True)
@@ -0,0 +1,200 @@
+"""
+Minimal MQTT 3.1.1 broker over TLS standing in for printers (port 8883 style).
+Only what BambuPrinterClient uses: CONNECT, SUBSCRIBE, PUBLISH (QoS 0/1), PINGREQ, DISCONNECT.
+Messages published by clients are recorded; publish() pushes reports to subscribers.
+With `flood_payloads`, every /report subscriber is sent those payloads in a loop
+at `flood_rate` messages/s (for ingest benchmarks). Test helper only.
+"""
+import shutil
+import socket
+import ssl
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ftps_standin import make_self_signed_cert
+
+
+def encode_length(length: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        out.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(out)
+
+
+def encode_publish(topic: str, payload: bytes) -> bytes:
+    topic_bytes = topic.encode()
+    body = len(topic_bytes).to_bytes(2, "big") + topic_bytes + payload
+    return b"\x30" + encode_length(len(body)) + body
+
+
+class _Connection:
+    def __init__(self, tls: ssl.SSLSocket):
+        self.tls = tls
+        self.lock = threading.Lock()
+        self.open = True
+
+    def send(self, data: bytes):
+        with self.lock:
+            self.tls.sendall(data)
+
+    def read_exact(self, count: int) -> bytes:
+        chunks = []
+        while count:
+            chunk = self.tls.recv(count)
+            if not chunk:
+                raise ConnectionError("closed")
+            chunks.append(chunk)
+            count -= len(chunk)
+        return b"".join(chunks)
+
+    def read_packet(self):
+        header = self.read_exact(1)[0]
+        length, shift = 0, 0
+        while True:
+            byte = self.read_exact(1)[0]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        return header, self.read_exact(length) if length else b""
+
+
+class StandInMQTTBroker:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 flood_payloads: Optional[List[bytes]] = None, flood_rate: float = 1000.0):
+        self._tmp = tempfile.mkdtemp()
+        cert = make_self_signed_cert(self._tmp)
+        if cert is None:
+            raise RuntimeError("openssl CLI not available")
+
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(*cert)
+
+        self.flood_payloads = flood_payloads
+        self.flood_rate = flood_rate
+
+        # Observations for tests
+        self.subscriptions: Dict[str, List[_Connection]] = {}
+        self.received: List[tuple] = []  # (topic, payload) published by clients
+        self._changed = threading.Condition()
+
+        self._listener = socket.create_server((host, port))
+        self.host = host
+        self.port = self._listener.getsockname()[1]
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                raw, _ = self._listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(raw,), daemon=True).start()
+
+    def _serve(self, raw):
+        try:
+            conn = _Connection(self.context.wrap_socket(raw, server_side=True))
+        except (ssl.SSLError, OSError):
+            raw.close()
+            return
+
+        try:
+            while self._running:
+                header, body = conn.read_packet()
+                kind = header >> 4
+                if kind == 1:  # CONNECT
+                    conn.send(b"\x20\x02\x00\x00")
+                elif kind == 8:  # SUBSCRIBE
+                    packet_id, pos, topics = body[:2], 2, []
+                    while pos < len(body):
+                        size = int.from_bytes(body[pos:pos + 2], "big")
+                        topics.append(body[pos + 2:pos + 2 + size].decode())
+                        pos += size + 3  # topic + requested QoS byte
+                    conn.send(b"\x90" + encode_length(2 + len(topics)) + packet_id + b"\x00" * len(topics))
+                    with self._changed:
+                        for topic in topics:
+                            self.subscriptions.setdefault(topic, []).append(conn)
+                        self._changed.notify_all()
+                    if self.flood_payloads:
+                        for topic in topics:
+                            if topic.endswith("/report"):
+                                threading.Thread(target=self._flood, args=(conn, topic), daemon=True).start()
+                elif kind == 3:  # PUBLISH
+                    qos = (header >> 1) & 0x03
+                    size = int.from_bytes(body[:2], "big")
+                    topic = body[2:2 + size].decode()
+                    pos = 2 + size
+                    if qos:
+                        conn.send(b"\x40\x02" + body[pos:pos + 2])
+                        pos += 2
+                    with self._changed:
+                        self.received.append((topic, body[pos:]))
+                        self._changed.notify_all()
+                elif kind == 12:  # PINGREQ
+                    conn.send(b"\xd0\x00")
+                elif kind == 14:  # DISCONNECT
+                    break
+        except (OSError, ssl.SSLError, ConnectionError, ValueError):
+            pass
+        finally:
+            conn.open = False
+            with self._changed:
+                for subscribers in self.subscriptions.values():
+                    if conn in subscribers:
+                        subscribers.remove(conn)
+            try:
+                conn.tls.close()
+            except OSError:
+                pass
+
+    def _flood(self, conn: _Connection, topic: str):
+        """Sends the flood payloads round-robin at `flood_rate` messages/s, in 10 ms batches."""
+        packets = [encode_publish(topic, payload) for payload in self.flood_payloads]
+        sent, start = 0, time.monotonic()
+        try:
+            while conn.open and self._running:
+                due = int((time.monotonic() - start) * self.flood_rate)
+                if due > sent:
+                    conn.send(b"".join(packets[i % len(packets)] for i in range(sent, due)))
+                    sent = due
+                time.sleep(0.01)
+        except (OSError, ssl.SSLError):
+            pass
+
+    def publish(self, topic: str, payload: bytes) -> int:
+        """Sends a PUBLISH to the topic's subscribers. Returns how many got it."""
+        with self._changed:
+            subscribers = list(self.subscriptions.get(topic, []))
+        packet = encode_publish(topic, payload)
+        for conn in subscribers:
+            conn.send(packet)
+        return len(subscribers)
+
+    def wait_for(self, predicate, timeout: float = 10.0) -> bool:
+        with self._changed:
+            return self._changed.wait_for(predicate, timeout)
+
+    def close(self):
+        self._running = False
+        self._listener.close()
+        with self._changed:
+            connections = {conn for subscribers in self.subscriptions.values() for conn in subscribers}
+        for conn in connections:
+            try:
+                conn.tls.close()
+            except OSError:
+                pass
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def run_broker_process(host: str, port: int, flood_payloads: List[bytes], flood_rate: float, ready, stop):
+    """multiprocessing target: a flooding broker until `stop` is set."""
+    broker = StandInMQTTBroker(host, port, flood_payloads=flood_payloads, flood_rate=flood_rate)
+    ready.set()
+    stop.wait()
+    broker.close()
@@ -0,0 +1,74 @@
+import logging
+import random
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import Printer, PrinterTypeEnum
+from material_index import MaterialIndex
+from assignment import solve_assignment
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("AssignmentTest")
+
+
+def make_index(printers: dict) -> MaterialIndex:
+    index = MaterialIndex()
+    index.reset([
+        Printer(serial=serial, name=serial, type=PrinterTypeEnum.A1,
+                ams_data=[{"slot": str(i), "type": t, "color": c} for i, (t, c) in enumerate(slots)])
+        for serial, slots in printers.items()
+    ])
+    return index
+
+
+def test_rare_color_is_not_stolen():
+    # Greedy FIFO would give the only red spool to the "any PLA" job
+    index = make_index({"P1": [("PLA", "#FF0000")], "P2": [("PLA", "#0000FF")]})
+    matches = solve_assignment([("PLA", None), ("PLA", "#FF0000")], index)
+
+    assert matches == {0: ("P2", 0), 1: ("P1", 0)}
+    logger.info("Rare Color Test PASSED.")
+
+
+def test_oldest_job_wins_contention():
+    index = make_index({"P1": [("PETG", "#000000")]})
+    matches = solve_assignment([("PETG", "#000000")] * 3, index)
+
+    assert matches == {0: ("P1", 0)}
+    logger.info("Age Priority Test PASSED.")
+
+
+def test_maximum_cardinality():
+    rng = random.Random(7)
+    colors = ["#000000", "#FFFFFF", "#FF0000", "#00FF00"]
+    printers = {f"P{i}": [("PLA", rng.choice(colors)) for _ in range(2)] for i in range(30)}
+    requirements = [("PLA", rng.choice(colors + [None])) for _ in range(60)]
+
+    matches = solve_assignment(requirements, make_index(printers))
+
+    # Valid: every printer used once and every pair compatible
+    used = [serial for serial, _ in matches.values()]
+    assert len(used) == len(set(used))
+    for pos, (serial, slot) in matches.items():
+        req_color = requirements[pos][1]
+        assert req_color is None or printers[serial][slot][1] == req_color
+
+    # Never worse than greedy FIFO
+    index = make_index(printers)
+    greedy = 0
+    for req in requirements:
+        match = index.find(*req)
+        if match:
+            index.remove_printer(match[0])
+            greedy += 1
+    assert len(matches) >= greedy
+    logger.info(f"Cardinality Test PASSED ({len(matches)} optimal vs {greedy} greedy).")
+
+
+if __name__ == "__main__":
+    test_rare_color_is_not_stolen()
+    test_oldest_job_wins_contention()
+    test_maximum_cardinality()
+    logger.info("\nALL ASSIGNMENT TESTS PASSED.")
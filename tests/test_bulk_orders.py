@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+import httpx
+from sqlmodel import select
+from sqlalchemy import event, func
+from conftest import create_test_database
+from models import Order, Job, Product, OrderStatusEnum, PlatformEnum
+import main
+import product_cache
+from database import get_session
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("BulkOrdersTest")
+
+
+async def _setup():
+    engine, session_maker = await create_test_database()
+
+    async with session_maker() as session:
+        session.add(Product(sku="CUBE", name="Cube", file_path_3mf="storage/cube.3mf"))
+        session.add(Order(platform=PlatformEnum.EBAY, platform_order_id="BULK-EXISTING", sku="CUBE",
+                          quantity=1, purchase_date=datetime.now()))
+        await session.commit()
+    product_cache.invalidate()
+
+    async def override():
+        async with session_maker() as session:
+            yield session
+    main.app.dependency_overrides[get_session] = override
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+    return engine, session_maker, client
+
+
+async def _teardown(engine, client):
+    await client.aclose()
+    main.app.dependency_overrides.clear()
+    product_cache.invalidate()
+    await engine.dispose()
+
+
+def _order(i, sku="CUBE", **extra):
+    return {"platform": "ETSY", "platform_order_id": f"BULK-{i}", "sku": sku, "quantity": 1,
+            "purchase_date": "2026-01-02T03:04:05Z", **extra}
+
+
+async def _test_bulk_insert_with_jobs():
+    engine, session_maker, client = await _setup()
+    try:
+        payload = [_order(i, sku="CUBE" if i % 2 else "UNKNOWN") for i in range(2500)]
+        payload += [
+            _order(1),                                             # repeated in this request
+            {**_order("X"), "platform_order_id": "BULK-EXISTING"},  # already in the database
+            _order("BAD", quantity="many"),                        # fails validation
+            "not an order",
+        ]
+
+        inserts = []
+        event.listen(engine.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT") else None)
+        response = await client.post("/orders/bulk", json=payload)
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["created"], body["duplicate"], body["invalid"]) == (2500, 2, 2)
+
+        results = body["results"]
+        assert len(results) == len(payload) and [r["index"] for r in results] == list(range(len(payload)))
+        assert results[1]["result"] == "created" and results[1]["job_created"]
+        assert results[0]["result"] == "created" and not results[0]["job_created"]
+        assert [r["result"] for r in results[2500:]] == ["duplicate", "duplicate", "invalid", "invalid"]
+        assert results[2502]["error"]
+
+        # Chunked multi-row statements, not one INSERT per row: 3 order chunks + 3 job chunks
+        assert len(inserts) == 6
+
+        async with session_maker() as session:
+            assert (await session.execute(select(func.count()).select_from(Order))).scalar() == 2501
+            jobs = (await session.execute(select(Job))).scalars().all()
+            assert len(jobs) == 1250 and all(j.gcode_path == "storage/cube.3mf" for j in jobs)
+            statuses = dict((await session.execute(
+                select(Order.status, func.count()).where(Order.platform_order_id != "BULK-EXISTING").group_by(Order.status)
+            )).all())
+            # Orders without a product stay OPEN for the dispatcher to mark invalid
+            assert statuses == {OrderStatusEnum.QUEUED: 1250, OrderStatusEnum.OPEN: 1250}
+
+        # Replaying the same request creates nothing
+        body = (await client.post("/orders/bulk", json=payload[:2500])).json()
+        assert body["created"] == 0 and body["duplicate"] == 2500
+    finally:
+        await _teardown(engine, client)
+    logger.info("Bulk Insert Test PASSED.")
+
+
+async def _test_bulk_limit():
+    engine, _, client = await _setup()
+    try:
+        response = await client.post("/orders/bulk", json=[_order(i) for i in range(main.ORDER_BULK_MAX + 1)])
+        assert response.status_code == 413
+    finally:
+        await _teardown(engine, client)
+    logger.info("Bulk Limit Test PASSED.")
+
+
+def test_bulk_insert_with_jobs():
+    asyncio.run(_test_bulk_insert_with_jobs())
+
+def test_bulk_limit():
+    asyncio.run(_test_bulk_limit())
+
+
+if __name__ == "__main__":
+    test_bulk_insert_with_jobs()
+    test_bulk_limit()
+    logger.info("\nALL BULK ORDER TESTS PASSED.")
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+import database
+from database import MeteredQueuePool, pool_settings, pool_status
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("DatabasePoolTest")
+
+
+def test_profiles_and_overrides():
+    assert pool_settings("daemon")["statement_cache_size"] == 500
+    assert pool_settings("script")["max_overflow"] == 0
+
+    os.environ["DB_POOL_SIZE"] = "3"
+    os.environ["DB_POOL_PRE_PING"] = "false"
+    try:
+        settings = pool_settings("api")
+        assert settings["pool_size"] == 3 and settings["pool_pre_ping"] is False
+        assert settings["max_overflow"] == database.POOL_PROFILES["api"]["max_overflow"]
+    finally:
+        del os.environ["DB_POOL_SIZE"], os.environ["DB_POOL_PRE_PING"]
+
+    try:
+        pool_settings("warehouse")
+        assert False, "unknown profile accepted"
+    except ValueError:
+        pass
+    logger.info("Profile Test PASSED.")
+
+
+async def _test_metrics_count_waits_and_timeouts():
+    tmp = tempfile.mkdtemp()
+    # A file database: SQLite's in-memory default uses a StaticPool instead of a queue
+    engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'pool.db')}",
+                                 poolclass=MeteredQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.3)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            status = pool_status(engine)
+            assert status["checked_out"] == 1 and status["checkouts"] == 1
+
+            # The only connection is taken -> the next checkout queues and times out
+            try:
+                async with engine.connect():
+                    assert False, "pool limit not enforced"
+            except exc.TimeoutError:
+                pass
+
+        # Released -> idle connection reused without waiting
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+        status = pool_status(engine)
+        assert status["checked_out"] == 0 and status["idle"] == 1
+        assert status["checkouts"] == 3 and status["timeouts"] == 1
+        assert status["misses"] == 2  # First connect and the timed-out one
+        assert status["max_wait_ms"] >= 300
+    finally:
+        await engine.dispose()
+        shutil.rmtree(tmp, ignore_errors=True)
+    logger.info("Pool Metrics Test PASSED.")
+
+
+def test_metrics_count_waits_and_timeouts():
+    asyncio.run(_test_metrics_count_waits_and_timeouts())
+
+
+if __name__ == "__main__":
+    test_profiles_and_overrides()
+    test_metrics_count_waits_and_timeouts()
+    logger.info("\nALL DATABASE POOL TESTS PASSED.")
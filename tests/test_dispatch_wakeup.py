@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlmodel import select
+from conftest import create_test_database
+from models import Product, Job, Order, OrderStatusEnum
+import order_service
+import product_cache
+import worker_service
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("DispatchWakeupTest")
+
+
+async def _wait_for(predicate, timeout: float) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        if await predicate():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def _test_new_order_wakes_dispatcher():
+    engine, session_maker = await create_test_database()
+
+    async with session_maker() as session:
+        session.add(Product(name="Cube", sku="CUBE", file_path_3mf="cube.3mf"))
+        await session.commit()
+
+    saved = (worker_service.async_session_maker, order_service.async_session_maker,
+             worker_service.DISPATCH_EVENT, worker_service.TELEMETRY_FLUSH_INTERVAL,
+             worker_service.DISPATCH_SAFETY_INTERVAL)
+    worker_service.async_session_maker = order_service.async_session_maker = session_maker
+    worker_service.DISPATCH_EVENT = asyncio.Event()  # Bound to this test's loop
+    # Neither timer may fire during the test: only the wake-up can create the job
+    worker_service.TELEMETRY_FLUSH_INTERVAL = 60
+    worker_service.DISPATCH_SAFETY_INTERVAL = 3600
+    worker_service.DIRTY_FIELDS.clear()
+    product_cache.invalidate()
+
+    loop_task = asyncio.create_task(worker_service.sync_loop())
+    try:
+        await asyncio.sleep(0.1)  # sync_loop is waiting for its first wake-up
+        await order_service.create_dummy_order()
+
+        async def job_created():
+            async with session_maker() as session:
+                return (await session.execute(select(Job))).scalars().first() is not None
+
+        assert await _wait_for(job_created, timeout=2), "Dispatcher did not wake up for the new order"
+        await asyncio.sleep(0.1)  # Let the pass finish before cancelling
+
+        async with session_maker() as session:
+            order = (await session.execute(select(Order))).scalars().one()
+            assert order.status == OrderStatusEnum.QUEUED
+    finally:
+        loop_task.cancel()
+        (worker_service.async_session_maker, order_service.async_session_maker,
+         worker_service.DISPATCH_EVENT, worker_service.TELEMETRY_FLUSH_INTERVAL,
+         worker_service.DISPATCH_SAFETY_INTERVAL) = saved
+        product_cache.invalidate()
+        await engine.dispose()
+
+    logger.info("New Order Wake-up Test PASSED.")
+
+
+async def _test_notification_wakes_dispatcher():
+    engine, session_maker = await create_test_database()
+
+    saved = (worker_service.async_session_maker, worker_service.DISPATCH_EVENT,
+             worker_service.TELEMETRY_FLUSH_INTERVAL, worker_service.DISPATCH_SAFETY_INTERVAL,
+             worker_service.create_jobs_from_open_orders)
+    worker_service.async_session_maker = session_maker
+    worker_service.DISPATCH_EVENT = asyncio.Event()
+    worker_service.TELEMETRY_FLUSH_INTERVAL = 60
+    worker_service.DISPATCH_SAFETY_INTERVAL = 3600
+    worker_service.DIRTY_FIELDS.clear()
+
+    ticks = asyncio.Event()
+
+    async def create_jobs(session):
+        ticks.set()
+        raise RuntimeError("stop after the job creation step")  # Logged by sync_loop
+
+    worker_service.create_jobs_from_open_orders = create_jobs
+    loop_task = asyncio.create_task(worker_service.sync_loop())
+    try:
+        await asyncio.sleep(0.1)
+        # What the DISPATCH_CHANNEL listener calls for a NOTIFY from the API process
+        worker_service.request_dispatch("notify order 1")
+        await asyncio.wait_for(ticks.wait(), timeout=2)
+        await asyncio.sleep(0.1)
+    finally:
+        loop_task.cancel()
+        (worker_service.async_session_maker, worker_service.DISPATCH_EVENT,
+         worker_service.TELEMETRY_FLUSH_INTERVAL, worker_service.DISPATCH_SAFETY_INTERVAL,
+         worker_service.create_jobs_from_open_orders) = saved
+        await engine.dispose()
+
+    logger.info("Notification Wake-up Test PASSED.")
+
+
+def test_only_material_changes_wake_dispatcher():
+    saved = worker_service.DISPATCH_EVENT
+    worker_service.DISPATCH_EVENT = asyncio.Event()
+    serial = "WAKE1"
+    tray = {"slot": "1", "type": "PLA", "color": "#FF0000", "remaining": 80}
+    try:
+        worker_service.handle_mqtt_update(serial, {"ams_data": [tray]})
+        assert worker_service.DISPATCH_EVENT.is_set()
+        worker_service.DISPATCH_EVENT.clear()
+
+        # Filament used up while printing: flushed, but nothing new to dispatch
+        worker_service.handle_mqtt_update(serial, {"ams_data": [{**tray, "remaining": 79}]})
+        assert "ams_data" in worker_service.DIRTY_FIELDS[serial]
+        assert not worker_service.DISPATCH_EVENT.is_set()
+
+        # Spool swapped
+        worker_service.handle_mqtt_update(serial, {"ams_data": [{**tray, "color": "#00FF00", "remaining": 100}]})
+        assert worker_service.DISPATCH_EVENT.is_set()
+    finally:
+        worker_service.DISPATCH_EVENT = saved
+        worker_service.PRINTER_STATE_CACHE.pop(serial, None)
+        worker_service.DIRTY_FIELDS.pop(serial, None)
+        worker_service.MATERIAL_INDEX.remove_printer(serial)
+
+    logger.info("Material Change Wake-up Test PASSED.")
+
+
+def test_new_order_wakes_dispatcher():
+    asyncio.run(_test_new_order_wakes_dispatcher())
+
+def test_notification_wakes_dispatcher():
+    asyncio.run(_test_notification_wakes_dispatcher())
+
+
+if __name__ == "__main__":
+    test_new_order_wakes_dispatcher()
+    test_notification_wakes_dispatcher()
+    test_only_material_changes_wake_dispatcher()
+    logger.info("\nALL DISPATCH WAKE-UP TESTS PASSED.")
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta, timezone
+import httpx
+from sqlmodel import select
+from sqlalchemy import func
+from conftest import create_test_database
+from models import Order, Job, Product, PlatformEnum
+import init_df
+import product_cache
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("EbayIngestTest")
+
+ORDER_COUNT = 10000
+
+
+class MockFulfillmentApi:
+    """Minimal getOrders: offset/limit pagination, a 429 on the first hit of page 2, some latency."""
+
+    def __init__(self, count: int):
+        start = datetime(2026, 1, 1)
+        self.orders = []
+        for i in range(count):
+            items = [{"lineItemId": f"L{i}", "sku": "CUBE" if i % 2 else "BENCHY", "quantity": i % 3 + 1}]
+            if i % 100 == 0:
+                items.append({"lineItemId": f"L{i}b", "sku": "CUBE", "quantity": 1})
+            if i % 250 == 0:
+                del items[0]["sku"]
+            self.orders.append({
+                "orderId": f"EB-{i}",
+                "creationDate": (start + timedelta(minutes=i)).isoformat() + ".000Z",
+                "orderFulfillmentStatus": "NOT_STARTED",
+                "lineItems": items,
+            })
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttled = False
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == init_df.EBAY.orders_path
+        assert request.headers["Authorization"].startswith("Bearer")
+        self.requests += 1
+        offset = int(request.url.params["offset"])
+        limit = int(request.url.params["limit"])
+        if offset == limit and not self.throttled:
+            self.throttled = True
+            return httpx.Response(429, headers={"Retry-After": "0"})
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.2)  # API latency
+        self.in_flight -= 1
+        return httpx.Response(200, json={
+            "total": len(self.orders), "limit": limit, "offset": offset,
+            "orders": self.orders[offset:offset + limit],
+        })
+
+
+async def _test_backfill():
+    engine, session_maker = await create_test_database()
+    async with session_maker() as session:
+        session.add(Product(sku="CUBE", name="Cube", file_path_3mf="storage/cube.3mf"))
+        session.add(Order(platform=PlatformEnum.EBAY, platform_order_id="EB-7", sku="CUBE",
+                          quantity=1, purchase_date=datetime.now()))
+        await session.commit()
+    product_cache.invalidate()
+
+    api = MockFulfillmentApi(ORDER_COUNT)
+    try:
+        started = time.perf_counter()
+        async with init_df.EBAY.client(transport=httpx.MockTransport(api)) as client:
+            raw = await init_df.fetch_ebay_orders(client)
+        df = init_df.EBAY.normalize(raw)
+        counts = await init_df.process_orders(df, session_maker)
+        elapsed = time.perf_counter() - started
+
+        assert len(raw) == ORDER_COUNT and len({o["orderId"] for o in raw}) == ORDER_COUNT
+        pages = -(-ORDER_COUNT // init_df.EBAY.page_size)
+        assert api.requests == pages + 1  # One retried page
+        assert 1 < api.max_in_flight <= init_df.EBAY.concurrency
+
+        # One row per order; normalized columns
+        assert len(df) == ORDER_COUNT
+        row = df.set_index("platform_order_id").loc["EB-250"]
+        assert row["sku"] == "UNKNOWN_SKU" and row["quantity"] == 2
+        assert counts == {"created": ORDER_COUNT - 1, "existing": 1}
+
+        async with session_maker() as session:
+            assert (await session.execute(select(func.count()).select_from(Order))).scalar() == ORDER_COUNT
+            # One job per unit of the new CUBE orders (EB-7 existed)
+            units = sum(i % 3 + 1 for i in range(1, ORDER_COUNT, 2) if i != 7)
+            assert (await session.execute(select(func.count()).select_from(Job))).scalar() == units
+            order = (await session.execute(select(Order).where(Order.platform_order_id == "EB-1"))).scalars().one()
+            local = datetime.now().astimezone().tzinfo
+            expected = datetime(2026, 1, 1, 0, 1, tzinfo=timezone.utc).astimezone(local).replace(tzinfo=None)
+            assert order.purchase_date.tzinfo is None and order.purchase_date == expected
+            assert order.quantity == 2
+
+        # Re-running finds everything known
+        assert (await init_df.process_orders(df, session_maker))["created"] == 0
+        logger.info(f"Backfilled {ORDER_COUNT} orders in {elapsed:.2f}s")
+        assert elapsed < 30
+    finally:
+        product_cache.invalidate()
+        await engine.dispose()
+    logger.info("eBay Backfill Test PASSED.")
+
+
+def test_backfill():
+    asyncio.run(_test_backfill())
+
+
+if __name__ == "__main__":
+    test_backfill()
+    logger.info("\nALL EBAY INGEST TESTS PASSED.")
@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import logging
+import shutil
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bambu_client
+from bambu_client import BambuPrinterClient, FTPSPool, content_addressed_path
+from ftps_standin import StandInFTPSServer
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("FTPSPoolTest")
+
+
+def _write_file(directory: str, name: str, size: int) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+async def _test_pooled_upload():
+    server = StandInFTPSServer()
+    tmp = tempfile.mkdtemp()
+    pool = FTPSPool("127.0.0.1", server.password, port=server.port, chunk_size=64 * 1024)
+    try:
+        first = _write_file(tmp, "first.3mf", 300 * 1024)
+        second = _write_file(tmp, "second.3mf", 10 * 1024)
+
+        progress = []
+        await pool.upload(first, "/first.3mf", progress=lambda sent, total: progress.append((sent, total)))
+        await pool.upload(second, "/second.3mf")
+
+        with open(first, "rb") as f:
+            assert server.files["/first.3mf"] == f.read()
+        assert len(server.files["/second.3mf"]) == 10 * 1024
+
+        # Chunked progress, ending at the full size
+        assert len(progress) == 5
+        assert progress[-1] == (300 * 1024, 300 * 1024)
+
+        # One control connection for both uploads; data channels resume its TLS session
+        assert server.control_connections == 1
+        assert all(server.data_sessions_reused)
+    finally:
+        pool.close()
+        server.close()
+        shutil.rmtree(tmp)
+
+    logger.info("Pooled Upload Test PASSED.")
+
+
+async def _test_reconnect_after_drop():
+    server = StandInFTPSServer()
+    tmp = tempfile.mkdtemp()
+    # keepalive_interval=0 -> always NOOP-check before reuse
+    pool = FTPSPool("127.0.0.1", server.password, port=server.port, keepalive_interval=0)
+    try:
+        path = _write_file(tmp, "part.3mf", 1024)
+        await pool.upload(path, "/part.3mf")
+
+        server.drop_connections()
+        await pool.upload(path, "/part_again.3mf")
+
+        assert "/part_again.3mf" in server.files
+        assert server.control_connections == 2
+        # The new control connection resumed the previous TLS session
+        assert server.control_sessions_reused == [False, True]
+    finally:
+        pool.close()
+        server.close()
+        shutil.rmtree(tmp)
+
+    logger.info("Reconnect Test PASSED.")
+
+
+async def _test_bounded_concurrency():
+    server = StandInFTPSServer()
+    tmp = tempfile.mkdtemp()
+    pool = FTPSPool("127.0.0.1", server.password, port=server.port, max_connections=2)
+    try:
+        paths = [_write_file(tmp, f"job{i}.3mf", 64 * 1024) for i in range(6)]
+        await asyncio.gather(*(pool.upload(p, f"/job{i}.3mf") for i, p in enumerate(paths)))
+
+        assert server.stor_count == 6
+        assert server.control_connections <= 2
+    finally:
+        pool.close()
+        server.close()
+        shutil.rmtree(tmp)
+
+    logger.info("Concurrency Test PASSED.")
+
+
+async def _test_content_addressed_dedup():
+    server = StandInFTPSServer()
+    tmp = tempfile.mkdtemp()
+    client = BambuPrinterClient("127.0.0.1", server.password, "SERIAL1")
+    try:
+        path = _write_file(tmp, "benchy.3mf", 32 * 1024)
+        with open(path, "rb") as f:
+            body = f.read()
+
+        remote = await client.ensure_uploaded(path, port=server.port)
+        assert remote.startswith("/fos-") and server.files[remote] == body
+        assert server.stor_count == 1
+
+        # Same content again (e.g. next job of the same product): no upload
+        assert await client.ensure_uploaded(path, port=server.port) == remote
+        assert server.stor_count == 1
+
+        # Deleted on the printer behind our back: SIZE check catches it, re-upload
+        del server.files[remote]
+        assert await client.ensure_uploaded(path, port=server.port) == remote
+        assert server.stor_count == 2
+        assert server.files[remote] == body
+    finally:
+        client.stop()
+        server.close()
+        shutil.rmtree(tmp)
+
+    logger.info("Content-Addressed Dedup Test PASSED.")
+
+
+async def _test_dedup_from_listing():
+    server = StandInFTPSServer()
+    tmp = tempfile.mkdtemp()
+    client = BambuPrinterClient("127.0.0.1", server.password, "SERIAL1")
+    try:
+        path = _write_file(tmp, "gear.3mf", 8 * 1024)
+        with open(path, "rb") as f:
+            body = f.read()
+        md5 = hashlib.md5(body).hexdigest()
+
+        # Already on the SD card from a previous daemon run
+        server.files[content_addressed_path(md5)] = body
+        server.files["/other.3mf"] = b"x"
+
+        assert await client.ensure_uploaded(path, md5=md5, port=server.port) == content_addressed_path(md5)
+        assert server.stor_count == 0
+        assert client.sd_manifest.get("/other.3mf") == {"size": 1, "md5": None}
+    finally:
+        client.stop()
+        server.close()
+        shutil.rmtree(tmp)
+
+    logger.info("Listing Dedup Test PASSED.")
+
+
+async def _test_lru_eviction():
+    server = StandInFTPSServer()
+    tmp = tempfile.mkdtemp()
+    client = BambuPrinterClient("127.0.0.1", server.password, "SERIAL1")
+    saved = bambu_client.SD_CACHE_MAX_FILES, bambu_client.SD_CACHE_MAX_BYTES
+    bambu_client.SD_CACHE_MAX_FILES, bambu_client.SD_CACHE_MAX_BYTES = 3, 0
+    try:
+        # Left over from a previous daemon run, plus a file we did not put there
+        old = _write_file(tmp, "old.3mf", 1024)
+        with open(old, "rb") as f:
+            old_body = f.read()
+        old_remote = content_addressed_path(hashlib.md5(old_body).hexdigest())
+        server.files[old_remote] = old_body
+        server.files["/user.3mf"] = b"x"
+
+        a, b, c, d = (_write_file(tmp, f"{name}.3mf", 1024) for name in "abcd")
+        remote_a = await client.ensure_uploaded(a, port=server.port)
+        remote_b = await client.ensure_uploaded(b, port=server.port)
+        assert old_remote in server.files  # Still within budget: old, a, b
+
+        # Full: the file only known from the listing goes first
+        remote_c = await client.ensure_uploaded(c, port=server.port)
+        assert old_remote not in server.files
+
+        # Reusing a marks it recent, so b is now the oldest
+        assert await client.ensure_uploaded(a, port=server.port) == remote_a
+        await client.ensure_uploaded(d, port=server.port, keep=[remote_b])
+        assert remote_b in server.files and remote_a in server.files
+        assert remote_c not in server.files
+        assert client.sd_manifest.get(remote_c) is None
+
+        # Files we did not name are never evicted
+        assert "/user.3mf" in server.files
+    finally:
+        bambu_client.SD_CACHE_MAX_FILES, bambu_client.SD_CACHE_MAX_BYTES = saved
+        client.stop()
+        server.close()
+        shutil.rmtree(tmp)
+
+    logger.info("LRU Eviction Test PASSED.")
+
+
+def test_pooled_upload():
+    asyncio.run(_test_pooled_upload())
+
+def test_reconnect_after_drop():
+    asyncio.run(_test_reconnect_after_drop())
+
+def test_bounded_concurrency():
+    asyncio.run(_test_bounded_concurrency())
+
+def test_content_addressed_dedup():
+    asyncio.run(_test_content_addressed_dedup())
+
+def test_dedup_from_listing():
+    asyncio.run(_test_dedup_from_listing())
+
+def test_lru_eviction():
+    asyncio.run(_test_lru_eviction())
+
+
+if __name__ == "__main__":
+    if not shutil.which("openssl"):
+        logger.warning("openssl CLI not found, skipping FTPS tests.")
+        sys.exit(0)
+    test_pooled_upload()
+    test_reconnect_after_drop()
+    test_bounded_concurrency()
+    test_content_addressed_dedup()
+    test_dedup_from_listing()
+    test_lru_eviction()
+    logger.info("\nALL FTPS POOL TESTS PASSED.")
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+import httpx
+from sqlmodel import select
+from sqlalchemy import update
+from conftest import create_test_database
+from models import (Printer, Order, Job, JobOrder, Product, PrinterTypeEnum, PrinterStatusEnum,
+                    JobStatusEnum, OrderStatusEnum, PlatformEnum)
+from job_planner import plan_jobs, print_variant
+import product_cache
+import worker_service
+import main
+import three_mf
+from database import get_session
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("JobPlannerTest")
+
+PRODUCTS = {
+    "CUBE": Product(name="Cube", sku="CUBE", file_path_3mf="cube.3mf", file_md5="single",
+                    batch_file_path_3mf="cube_x4.3mf", batch_copies=4, batch_file_md5="batched",
+                    batch_plates=[{"index": 1, "gcode_path": "Metadata/plate_1.gcode"}]),
+    "BENCHY": Product(name="Benchy", sku="BENCHY", file_path_3mf="benchy.3mf"),
+}
+
+# (order_id, sku, quantity), oldest first
+ORDERS = [(1, "CUBE", 3), (2, "CUBE", 2), (3, "BENCHY", 2), (4, "CUBE", 4), (5, "UNKNOWN", 1)]
+
+
+async def _test_plan_fans_out_and_batches():
+    planned = plan_jobs(ORDERS, PRODUCTS)
+    cube = [p for p in planned if p["gcode_path"].startswith("cube")]
+    benchy = [p for p in planned if p["gcode_path"] == "benchy.3mf"]
+
+    # 9 CUBE units: two plates of 4 across orders (oldest first), one single leftover
+    assert [(p["gcode_path"], p["copies"], p["units"]) for p in cube] == [
+        ("cube_x4.3mf", 4, [(1, 3), (2, 1)]),
+        ("cube_x4.3mf", 4, [(2, 1), (4, 3)]),
+        ("cube.3mf", 1, [(4, 1)]),
+    ]
+    assert cube[0]["order_id"] == 1 and cube[1]["order_id"] == 2
+    # No batched variant: one job per unit
+    assert [(p["order_id"], p["copies"]) for p in benchy] == [(3, 1), (3, 1)]
+    # Unknown SKU is not planned; every other unit exactly once
+    assert sum(p["copies"] for p in planned) == 3 + 2 + 2 + 4
+
+    # Too few units for a plate: singles
+    assert [p["copies"] for p in plan_jobs([(1, "CUBE", 2), (2, "CUBE", 1)], PRODUCTS)] == [1, 1, 1]
+
+    job = Job(order_id=1, gcode_path="cube_x4.3mf", copies=4)
+    assert print_variant(job, PRODUCTS["CUBE"]).file_md5 == "batched"
+    assert print_variant(Job(order_id=1, gcode_path="cube.3mf"), PRODUCTS["CUBE"]) is PRODUCTS["CUBE"]
+    logger.info("Plan Test PASSED.")
+
+
+async def _test_batched_jobs_complete_orders():
+    engine, session_maker = await create_test_database()
+
+    start = datetime.now() - timedelta(hours=1)
+    async with session_maker() as session:
+        for product in PRODUCTS.values():
+            session.add(Product.model_validate(product.model_dump()))
+        for order_id, sku, quantity in ORDERS:
+            session.add(Order(id=order_id, platform=PlatformEnum.EBAY, platform_order_id=f"PLAN-{order_id}", sku=sku,
+                              quantity=quantity, purchase_date=start + timedelta(minutes=order_id)))
+        session.add(Printer(serial="P0", name="Printer 0", type=PrinterTypeEnum.A1,
+                            current_status=PrinterStatusEnum.PRINTING))
+        await session.commit()
+    product_cache.invalidate()
+    worker_service.PRINTER_STATE_CACHE.clear()
+    worker_service.DIRTY_FIELDS.clear()
+
+    try:
+        # STEP 1.5
+        async with session_maker() as session:
+            assert await worker_service.create_jobs_from_open_orders(session) == 5
+            await session.commit()
+
+        async with session_maker() as session:
+            jobs = (await session.execute(select(Job).order_by(Job.id))).scalars().all()
+            links = (await session.execute(select(JobOrder.job_id, JobOrder.order_id, JobOrder.units))).all()
+            statuses = {o.id: o.status for o in (await session.execute(select(Order))).scalars().all()}
+        batched = [j for j in jobs if j.copies == 4]
+        assert len(batched) == 2 and all(j.gcode_path == "cube_x4.3mf" for j in batched)
+        assert sorted(links) == sorted([(batched[0].id, 1, 3), (batched[0].id, 2, 1),
+                                        (batched[1].id, 2, 1), (batched[1].id, 4, 3)])
+        assert statuses == {1: OrderStatusEnum.QUEUED, 2: OrderStatusEnum.QUEUED, 3: OrderStatusEnum.QUEUED,
+                            4: OrderStatusEnum.QUEUED, 5: OrderStatusEnum.DONE}
+
+        async def finish(job_id):
+            # The job is printing on P0 and the printer reports FINISH
+            async with session_maker() as session:
+                await session.execute(update(Job).where(Job.id == job_id)
+                                      .values(status=JobStatusEnum.PRINTING, assigned_printer_serial="P0"))
+                await session.execute(update(Printer).values(current_status=PrinterStatusEnum.PRINTING))
+                await session.commit()
+            worker_service.PRINTER_STATE_CACHE.clear()
+            worker_service.handle_mqtt_update("P0", {"print_status": "FINISH"})
+            async with session_maker() as session:
+                await worker_service.flush_telemetry(session, dict(worker_service.DIRTY_FIELDS))
+                await session.commit()
+            worker_service.DIRTY_FIELDS.clear()
+            async with session_maker() as session:
+                return {o.id: o.status for o in (await session.execute(select(Order))).scalars().all()}
+
+        # First plate completes order 1 (3 units) but not order 2 (1 of 2 units)
+        statuses = await finish(batched[0].id)
+        assert statuses[1] == OrderStatusEnum.DONE and statuses[2] == OrderStatusEnum.QUEUED
+        # Second plate completes order 2; order 4 still has its single leftover unit
+        statuses = await finish(batched[1].id)
+        assert statuses[2] == OrderStatusEnum.DONE and statuses[4] == OrderStatusEnum.QUEUED
+        leftover = next(j for j in jobs if j.order_id == 4 and j.copies == 1)
+        statuses = await finish(leftover.id)
+        assert statuses[4] == OrderStatusEnum.DONE
+    finally:
+        product_cache.invalidate()
+        await engine.dispose()
+    logger.info("Batched Completion Test PASSED.")
+
+
+async def _test_delete_product_removes_batch_files():
+    engine, session_maker = await create_test_database()
+
+    tmp = tempfile.mkdtemp()
+    files = []
+    for name in ("cube.3mf", "cube_x4.3mf"):
+        for suffix in ("", three_mf.METADATA_SUFFIX):
+            files.append(os.path.join(tmp, name + suffix))
+            with open(files[-1], "w") as f:
+                f.write("{}")
+
+    async with session_maker() as session:
+        product = Product(name="Cube", sku="CUBE", file_path_3mf=files[0], batch_file_path_3mf=files[2], batch_copies=4)
+        session.add(product)
+        await session.commit()
+
+    async def override():
+        async with session_maker() as session:
+            yield session
+    main.app.dependency_overrides[get_session] = override
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+    try:
+        response = await client.delete(f"/api/products/{product.id}")
+        assert response.status_code == 200, response.text
+        # Both variants and their metadata sidecars
+        assert [path for path in files if os.path.exists(path)] == []
+    finally:
+        await client.aclose()
+        main.app.dependency_overrides.clear()
+        product_cache.invalidate()
+        await engine.dispose()
+        for path in files:
+            if os.path.exists(path):
+                os.remove(path)
+        os.rmdir(tmp)
+    logger.info("Delete Product Files Test PASSED.")
+
+
+def test_plan_fans_out_and_batches():
+    asyncio.run(_test_plan_fans_out_and_batches())
+
+def test_batched_jobs_complete_orders():
+    asyncio.run(_test_batched_jobs_complete_orders())
+
+def test_delete_product_removes_batch_files():
+    asyncio.run(_test_delete_product_removes_batch_files())
+
+
+if __name__ == "__main__":
+    test_plan_fans_out_and_batches()
+    test_batched_jobs_complete_orders()
+    test_delete_product_removes_batch_files()
+    logger.info("\nALL JOB PLANNER TESTS PASSED.")
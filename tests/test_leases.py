@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+from sqlmodel import select
+from conftest import create_test_database, TEST_DATABASE_URL
+from models import (Printer, Order, Job, Product, PrinterTypeEnum, PrinterStatusEnum, JobStatusEnum,
+                    OrderStatusEnum, PlatformEnum)
+import leases
+import product_cache
+import worker_service
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("LeaseTest")
+
+# SQLite (the default test database) ignores FOR UPDATE / SKIP LOCKED,
+# so these tests cover the lease bookkeeping, not the row locking itself.
+# Point LOCKING_DATABASE_URL at a scratch PostgreSQL database (postgresql+asyncpg://...)
+# to also race two dispatchers against real row locks; its tables are dropped.
+LOCKING_DATABASE_URL = os.getenv("LOCKING_DATABASE_URL")
+
+PLA = [{"slot": "0", "type": "PLA", "color": "#FF0000", "remaining": 100}]
+
+
+async def _setup(printer_count: int, database_url: str = TEST_DATABASE_URL):
+    engine, session_maker = await create_test_database(database_url)
+
+    async with session_maker() as session:
+        for i in range(printer_count):
+            session.add(Printer(serial=f"P{i}", name=f"Printer {i}", type=PrinterTypeEnum.A1, ams_data=PLA))
+        await session.commit()
+    return engine, session_maker
+
+
+async def _test_fair_split():
+    engine, session_maker = await _setup(4)
+
+    async with session_maker() as session:
+        first = await leases.renew_leases(session, ttl=30, dispatcher_id="A")
+    assert len(first) == 4  # Alone -> takes everything
+
+    async with session_maker() as session:
+        second = await leases.renew_leases(session, ttl=30, dispatcher_id="B")
+    assert second == set()  # Nothing free yet
+
+    # A sees B's heartbeat and gives up its surplus, which B then picks up
+    async with session_maker() as session:
+        first = await leases.renew_leases(session, ttl=30, dispatcher_id="A")
+    async with session_maker() as session:
+        second = await leases.renew_leases(session, ttl=30, dispatcher_id="B")
+    assert len(first) == 2 and len(second) == 2 and not first & second
+
+    # Shutdown hands everything back
+    async with session_maker() as session:
+        await leases.release_leases(session, dispatcher_id="B")
+    async with session_maker() as session:
+        first = await leases.renew_leases(session, ttl=30, dispatcher_id="A")
+    assert len(first) == 4
+
+    await engine.dispose()
+    logger.info("Fair Split Test PASSED.")
+
+
+async def _test_expired_lease_is_taken_over():
+    engine, session_maker = await _setup(2)
+
+    # A crashed dispatcher: leases expired, no recent heartbeat
+    async with session_maker() as session:
+        for serial in ("P0", "P1"):
+            printer = await session.get(Printer, serial)
+            printer.lease_owner = "DEAD"
+            printer.lease_expires_at = datetime.now() - timedelta(seconds=1)
+            session.add(printer)
+        await session.commit()
+
+    async with session_maker() as session:
+        owned = await leases.renew_leases(session, ttl=30, dispatcher_id="A")
+    assert owned == {"P0", "P1"}
+
+    await engine.dispose()
+    logger.info("Expired Lease Test PASSED.")
+
+
+async def _test_assign_uses_owned_printers_only():
+    engine, session_maker = await _setup(2)
+    old_ttl, old_id = leases.PRINTER_LEASE_TTL, leases.DISPATCHER_ID
+    leases.PRINTER_LEASE_TTL, leases.DISPATCHER_ID = 30, "A"
+    try:
+        async with session_maker() as session:
+            session.add(Product(name="Cube", sku="CUBE", file_path_3mf="cube.3mf"))
+            for i in range(2):
+                session.add(Order(id=i + 1, platform=PlatformEnum.EBAY, platform_order_id=f"LEASE-{i}", sku="CUBE",
+                                  quantity=1, purchase_date=datetime.now(), status=OrderStatusEnum.QUEUED))
+                session.add(Job(order_id=i + 1, gcode_path="cube.3mf"))
+            # P1 belongs to another live dispatcher
+            other = await session.get(Printer, "P1")
+            other.lease_owner = "B"
+            other.lease_expires_at = datetime.now() + timedelta(seconds=30)
+            session.add(other)
+            await session.commit()
+
+        async with session_maker() as session:
+            await leases.renew_leases(session)
+        product_cache.invalidate()
+
+        async with session_maker() as session:
+            assigned = await worker_service.assign_pending_jobs(session)
+        assert assigned == 1
+
+        async with session_maker() as session:
+            result = await session.execute(select(Job).where(Job.status == JobStatusEnum.UPLOADING))
+            assert [job.assigned_printer_serial for job in result.scalars().all()] == ["P0"]
+            assert (await session.get(Printer, "P1")).current_status == PrinterStatusEnum.IDLE
+    finally:
+        leases.PRINTER_LEASE_TTL, leases.DISPATCHER_ID = old_ttl, old_id
+        product_cache.invalidate()
+        await engine.dispose()
+    logger.info("Owned Printers Test PASSED.")
+
+
+class RacingSession:
+    """
+    Session that waits for its rival after its `locks`-th SELECT ... FOR UPDATE, so both
+    dispatchers have run their locking query before either commits.
+    """
+    def __init__(self, session, barrier: asyncio.Barrier, locks: int):
+        self.session = session
+        self.barrier = barrier
+        self.locks = locks
+
+    async def execute(self, statement, *args, **kwargs):
+        result = await self.session.execute(statement, *args, **kwargs)
+        if getattr(statement, "_for_update_arg", None) is not None:
+            self.locks -= 1
+            if self.locks == 0:
+                try:
+                    await asyncio.wait_for(self.barrier.wait(), timeout=2)
+                except (asyncio.TimeoutError, asyncio.BrokenBarrierError):
+                    # The rival is blocked on our locks instead of skipping them
+                    logger.warning("Rival dispatcher did not get past its locking query.")
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+async def _test_concurrent_renewals_are_disjoint():
+    if not LOCKING_DATABASE_URL:
+        logger.info("LOCKING_DATABASE_URL not set, skipping concurrent lease test.")
+        return
+    engine, session_maker = await _setup(4, LOCKING_DATABASE_URL)
+    try:
+        barrier = asyncio.Barrier(2)
+
+        async def renew(dispatcher_id):
+            async with session_maker() as session:
+                return await leases.renew_leases(RacingSession(session, barrier, locks=1), ttl=30,
+                                                 dispatcher_id=dispatcher_id)
+
+        first, second = await asyncio.gather(renew("A"), renew("B"))
+        assert not first & second, f"Both dispatchers leased {first & second}"
+        assert first | second == {"P0", "P1", "P2", "P3"}
+
+        async with session_maker() as session:
+            owners = (await session.execute(select(Printer.serial, Printer.lease_owner))).all()
+        assert {serial for serial, owner in owners if owner == "A"} == first
+        assert {serial for serial, owner in owners if owner == "B"} == second
+    finally:
+        await engine.dispose()
+    logger.info("Concurrent Lease Test PASSED.")
+
+
+async def _test_concurrent_claims_are_disjoint():
+    if not LOCKING_DATABASE_URL:
+        logger.info("LOCKING_DATABASE_URL not set, skipping concurrent claim test.")
+        return
+    engine, session_maker = await _setup(4, LOCKING_DATABASE_URL)
+    saved = leases.PRINTER_LEASE_TTL, leases.DISPATCHER_ID, worker_service.DISPATCH_CLAIM_LIMIT
+    leases.PRINTER_LEASE_TTL = 30
+    # Each pass claims two jobs: the second dispatcher must skip the first one's
+    worker_service.DISPATCH_CLAIM_LIMIT = 2
+    try:
+        async with session_maker() as session:
+            session.add(Product(name="Cube", sku="CUBE", file_path_3mf="cube.3mf"))
+            for i in range(4):
+                session.add(Order(id=i + 1, platform=PlatformEnum.EBAY, platform_order_id=f"CLAIM-{i}", sku="CUBE",
+                                  quantity=1, purchase_date=datetime.now(), status=OrderStatusEnum.QUEUED))
+                session.add(Job(order_id=i + 1, gcode_path="cube.3mf", created_at=datetime.now() + timedelta(seconds=i)))
+            for i in range(4):
+                printer = await session.get(Printer, f"P{i}")
+                printer.lease_owner = "A" if i < 2 else "B"
+                printer.lease_expires_at = datetime.now() + timedelta(seconds=30)
+                session.add(printer)
+            await session.commit()
+        async with session_maker() as session:
+            await product_cache.get_products_by_sku(session)  # Warm: no awaits between the two passes' matching
+
+        barrier = asyncio.Barrier(2)
+
+        async def assign(dispatcher_id):
+            # leased_by_us() reads DISPATCHER_ID before the first query
+            leases.DISPATCHER_ID = dispatcher_id
+            async with session_maker() as session:
+                return await worker_service.assign_pending_jobs(RacingSession(session, barrier, locks=2))
+
+        first = asyncio.create_task(assign("A"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(assign("B"))
+        assert await first + await second == 4
+
+        async with session_maker() as session:
+            jobs = (await session.execute(select(Job))).scalars().all()
+        serials = [job.assigned_printer_serial for job in jobs]
+        assert all(job.status == JobStatusEnum.UPLOADING for job in jobs)
+        assert sorted(serials) == ["P0", "P1", "P2", "P3"], f"Jobs share printers: {serials}"
+    finally:
+        leases.PRINTER_LEASE_TTL, leases.DISPATCHER_ID, worker_service.DISPATCH_CLAIM_LIMIT = saved
+        product_cache.invalidate()
+        await engine.dispose()
+    logger.info("Concurrent Claim Test PASSED.")
+
+
+def test_fair_split():
+    asyncio.run(_test_fair_split())
+
+def test_expired_lease_is_taken_over():
+    asyncio.run(_test_expired_lease_is_taken_over())
+
+def test_assign_uses_owned_printers_only():
+    asyncio.run(_test_assign_uses_owned_printers_only())
+
+def test_concurrent_renewals_are_disjoint():
+    asyncio.run(_test_concurrent_renewals_are_disjoint())
+
+def test_concurrent_claims_are_disjoint():
+    asyncio.run(_test_concurrent_claims_are_disjoint())
+
+
+if __name__ == "__main__":
+    test_fair_split()
+    test_expired_lease_is_taken_over()
+    test_assign_uses_owned_printers_only()
+    test_concurrent_renewals_are_disjoint()
+    test_concurrent_claims_are_disjoint()
+    logger.info("\nALL LEASE TESTS PASSED.")
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timezone
+import httpx
+from sqlmodel import select
+from conftest import create_test_database
+from models import Order, PlatformEnum, SyncCursor
+import marketplace_sync
+import product_cache
+from marketplace_connectors import EbayConnector, EtsyConnector, RateLimiter, ORDER_COLUMNS
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("MarketplaceConnectorsTest")
+
+# Recorded API responses (two pages of two orders each, per marketplace)
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "marketplace")
+
+
+def _fixture(name: str):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+class RecordedApi:
+    """Replays the recorded pages, sliced by the requested offset and limit; no network."""
+
+    def __init__(self, prefix: str, path: str, throttle_first: bool = False):
+        self.path = path
+        self.requests = []
+        self.throttle_first = throttle_first
+        first, second = _fixture(f"{prefix}_offset_0.json"), _fixture(f"{prefix}_offset_2.json")
+        self.key = "orders" if "orders" in first else "results"
+        self.recorded = first
+        self.orders = first[self.key] + second[self.key]
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == self.path
+        self.requests.append((time.monotonic(), request))
+        if self.throttle_first:
+            self.throttle_first = False
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        offset, limit = int(request.url.params["offset"]), int(request.url.params["limit"])
+        return httpx.Response(200, json={**self.recorded, self.key: self.orders[offset:offset + limit]})
+
+
+def _connectors():
+    ebay, etsy = EbayConnector(), EtsyConnector()
+    ebay.user_token = "test-token"
+    etsy.api_key, etsy.access_token, etsy.shop_id = "key", "etsy-token", "555"
+    # Pages of two, as recorded
+    ebay.page_size = etsy.page_size = 2
+    return ebay, etsy
+
+
+async def _test_normalize_fixtures():
+    ebay, etsy = _connectors()
+    local = datetime.now().astimezone().tzinfo
+
+    df = ebay.normalize(_fixture("ebay_orders_offset_0.json")["orders"] + _fixture("ebay_orders_offset_2.json")["orders"])
+    assert list(df.columns) == ORDER_COLUMNS
+    assert df["platform_order_id"].tolist() == ["27-11111-22222", "27-11111-33333", "27-11111-44444"]
+    # First line item of multi-item orders; listings without SKU
+    assert df["sku"].tolist() == ["CUBE", "BENCHY", "UNKNOWN_SKU"]
+    assert df["quantity"].tolist() == [2, 1, 1]
+    assert df["purchase_date"][0].to_pydatetime() == \
+        datetime(2026, 3, 1, 10, 15, 30, tzinfo=timezone.utc).astimezone(local).replace(tzinfo=None)
+
+    df = etsy.normalize(_fixture("etsy_receipts_offset_0.json")["results"] + _fixture("etsy_receipts_offset_2.json")["results"])
+    assert list(df.columns) == ORDER_COLUMNS and set(df["platform"]) == {"ETSY"}
+    assert df["platform_order_id"].tolist() == ["3012345601", "3012345602", "3012345603"]
+    assert df["sku"].tolist() == ["CUBE", "BENCHY", "UNKNOWN_SKU"]
+    assert df["quantity"].tolist() == [3, 1, 1]
+    assert df["purchase_date"][0].to_pydatetime() == \
+        datetime.fromtimestamp(1772360130, timezone.utc).astimezone(local).replace(tzinfo=None)
+
+    assert ebay.normalize([]).empty and etsy.normalize([{"receipt_id": 1, "transactions": []}]).empty
+    logger.info("Normalize Fixtures Test PASSED.")
+
+
+async def _test_connectors_sync_concurrently():
+    engine, session_maker = await create_test_database()
+    product_cache.invalidate()
+
+    ebay, etsy = _connectors()
+    ebay_api = RecordedApi("ebay_orders", ebay.orders_path)
+    etsy_api = RecordedApi("etsy_receipts", etsy.receipts_path, throttle_first=True)
+    try:
+        async with ebay.client(transport=httpx.MockTransport(ebay_api)) as ebay_client, \
+                etsy.client(transport=httpx.MockTransport(etsy_api)) as etsy_client:
+            created = await asyncio.gather(
+                marketplace_sync.sync_connector(ebay, ebay_client, session_maker),
+                marketplace_sync.sync_connector(etsy, etsy_client, session_maker),
+            )
+        assert created == [3, 3]
+
+        # Each connector's own auth and window parameters
+        _, request = ebay_api.requests[0]
+        assert request.headers["Authorization"] == "Bearer test-token"
+        assert request.url.params["filter"].startswith("lastmodifieddate:[")
+        _, request = etsy_api.requests[-1]
+        assert request.headers["x-api-key"] == "key" and request.headers["Authorization"] == "Bearer etsy-token"
+        assert int(request.url.params["min_last_modified"]) < int(request.url.params["max_last_modified"])
+        # One throttled request retried; the second page re-reads the first page's last receipt
+        assert [r.url.params["offset"] for _, r in etsy_api.requests] == ["0", "0", "1"]
+
+        async with session_maker() as session:
+            orders = (await session.execute(select(Order))).scalars().all()
+            assert sorted((o.platform, o.platform_order_id) for o in orders)[0] == (PlatformEnum.EBAY, "27-11111-22222")
+            assert {o.platform for o in orders} == {PlatformEnum.EBAY, PlatformEnum.ETSY} and len(orders) == 6
+            cursors = (await session.execute(select(SyncCursor))).scalars().all()
+            assert {c.platform for c in cursors} == {PlatformEnum.EBAY, PlatformEnum.ETSY}
+            assert all(c.last_modified and c.continuation is None for c in cursors)
+    finally:
+        await engine.dispose()
+    logger.info("Concurrent Connectors Test PASSED.")
+
+
+async def _test_rate_limiter_spacing():
+    limiter = RateLimiter(rate=20)
+    started = time.monotonic()
+    await asyncio.gather(*(limiter.wait() for _ in range(5)))
+    # First call immediately, then 4 x 50 ms
+    assert time.monotonic() - started >= 0.19
+
+    unlimited = RateLimiter(rate=0)
+    started = time.monotonic()
+    await asyncio.gather(*(unlimited.wait() for _ in range(100)))
+    assert time.monotonic() - started < 0.1
+    logger.info("Rate Limiter Test PASSED.")
+
+
+def test_normalize_fixtures():
+    asyncio.run(_test_normalize_fixtures())
+
+def test_connectors_sync_concurrently():
+    asyncio.run(_test_connectors_sync_concurrently())
+
+def test_rate_limiter_spacing():
+    asyncio.run(_test_rate_limiter_spacing())
+
+
+if __name__ == "__main__":
+    test_normalize_fixtures()
+    test_connectors_sync_concurrently()
+    test_rate_limiter_spacing()
+    logger.info("\nALL MARKETPLACE CONNECTOR TESTS PASSED.")
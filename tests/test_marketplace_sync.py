@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import re
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta, timezone
+import httpx
+from sqlmodel import select
+from sqlalchemy import func
+from conftest import create_test_database
+from models import Order, PlatformEnum, SyncCursor
+import marketplace_sync
+from marketplace_connectors import EbayConnector, CONNECTOR_PAGE_OVERLAP
+import product_cache
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("MarketplaceSyncTest")
+
+FILTER = re.compile(r"lastmodifieddate:\[(.+)\.\.(.+)\]")
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class MockFulfillmentApi:
+    """getOrders honouring the lastmodifieddate filter and offset/limit."""
+
+    def __init__(self):
+        self.orders = []
+        self.calls = []
+        self.fail_at_offset = None
+        self.on_request = None
+
+    def add(self, count: int, modified: datetime):
+        start = len(self.orders)
+        for i in range(start, start + count):
+            self.orders.append({
+                "orderId": f"EB-{i}",
+                "creationDate": modified.isoformat() + "Z",
+                "lastModifiedDate": modified,
+                "lineItems": [{"sku": "CUBE", "quantity": 1}],
+            })
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        start, end = (_parse(v) for v in FILTER.fullmatch(request.url.params["filter"]).groups())
+        offset = int(request.url.params["offset"])
+        limit = int(request.url.params["limit"])
+        self.calls.append((start, end, offset))
+        if self.on_request:
+            self.on_request()
+        if offset == self.fail_at_offset:
+            return httpx.Response(400, json={"errors": [{"message": "boom"}]})
+
+        matching = [o for o in self.orders if start <= o["lastModifiedDate"] <= end]
+        page = [{k: v for k, v in o.items() if k != "lastModifiedDate"} for o in matching[offset:offset + limit]]
+        return httpx.Response(200, json={"total": len(matching), "limit": limit, "offset": offset, "orders": page})
+
+
+async def _setup():
+    engine, session_maker = await create_test_database()
+    product_cache.invalidate()
+    return engine, session_maker
+
+
+async def _count(session_maker):
+    async with session_maker() as session:
+        return (await session.execute(select(func.count()).select_from(Order))).scalar()
+
+
+async def _cursor(session_maker):
+    async with session_maker() as session:
+        return await session.get(SyncCursor, PlatformEnum.EBAY)
+
+
+async def _test_incremental_windows():
+    engine, session_maker = await _setup()
+    api = MockFulfillmentApi()
+    api.add(3, _utcnow() - timedelta(days=60))  # Older than the initial lookback
+    api.add(5, _utcnow() - timedelta(days=2))
+    try:
+        ebay = EbayConnector()
+        async with ebay.client(transport=httpx.MockTransport(api)) as client:
+            assert await marketplace_sync.sync_connector(ebay, client, session_maker) == 5
+            cursor = await _cursor(session_maker)
+            assert cursor.last_modified and cursor.window_end is None and cursor.continuation is None
+            high_water_mark = cursor.last_modified
+
+            # Nothing changed: one request for the delta, starting at the high-water mark minus overlap
+            api.calls.clear()
+            assert await marketplace_sync.sync_connector(ebay, client, session_maker) == 0
+            assert len(api.calls) == 1
+            assert api.calls[0][0] == high_water_mark - marketplace_sync.SYNC_OVERLAP
+
+            await asyncio.sleep(0.01)
+            api.add(2, _utcnow())
+            assert await marketplace_sync.sync_connector(ebay, client, session_maker) == 2
+            assert await _count(session_maker) == 7
+    finally:
+        await engine.dispose()
+    logger.info("Incremental Windows Test PASSED.")
+
+
+async def _test_interrupted_sync_resumes():
+    engine, session_maker = await _setup()
+    api = MockFulfillmentApi()
+    api.add(450, _utcnow() - timedelta(hours=1))
+    page_size = EbayConnector.page_size
+    # Later pages start this far before the previous page's end
+    step = page_size - CONNECTOR_PAGE_OVERLAP
+    try:
+        ebay = EbayConnector()
+        async with ebay.client(transport=httpx.MockTransport(api)) as client:
+            api.fail_at_offset = step
+            try:
+                await marketplace_sync.sync_connector(ebay, client, session_maker)
+                assert False, "Expected the failing page to raise"
+            except httpx.HTTPStatusError:
+                pass
+
+            # The first page and the cursor committed together
+            cursor = await _cursor(session_maker)
+            assert cursor.continuation == f"{page_size}:EB-{page_size - 1}" and cursor.last_modified is None
+            assert await _count(session_maker) == page_size
+            window = (cursor.window_start, cursor.window_end)
+
+            api.fail_at_offset = None
+            api.calls.clear()
+            assert await marketplace_sync.sync_connector(ebay, client, session_maker) == 450 - page_size
+            # Resumed the same window at the next page
+            assert [c[2] for c in api.calls] == [step, 2 * step]
+            assert {(c[0], c[1]) for c in api.calls} == {window}
+            cursor = await _cursor(session_maker)
+            assert cursor.last_modified == window[1] and cursor.continuation is None
+            assert await _count(session_maker) == 450
+    finally:
+        await engine.dispose()
+    logger.info("Interrupted Sync Test PASSED.")
+
+
+async def _test_orders_leaving_window_are_not_skipped():
+    page_size = EbayConnector.page_size
+    # Within the page overlap, and more than it covers (the window is paged again)
+    for moved in (1, CONNECTOR_PAGE_OVERLAP + 5):
+        engine, session_maker = await _setup()
+        api = MockFulfillmentApi()
+        api.add(450, _utcnow() - timedelta(hours=1))
+        try:
+            ebay = EbayConnector()
+            async with ebay.client(transport=httpx.MockTransport(api)) as client:
+                api.fail_at_offset = page_size - CONNECTOR_PAGE_OVERLAP
+                try:
+                    await marketplace_sync.sync_connector(ebay, client, session_maker)
+                except httpx.HTTPStatusError:
+                    pass
+                assert await _count(session_maker) == page_size
+
+                # Orders from the first page are modified: they leave the window, later ones move up
+                for order in api.orders[:moved]:
+                    order["lastModifiedDate"] = _utcnow() + timedelta(minutes=1)
+
+                api.fail_at_offset = None
+                await marketplace_sync.sync_connector(ebay, client, session_maker)
+                assert await _count(session_maker) == 450, f"Orders skipped after {moved} moved"
+        finally:
+            await engine.dispose()
+    logger.info("Orders Leaving Window Test PASSED.")
+
+
+async def _test_no_transaction_during_fetch():
+    engine, session_maker = await _setup()
+    api = MockFulfillmentApi()
+    api.add(450, _utcnow() - timedelta(hours=1))
+
+    open_sessions = [0]
+
+    class TrackedSession:
+        def __init__(self):
+            self.session = session_maker()
+
+        async def __aenter__(self):
+            open_sessions[0] += 1
+            return await self.session.__aenter__()
+
+        async def __aexit__(self, *exc):
+            open_sessions[0] -= 1
+            return await self.session.__aexit__(*exc)
+
+    def on_request():
+        # No cursor lock (or any transaction) is held while the API is called
+        assert open_sessions[0] == 0
+
+    api.on_request = on_request
+    try:
+        ebay = EbayConnector()
+        async with ebay.client(transport=httpx.MockTransport(api)) as client:
+            assert await marketplace_sync.sync_connector(ebay, client, TrackedSession) == 450
+        assert len(api.calls) == 3
+    finally:
+        await engine.dispose()
+    logger.info("No Transaction During Fetch Test PASSED.")
+
+
+def test_incremental_windows():
+    asyncio.run(_test_incremental_windows())
+
+def test_interrupted_sync_resumes():
+    asyncio.run(_test_interrupted_sync_resumes())
+
+def test_orders_leaving_window_are_not_skipped():
+    asyncio.run(_test_orders_leaving_window_are_not_skipped())
+
+def test_no_transaction_during_fetch():
+    asyncio.run(_test_no_transaction_during_fetch())
+
+
+if __name__ == "__main__":
+    test_incremental_windows()
+    test_interrupted_sync_resumes()
+    test_orders_leaving_window_are_not_skipped()
+    test_no_transaction_during_fetch()
+    logger.info("\nALL MARKETPLACE SYNC TESTS PASSED.")
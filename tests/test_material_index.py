@@ -0,0 +1,112 @@
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import Printer, Product, PrinterTypeEnum
+from material_index import MaterialIndex
+from color_match import hex_to_lab, colors_match, colors_within
+from worker_service import check_material_match
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("MaterialIndexTest")
+
+
+def make_printer(serial, ams_data):
+    return Printer(serial=serial, name=serial, type=PrinterTypeEnum.A1, ams_data=ams_data)
+
+
+def make_product(filament_type, color=None):
+    return Product(name="Test", sku="TEST", file_path_3mf="test.3mf",
+                   required_filament_type=filament_type, required_filament_color=color)
+
+
+PRINTERS = [
+    make_printer("P1", [{"slot": "0", "type": "PETG", "color": "#000000"}, {"slot": "1", "type": "pla", "color": "#ff0000"}]),
+    make_printer("P2", [{"slot": "2", "type": "PLA", "color": "#FF0000"}]),
+    make_printer("P3", []),
+]
+
+
+def test_matches_linear_scan():
+    index = MaterialIndex()
+    index.reset(PRINTERS)
+
+    for product in [make_product("PLA", "#FF0000"), make_product("PETG"), make_product("ABS"),
+                    make_product("PLA", "#00FF00"), make_product(None)]:
+        expected = None
+        for p in PRINTERS:
+            slot = check_material_match(p, product)
+            if slot is not None:
+                expected = (p.serial, slot)
+                break
+        assert index.find(product.required_filament_type, product.required_filament_color) == expected
+
+    logger.info("Linear Parity Test PASSED.")
+
+
+def test_assigned_printer_leaves_index():
+    index = MaterialIndex()
+    index.reset(PRINTERS)
+
+    assert index.find("PLA", "#ff0000") == ("P1", 1)
+    index.remove_printer("P1")
+    assert index.find("PLA", "#ff0000") == ("P2", 2)
+    index.remove_printer("P2")
+    assert index.find("PLA", "#ff0000") is None
+    assert len(index) == 1
+
+    logger.info("Removal Test PASSED.")
+
+
+def test_incremental_ams_update():
+    index = MaterialIndex()
+    index.reset(PRINTERS)
+
+    assert index.find("ABS", None) is None
+    index.update_printer("P3", [{"slot": "3", "type": "ABS", "color": "#FFFFFF"}])
+    assert index.find("ABS", "#ffffff") == ("P3", 3)
+
+    # Spool swapped out -> old material gone
+    index.update_printer("P2", [{"slot": "2", "type": "PETG", "color": "#FF0000"}])
+    index.remove_printer("P1")
+    assert index.find("PLA", "#FF0000") is None
+
+    logger.info("Incremental Update Test PASSED.")
+
+
+def test_color_tolerance():
+    # Reference values for sRGB red under D65
+    l, a, b = hex_to_lab("#FF0000")
+    assert abs(l - 53.24) < 0.05 and abs(a - 80.09) < 0.05 and abs(b - 67.20) < 0.05
+
+    assert colors_match("#FF0000", "#fe0000", tolerance=2.3)
+    assert not colors_match("#FF0000", "#fe0000", tolerance=0)
+    assert not colors_match("#FF0000", "#00FF00", tolerance=2.3)
+    assert colors_within("#FF0000", ["#00ff00", "#fd0000", "#fe0000"], tolerance=2.3) == ["#fe0000", "#fd0000"]
+
+    printers = [
+        make_printer("P1", [{"slot": "0", "type": "PLA", "color": "#FD0000"}]),
+        make_printer("P2", [{"slot": "1", "type": "PLA", "color": "#FE0000"}]),
+    ]
+    strict = MaterialIndex(color_tolerance=0)
+    strict.reset(printers)
+    assert strict.find("PLA", "#FF0000") is None
+
+    # Closest loaded color wins, then printer order
+    tolerant = MaterialIndex(color_tolerance=2.3)
+    tolerant.reset(printers)
+    assert tolerant.find("PLA", "#FF0000") == ("P2", 1)
+    assert tolerant.candidates("PLA", "#FF0000") == {"P2": 1, "P1": 0}
+    assert tolerant.find("PETG", "#FF0000") is None
+
+    logger.info("Color Tolerance Test PASSED.")
+
+
+if __name__ == "__main__":
+    test_matches_linear_scan()
+    test_assigned_printer_leaves_index()
+    test_incremental_ams_update()
+    test_color_tolerance()
+    logger.info("\nALL MATERIAL INDEX TESTS PASSED.")
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+import httpx
+from sqlalchemy import update
+from conftest import create_test_database
+from models import Order, OrderStatusEnum, PlatformEnum
+import main
+from database import get_session
+from pagination import encode_cursor
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("OrdersApiTest")
+
+
+async def _setup(order_count: int):
+    engine, session_maker = await create_test_database()
+
+    # Updated "long ago", so the settle window does not hide them
+    old = datetime.now() - timedelta(minutes=5)
+    async with session_maker() as session:
+        for i in range(order_count):
+            session.add(Order(
+                platform=PlatformEnum.ETSY if i % 2 else PlatformEnum.EBAY,
+                platform_order_id=f"API-{i}",
+                sku="CUBE" if i % 3 else "BENCHY",
+                quantity=1,
+                # Pairs share a purchase date -> id must break the tie
+                purchase_date=old - timedelta(minutes=i // 2),
+                status=OrderStatusEnum.DONE if i % 4 else OrderStatusEnum.OPEN,
+                updated_at=old
+            ))
+        await session.commit()
+
+    async def override():
+        async with session_maker() as session:
+            yield session
+    main.app.dependency_overrides[get_session] = override
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+    return engine, session_maker, client
+
+
+async def _teardown(engine, client):
+    await client.aclose()
+    main.app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+async def _test_keyset_pages():
+    engine, _, client = await _setup(25)
+    try:
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+            page = (await client.get("/orders", params=params)).json()
+            seen.extend(page["orders"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        # Every order exactly once, newest first, ties broken by id
+        assert len(seen) == 25 and len({o["id"] for o in seen}) == 25
+        keys = [(o["purchase_date"], o["id"]) for o in seen]
+        assert keys == sorted(keys, reverse=True)
+
+        # Filters and compact projection
+        page = (await client.get("/orders", params={"status": "OPEN", "platform": "EBAY", "compact": "true"})).json()
+        assert page["orders"] and all(o["status"] == "OPEN" and o["platform"] == "EBAY" for o in page["orders"])
+        # What OrdersView renders
+        assert page["orders"][0]["quantity"] == 1 and "error_message" in page["orders"][0]
+        page = (await client.get("/orders", params={"sku": "BENCHY", "direction": "asc"})).json()
+        assert len(page["orders"]) == 9 and all(o["sku"] == "BENCHY" for o in page["orders"])
+
+        assert (await client.get("/orders", params={"cursor": "garbage"})).status_code == 400
+    finally:
+        await _teardown(engine, client)
+    logger.info("Keyset Pages Test PASSED.")
+
+
+async def _test_since_returns_only_changes():
+    engine, session_maker, client = await _setup(5)
+    try:
+        first = (await client.get("/orders")).json()
+        since = first["since"]
+        assert (await client.get("/orders", params={"since": since})).json()["orders"] == []
+
+        # A status change (Core UPDATE, as worker_service does) and a new order, both settled
+        changed_at = datetime.now() - timedelta(seconds=10)
+        async with session_maker() as session:
+            await session.execute(update(Order).where(Order.platform_order_id == "API-1")
+                                  .values(status=OrderStatusEnum.FAILED, updated_at=changed_at))
+            session.add(Order(platform=PlatformEnum.EBAY, platform_order_id="API-NEW", sku="CUBE", quantity=1,
+                              purchase_date=datetime.now(), updated_at=changed_at))
+            await session.commit()
+        main.RESPONSE_CACHE.bump("orders")  # What the daemon's ORDER_CHANNEL notification does
+
+        # The changes are backdated (settled), so start from a cursor just before them
+        since = encode_cursor(changed_at - timedelta(seconds=1), 0)
+        page = (await client.get("/orders", params={"since": since, "limit": 1})).json()
+        assert page["has_more"] and len(page["orders"]) == 1
+        page2 = (await client.get("/orders", params={"since": page["since"], "limit": 1})).json()
+        assert not page2["has_more"]
+        changed = {o["platform_order_id"]: o["status"] for o in page["orders"] + page2["orders"]}
+        assert changed == {"API-1": "FAILED", "API-NEW": "OPEN"}
+
+        # Fresh changes wait out the settle window
+        async with session_maker() as session:
+            await session.execute(update(Order).where(Order.platform_order_id == "API-2")
+                                  .values(status=OrderStatusEnum.FAILED))
+            await session.commit()
+        main.RESPONSE_CACHE.bump("orders")
+        page3 = (await client.get("/orders", params={"since": page2["since"]})).json()
+        assert page3["orders"] == [] and page3["since"] == page2["since"]
+    finally:
+        await _teardown(engine, client)
+    logger.info("Since Cursor Test PASSED.")
+
+
+async def _test_since_not_cached_across_settle():
+    engine, session_maker, client = await _setup(5)
+    old_max_age, old_settle = main.RESPONSE_CACHE.max_age, main.ORDER_SINCE_SETTLE
+    main.RESPONSE_CACHE.max_age = 3600  # As with NOTIFY: versions only move on writes
+    main.ORDER_SINCE_SETTLE = 0.5
+    try:
+        since = (await client.get("/orders")).json()["since"]
+
+        # A change lands inside the settle window; the client polls right away
+        async with session_maker() as session:
+            await session.execute(update(Order).where(Order.platform_order_id == "API-3")
+                                  .values(status=OrderStatusEnum.FAILED))
+            await session.commit()
+        main.RESPONSE_CACHE.bump("orders")
+        response = await client.get("/orders", params={"since": since})
+        assert response.json()["orders"] == []
+        assert "ETag" not in response.headers
+
+        # Once the window has passed, the same poll returns the change (no write in between)
+        await asyncio.sleep(main.ORDER_SINCE_SETTLE + 0.1)
+        response = await client.get("/orders", params={"since": since},
+                                    headers={"If-None-Match": response.headers.get("ETag", "*")})
+        assert response.status_code == 200
+        assert [o["platform_order_id"] for o in response.json()["orders"]] == ["API-3"]
+    finally:
+        main.RESPONSE_CACHE.max_age, main.ORDER_SINCE_SETTLE = old_max_age, old_settle
+        await _teardown(engine, client)
+    logger.info("Since Not Cached Test PASSED.")
+
+
+def test_keyset_pages():
+    asyncio.run(_test_keyset_pages())
+
+def test_since_returns_only_changes():
+    asyncio.run(_test_since_returns_only_changes())
+
+def test_since_not_cached_across_settle():
+    asyncio.run(_test_since_not_cached_across_settle())
+
+
+if __name__ == "__main__":
+    test_keyset_pages()
+    test_since_returns_only_changes()
+    test_since_not_cached_across_settle()
+    logger.info("\nALL ORDERS API TESTS PASSED.")
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import shutil
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models import Printer, Product, Job, PrinterTypeEnum, PrinterStatusEnum
+from bambu_client import BambuPrinterClient
+import prestage
+from prestage import PrestageScheduler, predict_next_jobs
+from ftps_standin import StandInFTPSServer
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("PrestageTest")
+
+
+def make_printer(serial, remaining_time, ams_data):
+    return Printer(serial=serial, name=serial, type=PrinterTypeEnum.A1, ams_data=ams_data,
+                   current_status=PrinterStatusEnum.PRINTING, remaining_time=remaining_time)
+
+
+def make_product(filament_type, color=None, path="test.3mf"):
+    return Product(name="Test", sku="TEST", file_path_3mf=path,
+                   required_filament_type=filament_type, required_filament_color=color)
+
+
+def make_job(job_id, path):
+    return Job(id=job_id, order_id=job_id, gcode_path=path)
+
+
+def _write_file(directory: str, name: str, size: int) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def test_prediction_follows_greedy_dispatch():
+    pla_red = [{"slot": "0", "type": "PLA", "color": "#FF0000"}]
+    printers = [
+        make_printer("LATE", 9, pla_red),
+        make_printer("SOON", 2, pla_red),
+        make_printer("PETG", 5, [{"slot": "1", "type": "PETG", "color": "#000000"}]),
+    ]
+    red, petg = make_product("PLA", "#FF0000"), make_product("PETG")
+    pending = [(make_job(1, "a.3mf"), red), (make_job(2, "b.3mf"), petg), (make_job(3, "c.3mf"), red),
+               (make_job(4, "d.3mf"), red)]
+
+    predictions = predict_next_jobs(printers, pending)
+
+    # Oldest red job goes to the printer finishing first
+    assert {serial: job.id for serial, (job, _) in predictions.items()} == {"SOON": 1, "PETG": 2, "LATE": 3}
+    logger.info("Prediction Test PASSED.")
+
+
+async def _test_stage_take_and_evict():
+    server = StandInFTPSServer()
+    tmp = tempfile.mkdtemp()
+    client = BambuPrinterClient("127.0.0.1", server.password, "P1")
+    scheduler = PrestageScheduler(port=server.port)
+    try:
+        first, second = _write_file(tmp, "first.3mf", 16 * 1024), _write_file(tmp, "second.3mf", 16 * 1024)
+        job1, job2 = make_job(1, first), make_job(2, second)
+        product = make_product("PLA")
+
+        # Staged in the background, then handed to the dispatcher
+        scheduler.apply({"P1": (job1, product)}, {"P1": client})
+        staged_path = await scheduler.staged["P1"].task
+        assert staged_path in server.files and server.stor_count == 1
+
+        task = scheduler.take(client, first)
+        assert await task == staged_path
+        assert "P1" not in scheduler.staged
+
+        # Prediction changes after staging finished -> file is evicted from the SD card
+        scheduler.mark_in_use("P1", staged_path)
+        scheduler.apply({"P1": (job2, product)}, {"P1": client})
+        second_path = await scheduler.staged["P1"].task
+        scheduler.apply({}, {"P1": client})
+        await asyncio.gather(*scheduler._background)
+        assert second_path not in server.files
+        # The file P1 is printing from stays
+        assert staged_path in server.files
+    finally:
+        scheduler.cancel_all()
+        client.stop()
+        server.close()
+        shutil.rmtree(tmp)
+
+    logger.info("Stage/Take/Evict Test PASSED.")
+
+
+async def _test_cancel_in_flight():
+    server = StandInFTPSServer()
+    tmp = tempfile.mkdtemp()
+    client = BambuPrinterClient("127.0.0.1", server.password, "P1")
+    scheduler = PrestageScheduler(port=server.port)
+    try:
+        big = _write_file(tmp, "big.3mf", 32 * 1024 * 1024)
+        scheduler.apply({"P1": (make_job(1, big), make_product("PLA"))}, {"P1": client})
+        staged = scheduler.staged["P1"]
+        await asyncio.sleep(0.3)
+
+        # Printer no longer about to finish: upload is cancelled (or evicted if it already finished)
+        scheduler.apply({}, {"P1": client})
+        await asyncio.gather(staged.task, return_exceptions=True)
+        await asyncio.gather(*scheduler._background)
+
+        assert not scheduler.staged
+        assert staged.remote_path not in server.files
+        assert client.sd_manifest.get(staged.remote_path) is None
+    finally:
+        client.stop()
+        server.close()
+        shutil.rmtree(tmp)
+
+    logger.info("Cancel In-Flight Test PASSED.")
+
+
+async def _test_evict_waits_for_dispatch():
+    server = StandInFTPSServer()
+    tmp = tempfile.mkdtemp()
+    client = BambuPrinterClient("127.0.0.1", server.password, "P1")
+    scheduler = PrestageScheduler(port=server.port)
+    try:
+        path = _write_file(tmp, "next.3mf", 16 * 1024)
+        scheduler.apply({"P1": (make_job(1, path), make_product("PLA"))}, {"P1": client})
+        staged_path = await scheduler.staged["P1"].task
+
+        # The printer gets a job for the same file (without the staging task) while the
+        # prediction is dropped: eviction must not delete what ensure_uploaded just found
+        async with scheduler.dispatch_lock("P1"):
+            scheduler.apply({}, {"P1": client})
+            assert await client.ensure_uploaded(path, port=server.port) == staged_path
+            scheduler.mark_in_use("P1", staged_path)
+        await asyncio.gather(*scheduler._background)
+
+        assert staged_path in server.files
+        assert server.stor_count == 1
+    finally:
+        scheduler.cancel_all()
+        client.stop()
+        server.close()
+        shutil.rmtree(tmp)
+
+    logger.info("Evict Waits For Dispatch Test PASSED.")
+
+
+async def _test_failed_staging_backs_off():
+    tmp = tempfile.mkdtemp()
+    client = BambuPrinterClient("127.0.0.1", "unused", "P1")
+    scheduler = PrestageScheduler()
+    saved = prestage.PRESTAGE_RETRY_BASE
+    prestage.PRESTAGE_RETRY_BASE = 0.2
+    try:
+        # Staging fails before any upload (the file cannot be read)
+        missing = make_job(1, os.path.join(tmp, "missing.3mf"))
+        product = make_product("PLA")
+        scheduler.apply({"P1": (missing, product)}, {"P1": client})
+        assert await scheduler.staged["P1"].task is None
+
+        # Not retried on the next passes while the backoff runs...
+        scheduler.apply({"P1": (missing, product)}, {"P1": client})
+        scheduler.apply({"P1": (missing, product)}, {"P1": client})
+        assert "P1" not in scheduler.staged
+
+        # ...then retried, and the next backoff is twice as long
+        await asyncio.sleep(0.25)
+        scheduler.apply({"P1": (missing, product)}, {"P1": client})
+        assert await scheduler.staged["P1"].task is None
+        scheduler.apply({"P1": (missing, product)}, {"P1": client})
+        await asyncio.sleep(0.25)
+        scheduler.apply({"P1": (missing, product)}, {"P1": client})
+        assert "P1" not in scheduler.staged
+
+        # A different file for the same printer is not held back
+        other = _write_file(tmp, "other.3mf", 1024)
+        scheduler.apply({"P1": (make_job(2, other), product)}, {"P1": client})
+        assert scheduler.staged["P1"].job_id == 2
+    finally:
+        prestage.PRESTAGE_RETRY_BASE = saved
+        scheduler.cancel_all()
+        client.stop()
+        shutil.rmtree(tmp)
+
+    logger.info("Failed Staging Backoff Test PASSED.")
+
+
+def test_stage_take_and_evict():
+    asyncio.run(_test_stage_take_and_evict())
+
+def test_cancel_in_flight():
+    asyncio.run(_test_cancel_in_flight())
+
+def test_evict_waits_for_dispatch():
+    asyncio.run(_test_evict_waits_for_dispatch())
+
+def test_failed_staging_backs_off():
+    asyncio.run(_test_failed_staging_backs_off())
+
+
+if __name__ == "__main__":
+    test_prediction_follows_greedy_dispatch()
+    if not shutil.which("openssl"):
+        logger.warning("openssl CLI not found, skipping FTPS tests.")
+        sys.exit(0)
+    test_stage_take_and_evict()
+    test_cancel_in_flight()
+    test_evict_waits_for_dispatch()
+    test_failed_staging_backs_off()
+    logger.info("\nALL PRESTAGE TESTS PASSED.")
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from conftest import create_test_database
+from models import Printer, PrinterTypeEnum, PrinterStatusEnum
+from printer_stream import PrinterStream
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("PrinterStreamTest")
+
+
+async def _setup(printer_count: int):
+    engine, session_maker = await create_test_database()
+
+    async with session_maker() as session:
+        for i in range(printer_count):
+            session.add(Printer(serial=f"P{i}", name=f"Printer {i}", type=PrinterTypeEnum.A1,
+                                ams_data=[{"slot": "0", "type": "PLA", "color": "#FF0000"}]))
+        await session.commit()
+    return engine, session_maker
+
+
+def _parse(message: str):
+    lines = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return lines["event"], json.loads(lines["data"])
+
+
+async def _test_snapshot_then_deltas():
+    engine, session_maker = await _setup(3)
+    stream = PrinterStream(session_maker)
+    try:
+        clients = [stream.events() for _ in range(5)]
+        for client in clients:
+            kind, data = _parse(await client.__anext__())
+            assert kind == "snapshot" and len(data["printers"]) == 3
+            assert "lease_owner" not in data["printers"][0]
+
+        # Count queries from here on
+        queries = []
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+
+        async with session_maker() as session:
+            printer = await session.get(Printer, "P1")
+            printer.current_status = PrinterStatusEnum.PRINTING
+            printer.current_progress = 42
+            session.add(printer)
+            await session.commit()
+        queries.clear()
+
+        # What the daemon's PRINTER_CHANNEL notification triggers
+        stream.on_notification("P1")
+        for client in clients:
+            kind, data = _parse(await asyncio.wait_for(client.__anext__(), 5))
+            assert kind == "delta"
+            # Only the changed fields of the changed printer
+            assert data["printers"] == {"P1": {"current_status": "PRINTING", "current_progress": 42}}
+
+        # One read for five dashboards
+        assert len(queries) == 1 and stream.refreshes == 2
+        for client in clients:
+            await client.aclose()
+    finally:
+        await stream.stop()
+        await engine.dispose()
+    logger.info("Snapshot/Delta Test PASSED.")
+
+
+async def _test_removed_printer_resends_snapshot():
+    engine, session_maker = await _setup(2)
+    stream = PrinterStream(session_maker)
+    try:
+        client = stream.events()
+        kind, data = _parse(await client.__anext__())
+        assert len(data["printers"]) == 2
+
+        async with session_maker() as session:
+            await session.delete(await session.get(Printer, "P0"))
+            await session.commit()
+
+        stream.request_refresh()
+        kind, data = _parse(await asyncio.wait_for(client.__anext__(), 5))
+        assert kind == "snapshot" and [p["serial"] for p in data["printers"]] == ["P1"]
+        await client.aclose()
+    finally:
+        await stream.stop()
+        await engine.dispose()
+    logger.info("Removed Printer Test PASSED.")
+
+
+def test_snapshot_then_deltas():
+    asyncio.run(_test_snapshot_then_deltas())
+
+def test_removed_printer_resends_snapshot():
+    asyncio.run(_test_removed_printer_resends_snapshot())
+
+
+if __name__ == "__main__":
+    test_snapshot_then_deltas()
+    test_removed_printer_resends_snapshot()
+    logger.info("\nALL PRINTER STREAM TESTS PASSED.")
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+from conftest import create_test_database
+from models import Product
+import main
+import product_cache
+from database import get_session
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ProductCacheTest")
+
+
+async def _setup():
+    engine, session_maker = await create_test_database()
+
+    product_cache.invalidate()
+    return engine, session_maker
+
+
+async def _test_endpoints_invalidate():
+    engine, session_maker = await _setup()
+
+    async def override():
+        async with session_maker() as session:
+            yield session
+    main.app.dependency_overrides[get_session] = override
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+    fd, path = tempfile.mkstemp(suffix=".3mf")
+    os.close(fd)
+    try:
+        # Warm the cache while the catalog is empty
+        async with session_maker() as session:
+            assert await product_cache.get_product(session, "CUBE") is None
+
+        response = await client.post("/products", json={"name": "Cube", "sku": "CUBE", "file_path_3mf": path})
+        assert response.status_code == 200, response.text
+        product_id = response.json()["id"]
+        async with session_maker() as session:
+            product = await product_cache.get_product(session, "CUBE")
+            assert product is not None and product.name == "Cube"
+
+        response = await client.patch(f"/api/products/{product_id}", json={"name": "Cube v2"})
+        assert response.status_code == 200, response.text
+        async with session_maker() as session:
+            assert (await product_cache.get_product(session, "CUBE")).name == "Cube v2"
+
+        response = await client.delete(f"/api/products/{product_id}")
+        assert response.status_code == 200, response.text
+        async with session_maker() as session:
+            assert await product_cache.get_product(session, "CUBE") is None
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+        await client.aclose()
+        main.app.dependency_overrides.clear()
+        product_cache.invalidate()
+
+    logger.info("Endpoint Invalidation Test PASSED.")
+
+
+async def _test_invalidation_during_load():
+    engine, session_maker = await _setup()
+
+    async with session_maker() as session:
+        session.add(Product(name="Old", sku="CUBE", file_path_3mf="cube.3mf"))
+        await session.commit()
+
+    class RacingSession:
+        """Renames the product and invalidates while the cache's SELECT is in flight."""
+        def __init__(self, session):
+            self.session = session
+
+        async def execute(self, statement):
+            result = await self.session.execute(statement)
+            async with session_maker() as writer:
+                product = await writer.get(Product, 1)
+                product.name = "New"
+                writer.add(product)
+                await writer.commit()
+            product_cache.invalidate("CUBE")
+            return result
+
+        def expunge(self, instance):
+            self.session.expunge(instance)
+
+    async with session_maker() as session:
+        # The racing load still answers its caller, with what it read...
+        products = await product_cache.get_products_by_sku(RacingSession(session))
+        assert products["CUBE"].name == "Old"
+
+    # ...but does not write it back over the invalidation
+    assert product_cache._loaded_at is None
+    assert not product_cache._PRODUCTS
+    async with session_maker() as session:
+        assert (await product_cache.get_product(session, "CUBE")).name == "New"
+
+    product_cache.invalidate()
+    logger.info("Invalidation During Load Test PASSED.")
+
+
+def test_endpoints_invalidate():
+    asyncio.run(_test_endpoints_invalidate())
+
+def test_invalidation_during_load():
+    asyncio.run(_test_invalidation_during_load())
+
+
+if __name__ == "__main__":
+    test_endpoints_invalidate()
+    test_invalidation_during_load()
+    logger.info("\nALL PRODUCT CACHE TESTS PASSED.")
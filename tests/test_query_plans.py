@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import re
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+from enum import Enum
+from sqlmodel import SQLModel, select, col
+from sqlalchemy import and_, exists, insert, literal, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from models import (Printer, Order, Job, PrinterTypeEnum, PrinterStatusEnum, JobStatusEnum,
+                    OrderStatusEnum, PlatformEnum, JOB_IS_PENDING, JOB_IS_ACTIVE)
+from migrations import run_migrations
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("QueryPlanTest")
+
+# SQLite by default. Point EXPLAIN_DATABASE_URL at a scratch PostgreSQL database
+# (postgresql+asyncpg://...) to check the production planner; its tables are dropped.
+TEST_DATABASE_URL = os.getenv("EXPLAIN_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+ORDERS = 20000
+PRINTERS = 2000
+ACTIVE = 50  # Rows per hot status; everything else is history
+
+
+async def _seed(conn):
+    now = datetime.now()
+    statuses = [OrderStatusEnum.OPEN] * ACTIVE + [OrderStatusEnum.DONE] * (ORDERS - ACTIVE)
+    await conn.execute(insert(Order), [
+        {"id": i + 1, "platform": PlatformEnum.EBAY, "platform_order_id": f"PLAN-{i}", "sku": f"SKU-{i % 500}",
+         "quantity": 1, "purchase_date": now - timedelta(minutes=i), "status": status}
+        for i, status in enumerate(statuses)
+    ])
+    await conn.execute(insert(Printer), [
+        {"serial": f"P{i}", "name": f"Printer {i}", "type": PrinterTypeEnum.A1, "ams_data": [],
+         "current_status": PrinterStatusEnum.IDLE if i < ACTIVE else PrinterStatusEnum.PRINTING,
+         "current_temp_nozzle": 0.0, "current_temp_bed": 0.0, "current_progress": 0, "remaining_time": 0}
+        for i in range(PRINTERS)
+    ])
+    job_statuses = ([JobStatusEnum.PENDING] * ACTIVE + [JobStatusEnum.PRINTING] * ACTIVE
+                    + [JobStatusEnum.FINISHED] * (ORDERS - 2 * ACTIVE))
+    await conn.execute(insert(Job), [
+        {"order_id": i + 1, "gcode_path": "cube.3mf", "status": status, "created_at": now - timedelta(minutes=i),
+         "assigned_printer_serial": None if status == JobStatusEnum.PENDING else f"P{i % PRINTERS}"}
+        for i, status in enumerate(job_statuses)
+    ])
+
+
+def _hot_queries():
+    """The dispatcher's hot queries (see worker_service.py), with the index each must use."""
+    has_job = exists().where(Job.order_id == Order.id)
+    return {
+        "pending jobs": (
+            select(Job, Order)
+            .outerjoin(Order, Order.id == Job.order_id)
+            .where(JOB_IS_PENDING)
+            .order_by(Job.created_at.asc())
+            .limit(1000),
+            "ix_jobs_pending_created_at"
+        ),
+        "open orders": (
+            select(Order.id, Order.sku, Order.quantity, has_job.label("has_job"))
+            .where(Order.status == OrderStatusEnum.OPEN)
+            .order_by(Order.purchase_date.asc()),
+            "ix_orders_status_purchase_date"
+        ),
+        "order has job": (
+            select(Job.id).where(Job.order_id == 42),
+            "ix_jobs_order_id"
+        ),
+        "active job per printer": (
+            select(Printer, Job)
+            .outerjoin(Job, and_(
+                Job.assigned_printer_serial == Printer.serial,
+                JOB_IS_ACTIVE
+            ))
+            .where(col(Printer.serial).in_(["P1", "P2", "P3"])),
+            "ix_jobs_active_printer_status"
+        ),
+        "idle printers": (
+            select(Printer).where(Printer.current_status == PrinterStatusEnum.IDLE),
+            "ix_printers_current_status"
+        ),
+        "orders by status": (
+            select(Order).where(Order.status == OrderStatusEnum.DONE)
+            .order_by(Order.purchase_date.desc()).limit(50),
+            "ix_orders_status_purchase_date"
+        ),
+        "orders by sku": (
+            select(Order).where(Order.sku == "SKU-7"),
+            "ix_orders_sku"
+        ),
+    }
+
+
+def _sequential_scans(plan: str, dialect: str):
+    if dialect == "postgresql":
+        return re.findall(r"Seq Scan on (\w+)", plan)
+    # SQLite: "SCAN jobs" (or "SCAN TABLE jobs") without USING INDEX is a full table scan
+    return re.findall(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?(?: LEFT-JOIN)?$", plan, re.MULTILINE)
+
+
+async def _explain(conn, statement) -> str:
+    """
+    Plans the statement the way the app runs it: with bound parameters, not inlined
+    literals, so a partial index only matches if the query spells out its predicate.
+    """
+    dialect = conn.dialect.name
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    values = [compiled.params[name] for name in compiled.positiontup or []]
+    if dialect == "postgresql":
+        # asyncpg prepares every statement; once PostgreSQL switches it to a generic plan
+        # the parameter values are unknown to the planner
+        args = [str(literal(value.value if isinstance(value, Enum) else value)
+                    .compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+                for value in values]
+        await conn.execute(text("SET plan_cache_mode = force_generic_plan"))
+        await conn.exec_driver_sql(f"PREPARE hot_query AS {compiled.string}")
+        try:
+            execute = f"EXECUTE hot_query({', '.join(args)})" if args else "EXECUTE hot_query"
+            rows = await conn.exec_driver_sql("EXPLAIN " + execute)
+            return "\n".join(row[0] for row in rows)
+        finally:
+            await conn.exec_driver_sql("DEALLOCATE hot_query")
+    rows = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, tuple(values))
+    return "\n".join(row[-1] for row in rows)
+
+
+async def _test_hot_queries_use_indexes():
+    engine = create_async_engine(TEST_DATABASE_URL, echo=False, future=True)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.drop_all)
+            await run_migrations(conn)
+            await _seed(conn)
+            await conn.execute(text("ANALYZE"))
+
+        async with engine.connect() as conn:
+            dialect = conn.dialect.name
+            failures = []
+            for name, (statement, index) in _hot_queries().items():
+                plan = await _explain(conn, statement)
+                # Products is tiny and has no filter here; only the big tables matter
+                scans = [t for t in _sequential_scans(plan, dialect) if t in ("orders", "jobs", "printers")]
+                if scans or index not in plan:
+                    failures.append(f"{name}: expected {index}, got\n{plan}")
+                else:
+                    logger.info(f"{name}: {index}")
+            assert not failures, "\n\n".join(failures)
+    finally:
+        await engine.dispose()
+    logger.info("Query Plan Test PASSED.")
+
+
+async def _test_migration_adds_missing_indexes():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", echo=False, future=True)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+            # An older database: the tables exist, the new indexes do not
+            await conn.execute(text("DROP INDEX ix_jobs_pending_created_at"))
+            await conn.execute(text("DROP INDEX ix_orders_sku"))
+            await run_migrations(conn)
+            rows = await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))
+            names = {row[0] for row in rows}
+        assert {"ix_jobs_pending_created_at", "ix_orders_sku"} <= names
+    finally:
+        await engine.dispose()
+    logger.info("Index Migration Test PASSED.")
+
+
+def test_hot_queries_use_indexes():
+    asyncio.run(_test_hot_queries_use_indexes())
+
+def test_migration_adds_missing_indexes():
+    asyncio.run(_test_migration_adds_missing_indexes())
+
+
+if __name__ == "__main__":
+    test_hot_queries_use_indexes()
+    test_migration_adds_missing_indexes()
+    logger.info("\nALL QUERY PLAN TESTS PASSED.")
@@ -0,0 +1,87 @@
+import json
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bambu_report
+from bambu_report import ReportParser
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ReportParserTest")
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "mqtt")
+
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, f"{name}.json"), "rb") as f:
+        return f.read()
+
+
+def test_extracts_known_fields():
+    parser = ReportParser("P1")
+    extracted = parser.parse(load_fixture("push_status_full"))
+
+    assert extracted["print_status"] == "RUNNING"
+    assert extracted["progress"] == 42 and extracted["remaining_time"] == 37
+    assert extracted["nozzle_temper"] == 219.9375
+    assert extracted["ams_data"][0] == {"slot": "0", "color": "#FF0000", "type": "PLA", "remaining": 100}
+    assert len(extracted["ams_data"]) == 4
+
+    # Partial updates carry only what changed
+    assert parser.parse(load_fixture("push_status_partial")) == {
+        "nozzle_temper": 220.0625, "bed_temper": 65.0, "progress": 43, "remaining_time": 36
+    }
+    logger.info("Field Extraction Test PASSED.")
+
+
+def test_unchanged_ams_is_skipped():
+    parser = ReportParser("P1")
+    assert "ams_data" in parser.parse(load_fixture("push_status_full"))
+    assert "ams_data" not in parser.parse(load_fixture("push_status_full"))
+
+    swapped = parser.parse(load_fixture("push_status_ams_swap"))
+    assert swapped["ams_data"][1] == {"slot": "1", "color": "#1F79E5", "type": "PETG", "remaining": 100}
+
+    # After a reconnect the AMS is emitted again
+    parser.reset()
+    assert "ams_data" in parser.parse(load_fixture("push_status_ams_swap"))
+    logger.info("AMS Skip Test PASSED.")
+
+
+def test_emptied_ams_is_emitted():
+    parser = ReportParser("P1")
+    assert len(parser.parse(load_fixture("push_status_full"))["ams_data"]) == 4
+
+    # AMS unplugged / every spool removed: the trays must be cleared, not kept
+    emptied = parser.parse(json.dumps({"print": {"command": "push_status", "ams": {"ams": []}}}))
+    assert emptied["ams_data"] == []
+    assert "ams_data" not in parser.parse(json.dumps({"print": {"ams": {"ams": []}}}))
+    logger.info("Emptied AMS Test PASSED.")
+
+
+def test_json_fallback_matches_orjson():
+    payloads = [load_fixture(name) for name in ("push_status_full", "push_status_partial", "push_status_finish")]
+    fast = [ReportParser().parse(p) for p in payloads]
+
+    original = bambu_report._loads
+    bambu_report._loads = json.loads
+    try:
+        assert [ReportParser().parse(p) for p in payloads] == fast
+        try:
+            ReportParser().parse(b"{not json")
+            assert False, "invalid JSON must raise"
+        except ValueError:
+            pass
+    finally:
+        bambu_report._loads = original
+    logger.info("JSON Fallback Test PASSED.")
+
+
+if __name__ == "__main__":
+    test_extracts_known_fields()
+    test_unchanged_ams_is_skipped()
+    test_emptied_ams_is_emitted()
+    test_json_fallback_matches_orjson()
+    logger.info("\nALL REPORT PARSER TESTS PASSED.")
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+from sqlalchemy import event
+from conftest import create_test_database
+from models import Printer, Product, PrinterTypeEnum
+import main
+from database import get_session
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ResponseCacheTest")
+
+
+async def _test_conditional_get():
+    engine, session_maker = await create_test_database()
+    async with session_maker() as session:
+        session.add(Printer(serial="P1", name="Printer 1", type=PrinterTypeEnum.A1))
+        session.add(Product(name="Cube", sku="CUBE", file_path_3mf="cube.3mf"))
+        await session.commit()
+
+    async def override():
+        async with session_maker() as session:
+            yield session
+    main.app.dependency_overrides[get_session] = override
+    old_max_age = main.RESPONSE_CACHE.max_age
+    main.RESPONSE_CACHE.max_age = 3600  # Versions only move on bump() in this test
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+    queries = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    try:
+        first = await client.get("/printers")
+        etag = first.headers["etag"]
+        assert first.status_code == 200 and first.json()[0]["serial"] == "P1"
+        assert len(queries) == 1
+
+        # Poll with the ETag -> 304, no query
+        polled = await client.get("/printers", headers={"If-None-Match": etag})
+        assert polled.status_code == 304 and polled.headers["etag"] == etag
+        # Another dashboard without ETag -> cached body, still no query
+        other = await client.get("/printers")
+        assert other.status_code == 200 and other.content == first.content
+        assert len(queries) == 1
+
+        # A telemetry flush (PRINTER_CHANNEL) moves the version
+        async with session_maker() as session:
+            printer = await session.get(Printer, "P1")
+            printer.current_progress = 50
+            session.add(printer)
+            await session.commit()
+        queries.clear()
+        main.on_printers_changed("P1")
+        fresh = await client.get("/printers", headers={"If-None-Match": etag})
+        assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+        assert fresh.json()[0]["current_progress"] == 50 and len(queries) == 1
+
+        # Resources are versioned independently; a product write only moves products
+        products_etag = (await client.get("/products")).headers["etag"]
+        printers_etag = fresh.headers["etag"]
+        main.on_products_changed("CUBE")
+        assert (await client.get("/products", headers={"If-None-Match": products_etag})).status_code == 200
+        assert (await client.get("/printers", headers={"If-None-Match": printers_etag})).status_code == 304
+    finally:
+        main.RESPONSE_CACHE.max_age = old_max_age
+        main.app.dependency_overrides.clear()
+        await client.aclose()
+        await engine.dispose()
+    logger.info("Conditional GET Test PASSED.")
+
+
+def test_conditional_get():
+    asyncio.run(_test_conditional_get())
+
+
+if __name__ == "__main__":
+    test_conditional_get()
+    logger.info("\nALL RESPONSE CACHE TESTS PASSED.")
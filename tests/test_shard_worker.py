@@ -0,0 +1,82 @@
+import asyncio
+import json
+import logging
+import shutil
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from shard_worker import ShardSupervisor, ShardedPrinterClient, shard_for
+from mqtt_standin import StandInMQTTBroker
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ShardWorkerTest")
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "mqtt")
+SERIALS = [f"P{i}" for i in range(6)]
+
+
+def test_partition_is_stable():
+    shards = [shard_for(serial, 4) for serial in SERIALS]
+    assert shards == [shard_for(serial, 4) for serial in SERIALS]
+    assert all(0 <= s < 4 for s in shards)
+    logger.info("Partition Test PASSED.")
+
+
+async def _wait_until(predicate, timeout: float = 15.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+async def _test_deltas_and_commands():
+    broker = StandInMQTTBroker()
+    received = {}
+    supervisor = ShardSupervisor(2, lambda serial, fields: received.setdefault(serial, {}).update(fields),
+                                 mqtt_port=broker.port)
+    try:
+        await supervisor.start([(serial, "127.0.0.1", "12345678") for serial in SERIALS])
+        assert await asyncio.to_thread(broker.wait_for, lambda: all(
+            broker.subscriptions.get(f"device/{s}/report") for s in SERIALS
+        ), 30)
+
+        with open(os.path.join(FIXTURES, "push_status_full.json"), "rb") as f:
+            full = f.read()
+        for serial in SERIALS:
+            broker.publish(f"device/{serial}/report", full)
+
+        # Telemetry from every shard arrives in this process as deltas
+        await _wait_until(lambda: len(received) == len(SERIALS))
+        assert received["P0"]["print_status"] == "RUNNING"
+        assert received["P0"]["ams_data"][0]["color"] == "#FF0000"
+
+        # Commands are routed to the shard owning the printer
+        client = ShardedPrinterClient("127.0.0.1", "12345678", "P3", supervisor)
+        await client.start_print("/fos-abc.3mf", ams_mapping=[1], plate_id=2)
+        assert await asyncio.to_thread(broker.wait_for, lambda: any(
+            topic == "device/P3/request" and b"project_file" in payload for topic, payload in broker.received
+        ), 10)
+        command = next(json.loads(p) for t, p in broker.received if t == "device/P3/request" and b"project_file" in p)
+        assert command["print"]["url"] == "file:///sdcard/fos-abc.3mf"
+        assert command["print"]["ams_mapping"] == [1] and command["print"]["plate_id"] == 2
+    finally:
+        await supervisor.stop()
+        broker.close()
+
+    logger.info("Deltas/Commands Test PASSED.")
+
+
+def test_deltas_and_commands():
+    asyncio.run(_test_deltas_and_commands())
+
+
+if __name__ == "__main__":
+    test_partition_is_stable()
+    if not shutil.which("openssl"):
+        logger.warning("openssl CLI not found, skipping shard tests.")
+        sys.exit(0)
+    test_deltas_and_commands()
+    logger.info("\nALL SHARD WORKER TESTS PASSED.")
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+from sqlmodel import select
+from sqlalchemy import event
+from conftest import create_test_database
+from models import Printer, Order, Job, PrinterTypeEnum, PrinterStatusEnum, JobStatusEnum, OrderStatusEnum, PlatformEnum
+import worker_service
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TelemetryFlushTest")
+
+
+async def _setup(printer_count: int):
+    engine, session_maker = await create_test_database()
+
+    async with session_maker() as session:
+        for i in range(printer_count):
+            session.add(Printer(
+                serial=f"P{i}",
+                name=f"Printer {i}",
+                type=PrinterTypeEnum.A1,
+                current_status=PrinterStatusEnum.PRINTING
+            ))
+        session.add(Order(
+            id=1,
+            platform=PlatformEnum.EBAY,
+            platform_order_id="FLUSH-1",
+            sku="CUBE",
+            quantity=1,
+            purchase_date=datetime.now(),
+            status=OrderStatusEnum.PRINTING
+        ))
+        session.add(Job(order_id=1, assigned_printer_serial="P0", gcode_path="cube.3mf", status=JobStatusEnum.PRINTING))
+        await session.commit()
+
+    worker_service.PRINTER_STATE_CACHE.clear()
+    worker_service.DIRTY_FIELDS.clear()
+    return engine, session_maker
+
+
+async def _test_bulk_flush_round_trips():
+    engine, session_maker = await _setup(50)
+
+    for i in range(50):
+        worker_service.handle_mqtt_update(f"P{i}", {"print_status": "RUNNING", "nozzle_temper": 210, "progress": 10})
+
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, params, context, executemany: statements.append(statement))
+
+    async with session_maker() as session:
+        updated = await worker_service.flush_telemetry(session, dict(worker_service.DIRTY_FIELDS))
+        await session.commit()
+
+    assert updated == 50
+    assert len(statements) == 2, f"Expected SELECT + one bulk UPDATE, got {len(statements)}"
+
+    async with session_maker() as session:
+        printer = await session.get(Printer, "P7")
+        assert printer.current_temp_nozzle == 210.0
+        assert printer.current_progress == 10
+
+    logger.info("Bulk Flush Test PASSED.")
+
+
+async def _test_unchanged_values_are_skipped():
+    engine, session_maker = await _setup(1)
+
+    worker_service.handle_mqtt_update("P0", {"nozzle_temper": 200})
+    worker_service.DIRTY_FIELDS.clear()
+
+    # Same value again -> nothing to write
+    worker_service.handle_mqtt_update("P0", {"nozzle_temper": 200})
+    assert "P0" not in worker_service.DIRTY_FIELDS
+
+    logger.info("Unchanged Skip Test PASSED.")
+
+
+async def _test_completion_transition():
+    engine, session_maker = await _setup(1)
+
+    worker_service.handle_mqtt_update("P0", {"print_status": "FINISH"})
+
+    async with session_maker() as session:
+        await worker_service.flush_telemetry(session, dict(worker_service.DIRTY_FIELDS))
+        await session.commit()
+
+    async with session_maker() as session:
+        printer = await session.get(Printer, "P0")
+        job = (await session.execute(select(Job))).scalars().first()
+        order = await session.get(Order, 1)
+
+        assert printer.current_status == PrinterStatusEnum.IDLE
+        assert job.status == JobStatusEnum.FINISHED
+        assert order.status == OrderStatusEnum.DONE
+
+    logger.info("Completion Transition Test PASSED.")
+
+
+async def _run_dispatch_tick(session_maker):
+    """One sync_loop pass woken by request_dispatch (neither timer fires meanwhile)."""
+    saved = (worker_service.async_session_maker, worker_service.DISPATCH_EVENT,
+             worker_service.TELEMETRY_FLUSH_INTERVAL, worker_service.DISPATCH_SAFETY_INTERVAL,
+             worker_service.prestage_next_jobs)
+    worker_service.async_session_maker = session_maker
+    worker_service.DISPATCH_EVENT = asyncio.Event()
+    worker_service.TELEMETRY_FLUSH_INTERVAL = 60
+    worker_service.DISPATCH_SAFETY_INTERVAL = 3600
+    ticked = asyncio.Event()
+
+    async def prestage(session):  # Last step of the pass
+        ticked.set()
+        return 0
+
+    worker_service.prestage_next_jobs = prestage
+    loop_task = asyncio.create_task(worker_service.sync_loop())
+    try:
+        await asyncio.sleep(0.1)
+        worker_service.request_dispatch("test")
+        await asyncio.wait_for(ticked.wait(), timeout=2)
+        await asyncio.sleep(0.1)  # Let the pass release its connection before cancelling
+    finally:
+        loop_task.cancel()
+        (worker_service.async_session_maker, worker_service.DISPATCH_EVENT,
+         worker_service.TELEMETRY_FLUSH_INTERVAL, worker_service.DISPATCH_SAFETY_INTERVAL,
+         worker_service.prestage_next_jobs) = saved
+
+
+async def _test_quiet_printer_is_rechecked():
+    engine, session_maker = await _setup(1)
+
+    # The printer reported FINISH while its DB row still says PRINTING, and has been quiet since
+    worker_service.handle_mqtt_update("P0", {"print_status": "FINISH"})
+    worker_service.DIRTY_FIELDS.clear()
+
+    await _run_dispatch_tick(session_maker)
+
+    async with session_maker() as session:
+        printer = await session.get(Printer, "P0")
+        job = (await session.execute(select(Job))).scalars().first()
+        assert printer.current_status == PrinterStatusEnum.IDLE
+        assert job.status == JobStatusEnum.FINISHED
+
+    logger.info("Quiet Printer Re-check Test PASSED.")
+
+
+async def _test_no_notify_without_writes():
+    engine, session_maker = await _setup(1)
+
+    async with session_maker() as session:
+        printer = await session.get(Printer, "P0")
+        printer.current_temp_nozzle = 200.0
+        session.add(printer)
+        await session.commit()
+
+    # Dirty, but equal to what the DB already has
+    worker_service.handle_mqtt_update("P0", {"nozzle_temper": 200})
+    assert "P0" in worker_service.DIRTY_FIELDS
+
+    notified = []
+    saved_notify = worker_service.notify_printers
+
+    async def notify_printers(session, serials):
+        notified.append(set(serials))
+
+    worker_service.notify_printers = notify_printers
+    try:
+        await _run_dispatch_tick(session_maker)
+    finally:
+        worker_service.notify_printers = saved_notify
+
+    assert notified == [], f"Printer notification without a DB write: {notified}"
+    logger.info("No Notify Without Writes Test PASSED.")
+
+
+def test_bulk_flush_round_trips():
+    asyncio.run(_test_bulk_flush_round_trips())
+
+def test_unchanged_values_are_skipped():
+    asyncio.run(_test_unchanged_values_are_skipped())
+
+def test_completion_transition():
+    asyncio.run(_test_completion_transition())
+
+def test_quiet_printer_is_rechecked():
+    asyncio.run(_test_quiet_printer_is_rechecked())
+
+def test_no_notify_without_writes():
+    asyncio.run(_test_no_notify_without_writes())
+
+
+if __name__ == "__main__":
+    test_bulk_flush_round_trips()
+    test_unchanged_values_are_skipped()
+    test_completion_transition()
+    test_quiet_printer_is_rechecked()
+    test_no_notify_without_writes()
+    logger.info("\nALL TELEMETRY FLUSH TESTS PASSED.")
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from telemetry import TelemetryState
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("TelemetryStateTest")
+
+
+def test_deadband_and_coalescing():
+    state = TelemetryState(deadbands={"nozzle_temper": 1.0})
+
+    assert state.apply("P1", {"nozzle_temper": 210.0, "progress": 1}) == {"nozzle_temper", "progress"}
+    # 1/16 degree jitter is dropped, the cache keeps the last propagated value
+    assert state.apply("P1", {"nozzle_temper": 210.5}) == set()
+    assert state.values["P1"]["nozzle_temper"] == 210.0
+    assert state.apply("P1", {"nozzle_temper": 211.0}) == {"nozzle_temper"}
+
+    # Ten progress updates within one tick -> one dirty field
+    for progress in range(2, 12):
+        state.apply("P1", {"progress": progress})
+    dirty = state.take_dirty()
+    assert dirty == {"P1": {"nozzle_temper", "progress"}}
+    assert state.values["P1"]["progress"] == 11
+    assert not state.dirty
+
+    # A failed flush puts its fields back
+    state.restore_dirty(dirty)
+    assert state.dirty == dirty
+    logger.info("Deadband/Coalescing Test PASSED.")
+
+
+def test_delta_stream():
+    state = TelemetryState(deadbands={})
+    state.apply("P1", {"print_status": "RUNNING", "progress": 10})
+    state.apply("P2", {"print_status": "IDLE"})
+    cursor, deltas = state.deltas_since(0)
+    assert deltas == {"P1": {"print_status": "RUNNING", "progress": 10}, "P2": {"print_status": "IDLE"}}
+
+    state.apply("P1", {"progress": 11, "print_status": "RUNNING"})
+    cursor, deltas = state.deltas_since(cursor)
+    assert deltas == {"P1": {"progress": 11}}
+
+    # Nothing new -> empty delta, same cursor
+    assert state.deltas_since(cursor) == (cursor, {})
+    logger.info("Delta Stream Test PASSED.")
+
+
+async def _test_wait_for_change():
+    state = TelemetryState(deadbands={})
+    assert await state.wait_for_change(state.version, timeout=0.05) is False
+
+    waiter = asyncio.create_task(state.wait_for_change(state.version, timeout=1))
+    await asyncio.sleep(0)
+    state.apply("P1", {"progress": 5})
+    assert await waiter is True
+    logger.info("Wait For Change Test PASSED.")
+
+
+def test_wait_for_change():
+    asyncio.run(_test_wait_for_change())
+
+
+if __name__ == "__main__":
+    test_deadband_and_coalescing()
+    test_delta_stream()
+    test_wait_for_change()
+    logger.info("\nALL TELEMETRY STATE TESTS PASSED.")
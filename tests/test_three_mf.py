@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import sys
+import os
+import tempfile
+import zipfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import three_mf
+import main
+
+# Configure Test Logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ThreeMFTest")
+
+SLICE_INFO = """<?xml version="1.0" encoding="UTF-8"?>
+<config>
+  <plate>
+    <metadata key="index" value="2"/>
+    <metadata key="prediction" value="950"/>
+    <metadata key="weight" value="1.17"/>
+    <filament id="3" type="PLA" color="#FFFFFF" used_m="0.39" used_g="1.17"/>
+  </plate>
+  <plate>
+    <metadata key="index" value="5"/>
+    <metadata key="prediction" value="50"/>
+    <metadata key="weight" value="0.83"/>
+    <filament id="1" type="PETG" color="#FF0000" used_m="0.2" used_g="0.5"/>
+    <filament id="2" type="PETG" color="#000000" used_m="0.1" used_g="0.33"/>
+  </plate>
+</config>
+"""
+
+
+def make_3mf(directory: str) -> str:
+    path = os.path.join(directory, "test.3mf")
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("3D/3dmodel.model", "<model/>")
+        z.writestr("Metadata/plate_5.gcode", "G28\n")
+        z.writestr("Metadata/plate_5.gcode.md5", "ABCDEF")
+        z.writestr("Metadata/plate_2.gcode", "G28\n")
+        z.writestr("Metadata/plate_2.png", b"")
+        z.writestr("Metadata/slice_info.config", SLICE_INFO)
+    return path
+
+
+def test_parse_3mf():
+    with tempfile.TemporaryDirectory() as tmp:
+        metadata = three_mf.parse_3mf(make_3mf(tmp))
+
+    assert metadata["plate_count"] == 2
+    assert [p["gcode_path"] for p in metadata["plates"]] == ["Metadata/plate_2.gcode", "Metadata/plate_5.gcode"]
+    assert metadata["plates"][1]["gcode_md5"] == "ABCDEF"
+    assert metadata["plates"][1]["filaments"][0] == {"id": "1", "type": "PETG", "color": "#FF0000", "used_g": 0.5}
+    assert metadata["print_time_s"] == 1000
+    assert abs(metadata["filament_g"] - 2.0) < 1e-9
+    assert len(metadata["file_md5"]) == 32
+    assert three_mf.primary_plate(metadata["plates"])["index"] == 2
+
+    logger.info("Parse Test PASSED.")
+
+
+def test_metadata_is_stored_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_3mf(tmp)
+        three_mf.save_metadata(path, {"plate_count": 99})
+
+        # Stored metadata wins; the ZIP is not re-opened
+        assert three_mf.load_metadata(path) == {"plate_count": 99}
+
+        os.remove(path + three_mf.METADATA_SUFFIX)
+        assert three_mf.load_metadata(path)["plate_count"] == 2
+        assert os.path.exists(path + three_mf.METADATA_SUFFIX)
+
+    logger.info("Metadata Store Test PASSED.")
+
+
+async def _test_upload_rejects_broken_3mf():
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+    saved = (main.STORAGE_DIR, three_mf.parse_3mf)
+    with tempfile.TemporaryDirectory() as tmp:
+        main.STORAGE_DIR = tmp
+        try:
+            response = await client.post("/api/products/upload", files={"file": ("junk.3mf", b"not a zip")})
+            assert response.status_code == 400, response.text
+            assert os.listdir(tmp) == []
+
+            # Valid ZIP, but an entry the parser cannot make sense of
+            for error in (ValueError("bad plate index"), KeyError("Metadata/plate_1.gcode"),
+                          three_mf.ET.ParseError("not well-formed")):
+                def parse_3mf(path, error=error):
+                    raise error
+                three_mf.parse_3mf = parse_3mf
+                with open(make_3mf(tmp), "rb") as f:
+                    content = f.read()
+                os.remove(os.path.join(tmp, "test.3mf"))
+                response = await client.post("/api/products/upload", files={"file": ("cube.3mf", content)})
+                assert response.status_code == 400, response.text
+                assert os.listdir(tmp) == []
+        finally:
+            main.STORAGE_DIR, three_mf.parse_3mf = saved
+            await client.aclose()
+
+    logger.info("Upload Rejection Test PASSED.")
+
+
+def test_upload_rejects_broken_3mf():
+    asyncio.run(_test_upload_rejects_broken_3mf())
+
+
+if __name__ == "__main__":
+    test_parse_3mf()
+    test_metadata_is_stored_once()
+    test_upload_rejects_broken_3mf()
+    logger.info("\nALL 3MF TESTS PASSED.")
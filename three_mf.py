@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("ThreeMF")
+
+PLATE_GCODE_RE = re.compile(r"^Metadata/plate_(\d+)\.gcode$")
+SLICE_INFO_PATH = "Metadata/slice_info.config"
+
+# Parsed metadata is written next to the 3MF so it is only computed once (at upload)
+METADATA_SUFFIX = ".meta.json"
+
+
+def file_md5(path: str, chunk_size: int = 1024 * 1024) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _parse_slice_info(xml_bytes: bytes) -> Dict[int, Dict[str, Any]]:
+    """Bambu Studio's slice_info.config -> {plate index: {prediction, weight, filaments}}."""
+    plates = {}
+    root = ET.fromstring(xml_bytes)
+    for plate in root.iter("plate"):
+        meta = {m.get("key"): m.get("value") for m in plate.findall("metadata")}
+        try:
+            index = int(meta.get("index", "0"))
+        except ValueError:
+            continue
+        prediction = _to_float(meta.get("prediction"))
+        plates[index] = {
+            "print_time_s": int(prediction) if prediction is not None else None,
+            "filament_g": _to_float(meta.get("weight")),
+            "filaments": [
+                {
+                    "id": f.get("id"),
+                    "type": f.get("type"),
+                    "color": f.get("color"),
+                    "used_g": _to_float(f.get("used_g")),
+                }
+                for f in plate.findall("filament")
+            ],
+        }
+    return plates
+
+
+def parse_3mf(path: str) -> Dict[str, Any]:
+    """
+    Reads a sliced 3MF once and returns what the dispatcher needs at print time:
+    {
+        "file_md5": "...",
+        "plate_count": 1,
+        "plates": [{"index": 1, "gcode_path": "Metadata/plate_1.gcode", "gcode_md5": "...",
+                    "print_time_s": 755, "filament_g": 0.59,
+                    "filaments": [{"id": "3", "type": "PLA", "color": "#FFFFFF", "used_g": 0.59}]}],
+        "print_time_s": 755,
+        "filament_g": 0.59,
+    }
+    Raises zipfile.BadZipFile for files that are not 3MF/ZIP archives.
+    """
+    with zipfile.ZipFile(path, "r") as z:
+        names = z.namelist()
+
+        slice_info = {}
+        if SLICE_INFO_PATH in names:
+            try:
+                slice_info = _parse_slice_info(z.read(SLICE_INFO_PATH))
+            except ET.ParseError as e:
+                logger.warning(f"{path}: unreadable {SLICE_INFO_PATH}: {e}")
+
+        plates = []
+        for name in names:
+            match = PLATE_GCODE_RE.match(name)
+            if not match:
+                continue
+            index = int(match.group(1))
+
+            gcode_md5 = None
+            if f"{name}.md5" in names:
+                gcode_md5 = z.read(f"{name}.md5").decode(errors="ignore").strip() or None
+
+            info = slice_info.get(index, {})
+            plates.append({
+                "index": index,
+                "gcode_path": name,
+                "gcode_md5": gcode_md5,
+                "print_time_s": info.get("print_time_s"),
+                "filament_g": info.get("filament_g"),
+                "filaments": info.get("filaments", []),
+            })
+
+    plates.sort(key=lambda p: p["index"])
+
+    def _total(key):
+        values = [p[key] for p in plates if p[key] is not None]
+        return sum(values) if values else None
+
+    return {
+        "file_md5": file_md5(path),
+        "plate_count": len(plates),
+        "plates": plates,
+        "print_time_s": _total("print_time_s"),
+        "filament_g": _total("filament_g"),
+    }
+
+
+def save_metadata(path: str, metadata: Dict[str, Any]):
+    with open(path + METADATA_SUFFIX, "w") as f:
+        json.dump(metadata, f)
+
+
+def load_metadata(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the metadata stored at upload time, parsing (and storing) it now for
+    files uploaded before this existed. None if the file is missing or not a 3MF.
+    """
+    meta_path = path + METADATA_SUFFIX
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable metadata {meta_path}: {e}")
+
+    if not os.path.exists(path):
+        return None
+    try:
+        metadata = parse_3mf(path)
+    except (zipfile.BadZipFile, OSError) as e:
+        logger.warning(f"Cannot parse 3MF {path}: {e}")
+        return None
+    save_metadata(path, metadata)
+    return metadata
+
+
+def primary_plate(plates: Optional[List[dict]]) -> Optional[dict]:
+    """The plate a job prints: the first sliced plate."""
+    return plates[0] if plates else None
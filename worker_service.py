@@ -5,12 +5,30 @@ import sys
 import os
 import zipfile
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Set
 
+# Run directly, this is the daemon (see database.py); must be set before database is imported
+if __name__ == "__main__":
+    os.environ.setdefault("DB_POOL_PROFILE", "daemon")
+
+from sqlalchemy import and_, exists, union, update
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlmodel import select, col
 from database import async_session_maker
-from models import Printer, Job, JobStatusEnum, PrinterStatusEnum, Order, OrderStatusEnum, Product
+from models import (Printer, Job, JobOrder, JobStatusEnum, PrinterStatusEnum, Order, OrderStatusEnum, Product,
+                    JOB_IS_PENDING, JOB_IS_ACTIVE)
 from bambu_client import BambuPrinterClient
+from notifications import listen, notify, notify_printers, DISPATCH_CHANNEL, PRODUCT_CHANNEL, ORDER_CHANNEL
+import product_cache
+from material_index import MaterialIndex
+from telemetry import TelemetryState
+from shard_worker import ShardSupervisor, ShardedPrinterClient, WORKER_SHARDS
+from leases import leases_enabled, leased_by_us, renew_leases, release_leases, PRINTER_LEASE_TTL
+from assignment import solve_assignment
+from color_match import colors_match
+from three_mf import primary_plate
+from job_planner import plan_jobs, add_planned_jobs, job_order_ids, completed_order_ids, print_variant
+from prestage import PrestageScheduler, predict_next_jobs, PRESTAGE_LEAD_TIME, PRESTAGE_QUEUE_WINDOW
 
 # Configure Logging
 logging.basicConfig(
@@ -22,46 +40,118 @@ logger.setLevel(logging.INFO)
 logging.getLogger("BambuClient").setLevel(logging.INFO) # Enable telemetry for debugging
 
 
-# Global State Cache
-# Structure: { serial: { "current_status": ..., "current_temp_nozzle": ..., ... } }
-PRINTER_STATE_CACHE: Dict[str, Dict[str, Any]] = {}
+# Telemetry with per-field versions, dirty bits and temperature deadbands
+TELEMETRY = TelemetryState()
+
+# Global State Cache (last propagated telemetry)
+# Structure: { serial: { "print_status": ..., "nozzle_temper": ..., ... } }
+PRINTER_STATE_CACHE: Dict[str, Dict[str, Any]] = TELEMETRY.values
 
 # Global Client Registry
 # Structure: { serial: BambuPrinterClient }
 PRINTER_CLIENTS: Dict[str, BambuPrinterClient] = {}
 
-async def execute_print_job(client: BambuPrinterClient, job_id: int, local_path: str, ams_mapping: list = None):
+# --- Dispatcher Wake-up ---
+# The sync loop sleeps until something relevant happens (printer state transition,
+# new order, failed job). The timers below are only a safety net.
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "5"))   # Seconds between cache -> DB flushes
+DISPATCH_SAFETY_INTERVAL = float(os.getenv("DISPATCH_SAFETY_INTERVAL", "30"))  # Max seconds between dispatch passes
+DISPATCH_DEBOUNCE = 0.05  # Coalesce bursts of wake-ups into one pass
+
+DISPATCH_EVENT = asyncio.Event()
+
+# Telemetry that has not been written to the DB yet
+# Structure: { serial: {"nozzle_temper", "progress", ...} }
+DIRTY_FIELDS: Dict[str, Set[str]] = TELEMETRY.dirty
+
+# "greedy": oldest job takes the first compatible printer (FIFO)
+# "optimal": max-cardinality job/printer matching per tick, oldest jobs preferred
+DISPATCH_MODE = os.getenv("DISPATCH_MODE", "greedy").lower()
+
+# Material lookup for the dispatcher, kept warm by AMS telemetry
+MATERIAL_INDEX = MaterialIndex()
+
+# Printers leased to this dispatcher (only maintained when PRINTER_LEASE_TTL > 0)
+OWNED_PRINTERS: Set[str] = set()
+
+# Max PENDING jobs one dispatch pass claims (row-locks); the rest stay available to other dispatchers
+DISPATCH_CLAIM_LIMIT = int(os.getenv("DISPATCH_CLAIM_LIMIT", "1000"))
+
+# Uploads of predicted next jobs to printers that are about to finish
+PRESTAGER = PrestageScheduler()
+
+# MQTT cache key -> (Printer column, converter)
+TELEMETRY_COLUMNS = {
+    "nozzle_temper": ("current_temp_nozzle", float),
+    "bed_temper": ("current_temp_bed", float),
+    "ams_data": ("ams_data", None),
+    "progress": ("current_progress", int),
+    "remaining_time": ("remaining_time", int),
+}
+
+def request_dispatch(reason: str = ""):
+    """Wakes the sync loop for an immediate dispatch pass."""
+    if not DISPATCH_EVENT.is_set():
+        logger.debug(f"Dispatch requested: {reason}")
+    DISPATCH_EVENT.set()
+
+async def execute_print_job(client: BambuPrinterClient, job_id: int, local_path: str, ams_mapping: list = None,
+                            plate: Optional[dict] = None, file_md5: Optional[str] = None,
+                            staged_upload: Optional[asyncio.Task] = None):
     """
-    Uploads file and starts print. 
+    Uploads file (unless the printer already has it) and starts print. 
+    `plate` is the product's pre-parsed 3MF plate metadata (gcode path, plate index),
+    `file_md5` its content hash, which names the file on the SD card.
+    `staged_upload` is the pre-staging task for this file, if there was one.
     Handles errors by updating Job status to FAILED and freeing the Printer.
     """
     logger.info(f"JOB {job_id}: Executing Print Job on {client.serial}...")
     
     try:
-        filename = os.path.basename(local_path)
-        target_path = f"/{filename}"
-
-        logger.info(f"JOB {job_id}: Starting Upload of {local_path} to {target_path}...")
+        logger.info(f"JOB {job_id}: Starting Upload of {local_path}...")
         
-        # Upload
-        await client.upload_file(local_path, target_path)
-        logger.info(f"JOB {job_id}: Upload Complete.")
-
-        # Determine internal G-code path
+        # Upload (pooled FTPS session, progress logged in 25% steps)
+        next_report = [25]
+        def on_progress(sent: int, total: int):
+            percent = sent * 100 // total if total else 100
+            if percent >= next_report[0]:
+                logger.info(f"JOB {job_id}: Upload {percent}% ({sent}/{total} bytes)")
+                next_report[0] = percent // 25 * 25 + 25
+
+        # Pre-staging evictions wait for the lock and then skip the in-use file,
+        # so the file found on the printer here is still there for start_print
+        async with PRESTAGER.dispatch_lock(client.serial):
+            # Pre-staged while the previous print was running -> nothing left to upload
+            target_path = await staged_upload if staged_upload is not None else None
+            if target_path:
+                logger.info(f"JOB {job_id}: Using pre-staged file {target_path}.")
+            else:
+                # Content-addressed: repeat jobs for the same file skip the upload entirely
+                target_path = await client.ensure_uploaded(local_path, md5=file_md5, progress_callback=on_progress)
+                logger.info(f"JOB {job_id}: Upload Complete ({target_path}).")
+            PRESTAGER.mark_in_use(client.serial, target_path)
+
+        # Determine internal G-code path (parsed at product upload time)
+        plate_id = 1
         internal_gcode_path = "Metadata/plate_1.gcode"
-        try:
-            with zipfile.ZipFile(local_path, 'r') as z:
-                for name in z.namelist():
-                    if name.startswith("Metadata/") and name.endswith(".gcode") and not name.endswith(".md5"):
-                        internal_gcode_path = name
-                        logger.info(f"JOB {job_id}: Found internal G-code path: {name}")
-                        break
-        except Exception as zip_err:
-             logger.warning(f"JOB {job_id}: Failed to inspect 3MF zip structure: {zip_err}. Using default: {internal_gcode_path}")
+        if plate and plate.get("gcode_path"):
+            internal_gcode_path = plate["gcode_path"]
+            plate_id = plate.get("index") or 1
+        else:
+            # Legacy product without metadata: inspect the ZIP
+            try:
+                with zipfile.ZipFile(local_path, 'r') as z:
+                    for name in z.namelist():
+                        if name.startswith("Metadata/") and name.endswith(".gcode") and not name.endswith(".md5"):
+                            internal_gcode_path = name
+                            logger.info(f"JOB {job_id}: Found internal G-code path: {name}")
+                            break
+            except Exception as zip_err:
+                 logger.warning(f"JOB {job_id}: Failed to inspect 3MF zip structure: {zip_err}. Using default: {internal_gcode_path}")
 
         # Start Print
         logger.info(f"JOB {job_id}: Sending Print Command with Mapping {ams_mapping} using param {internal_gcode_path}...")
-        await client.start_print(target_path, ams_mapping=ams_mapping, gcode_internal_path=internal_gcode_path)
+        await client.start_print(target_path, ams_mapping=ams_mapping, gcode_internal_path=internal_gcode_path, plate_id=plate_id)
         logger.info(f"JOB {job_id}: Print Command Sent!")
 
         # Update Job Status to PRINTING (Exit UPLOADING state)
@@ -86,12 +176,13 @@ async def execute_print_job(client: BambuPrinterClient, job_id: int, local_path:
                     job.error_message = str(e)
                     session.add(job)
                     
-                    # Also Update Order to FAILED
-                    order = await session.get(Order, job.order_id)
-                    if order:
-                        order.status = OrderStatusEnum.FAILED
-                        order.error_message = str(e)
-                        session.add(order)
+                    # Also Update Order(s) to FAILED
+                    for order_id in await job_order_ids(session, job):
+                        order = await session.get(Order, order_id)
+                        if order:
+                            order.status = OrderStatusEnum.FAILED
+                            order.error_message = str(e)
+                            session.add(order)
                     
                     # Release Printer
                     if job.assigned_printer_serial:
@@ -101,8 +192,14 @@ async def execute_print_job(client: BambuPrinterClient, job_id: int, local_path:
                             session.add(printer)
                             
                             logger.info(f"JOB {job_id}: Printer {printer.serial} released to IDLE due to failure.")
+                            await notify_printers(session, [printer.serial])
+
+                    await notify(session, ORDER_CHANNEL)
                 
                 await session.commit()
+
+            # Printer is free again -> let the dispatcher pick the next job right away
+            request_dispatch(f"job {job_id} failed")
         except Exception as db_e:
             logger.error(f"JOB {job_id}: CRITICAL - Failed to update DB after job failure: {db_e}")
         
@@ -110,257 +207,466 @@ async def execute_print_job(client: BambuPrinterClient, job_id: int, local_path:
 def handle_mqtt_update(serial: str, data: Dict[str, Any]):
     """
     Updates the in-memory cache with new telemetry data from MQTT.
+    Only real changes (outside the temperature deadband) are kept and marked dirty.
     Does NOT write to DB.
     """
-    if serial not in PRINTER_STATE_CACHE:
-        PRINTER_STATE_CACHE[serial] = {}
-    
-    PRINTER_STATE_CACHE[serial].update(data)
-    # logger.debug(f"Updated cache for {serial}: {data}")
+    old_status = PRINTER_STATE_CACHE.get(serial, {}).get("print_status")
+
+    changed = TELEMETRY.apply(serial, data)
+    if not changed:
+        return
+    # logger.debug(f"Updated cache for {serial}: {changed}")
+
+    # Remaining filament changes steadily while printing: it is only flushed, not a wake-up
+    materials_changed = "ams_data" in changed and MATERIAL_INDEX.update_printer(serial, data["ams_data"])
+
+    # Wake the dispatcher on transitions that can make a job assignable
+    if "print_status" in changed:
+        request_dispatch(f"{serial} {old_status} -> {data['print_status']}")
+    elif materials_changed:
+        request_dispatch(f"{serial} AMS changed")
+
+def map_printer_status(raw_status: str, old_status: PrinterStatusEnum, is_uploading: bool) -> PrinterStatusEnum:
+    """Maps a raw Bambu gcode_state onto our PrinterStatusEnum."""
+    if raw_status in ["IDLE", "FINISH", "FAILED"]:
+        # Grace period: If job is UPLOADING, ignore IDLE
+        return PrinterStatusEnum.PRINTING if is_uploading else PrinterStatusEnum.IDLE
+    if raw_status in ["RUNNING", "PAUSE", "PREPARE"]:
+        return PrinterStatusEnum.PRINTING
+    return old_status
+
+async def flush_telemetry(session, dirty_fields: Dict[str, Set[str]]) -> int:
+    """
+    Writes dirty cached telemetry to the DB in bulk.
+    One SELECT loads the printers together with their active jobs/orders,
+    one executemany UPDATE writes only the columns whose value actually changed.
+    Job/Order completion transitions are staged on the session; caller commits.
+    Returns the number of printer rows updated.
+    """
+    serials = list(dirty_fields.keys())
+
+    result = await session.execute(
+        select(Printer, Job, Order)
+        .outerjoin(Job, and_(
+            Job.assigned_printer_serial == Printer.serial,
+            JOB_IS_ACTIVE
+        ))
+        .outerjoin(Order, Order.id == Job.order_id)
+        .where(col(Printer.serial).in_(serials))
+    )
+
+    printers: Dict[str, Printer] = {}
+    active_jobs: Dict[str, list] = {}
+    for printer, job, order in result.all():
+        printers[printer.serial] = printer
+        if job is not None:
+            active_jobs.setdefault(printer.serial, []).append((job, order))
+
+    updates = []
+    orders_changed = False
+    for serial, printer in printers.items():
+        data = PRINTER_STATE_CACHE.get(serial, {})
+        changes = {}
+
+        for key in dirty_fields[serial]:
+            if key not in TELEMETRY_COLUMNS:
+                continue
+            column, convert = TELEMETRY_COLUMNS[key]
+            value = convert(data[key]) if convert else data[key]
+            if getattr(printer, column) != value:
+                changes[column] = value
+
+        # Status is re-evaluated whenever the printer reports anything, since it
+        # depends on job state in the DB as well as on the telemetry itself.
+        if "print_status" in data:
+            raw_status = data["print_status"]
+            old_status = printer.current_status
+            jobs = active_jobs.get(serial, [])
+            is_uploading = any(job.status == JobStatusEnum.UPLOADING for job, _ in jobs)
+            new_status = map_printer_status(raw_status, old_status, is_uploading)
+
+            # Check for Completion Transition (PRINTING -> IDLE)
+            if old_status == PrinterStatusEnum.PRINTING and new_status == PrinterStatusEnum.IDLE:
+                logger.info(f"Printer {serial} stopped printing (Status: {raw_status}). Checking for active job...")
+                printing = [(job, order) for job, order in jobs if job.status == JobStatusEnum.PRINTING]
+                if printing:
+                    active_job, order = printing[0]
+                    if raw_status == "FAILED":
+                        logger.error(f"Job {active_job.id} FAILED on printer. Updating status.")
+                        active_job.status = JobStatusEnum.FAILED
+                        active_job.error_message = "Printer reported FAILED state"
+                        order_values = {"status": OrderStatusEnum.FAILED, "error_message": "Printer reported FAILED state"}
+                        order_ids = await job_order_ids(session, active_job) if order else []
+                    else:
+                        logger.info(f"Job {active_job.id} COMPLETED. Updating status.")
+                        active_job.status = JobStatusEnum.FINISHED
+                        # Update Order(s) to DONE once all their units are printed
+                        order_values = {"status": OrderStatusEnum.DONE}
+                        order_ids = await completed_order_ids(session, active_job) if order else []
+                    session.add(active_job)
+                    if order_ids:
+                        await session.execute(
+                            update(Order).where(col(Order.id).in_(order_ids)).values(**order_values)
+                            .execution_options(synchronize_session=False)
+                        )
+                        if order and order.id in order_ids:
+                            for column, value in order_values.items():
+                                set_committed_value(order, column, value)
+                        orders_changed = True
+
+            if new_status != old_status:
+                changes["current_status"] = new_status
+
+        if changes:
+            changes["serial"] = serial
+            updates.append(changes)
+
+    if updates:
+        # ORM bulk UPDATE by primary key -> executemany, grouped by column set
+        await session.execute(update(Printer), updates)
+
+        # Bulk UPDATE bypasses the identity map; keep loaded objects in sync for the dispatch steps
+        for changes in updates:
+            printer = printers[changes["serial"]]
+            for column, value in changes.items():
+                set_committed_value(printer, column, value)
+
+    if orders_changed:
+        await notify(session, ORDER_CHANNEL)  # A print finished or failed
+    return len(updates)
+
+async def active_printer_serials(session) -> Set[str]:
+    """
+    Printers that may still owe a status transition: PRINTING in the DB or holding an
+    UPLOADING/PRINTING job. Their status is re-checked on dispatch passes even when their
+    telemetry has gone quiet (e.g. a start_print dropped while MQTT was disconnected).
+    """
+    result = await session.execute(
+        union(
+            select(Printer.serial).where(Printer.current_status == PrinterStatusEnum.PRINTING),
+            select(Job.assigned_printer_serial).where(
+                JOB_IS_ACTIVE,
+                col(Job.assigned_printer_serial).is_not(None)
+            )
+        )
+    )
+    return set(result.scalars().all())
+
+# Max bind parameters per IN (...) list (asyncpg caps a statement at 32767)
+BULK_CHUNK_SIZE = 5000
+
+def chunked(items: list, size: int = BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+async def create_jobs_from_open_orders(session) -> int:
+    """
+    Set-based STEP 1.5: turns OPEN orders into PENDING jobs.
+    One SELECT loads the orders with an "already has a job" flag; job_planner fans each
+    order out to one job per unit and merges full batches of a SKU (across orders) onto
+    its batched plate. The new jobs are bulk-inserted and order statuses bulk-updated.
+    Caller commits. Returns the number of jobs created.
+    """
+    has_job = exists().where(Job.order_id == Order.id)
+    result = await session.execute(
+        select(Order.id, Order.sku, Order.quantity, has_job.label("has_job"))
+        .where(Order.status == OrderStatusEnum.OPEN)
+        .order_by(Order.purchase_date.asc())
+        # Another dispatcher converting the same orders skips them instead of duplicating jobs
+        .with_for_update(of=Order, skip_locked=True)
+    )
+    rows = result.all()
+    if not rows:
+        return 0
+
+    products = await product_cache.get_products_by_sku(session)
+    to_plan = []
+    queued_ids = []
+    invalid_ids = []
+
+    for order_id, sku, quantity, already_has_job in rows:
+        if already_has_job:
+            # Job exists already (e.g. created by the API) -> just fix the status
+            queued_ids.append(order_id)
+        elif sku in products:
+            logger.info(f"Creating Jobs for Order {order_id} (SKU: {sku}, Quantity: {quantity})")
+            to_plan.append((order_id, sku, quantity))
+            # Mark Order as QUEUED (Waiting for printer)
+            queued_ids.append(order_id)
+        else:
+            logger.error(f"Cannot create Job for Order {order_id}: Product SKU {sku} not found. Marking as DONE (Invalid).")
+            invalid_ids.append(order_id)
+
+    created = await add_planned_jobs(session, plan_jobs(to_plan, products))
+
+    if queued_ids or invalid_ids:
+        await notify(session, ORDER_CHANNEL)  # API response caches (main.py)
+    for status, ids in ((OrderStatusEnum.QUEUED, queued_ids), (OrderStatusEnum.DONE, invalid_ids)):
+        for chunk in chunked(ids):
+            await session.execute(
+                update(Order)
+                .where(col(Order.id).in_(chunk))
+                .values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+
+    return created
+
+async def assign_pending_jobs(session) -> int:
+    """
+    STEP 2: assigns PENDING jobs (oldest first) to IDLE printers with matching material.
+    Matching goes through MATERIAL_INDEX (dict lookup per job), or through
+    solve_assignment() when DISPATCH_MODE is "optimal". Commits if anything was assigned.
+    Returns the number of jobs assigned.
+    """
+    # Find IDLE printers (only our leased ones when several dispatchers run)
+    printer_query = select(Printer).where(Printer.current_status == PrinterStatusEnum.IDLE)
+    if leases_enabled():
+        printer_query = printer_query.where(leased_by_us(datetime.now()))
+    result = await session.execute(printer_query.with_for_update(skip_locked=True))
+    idle_printers = {p.serial: p for p in result.scalars().all()}
+    if not idle_printers:
+        await session.rollback()  # Release the row locks
+        return 0
+
+    # Claim waiting Jobs (with their Order, to find SKU -> Product Requirements).
+    # Rows locked by another dispatcher are skipped; our locks hold until the commit below.
+    result = await session.execute(
+        select(Job, Order)
+        .outerjoin(Order, Order.id == Job.order_id)
+        .where(JOB_IS_PENDING)
+        .order_by(Job.created_at.asc())
+        .limit(DISPATCH_CLAIM_LIMIT)
+        .with_for_update(of=Job, skip_locked=True)
+    )
+    pending_jobs = result.all()
+    if not pending_jobs:
+        await session.rollback()
+        return 0
+
+    products = await product_cache.get_products_by_sku(session)
+    MATERIAL_INDEX.reset(list(idle_printers.values()))
+
+    assignable = []  # (job, order, product)
+    for job, order in pending_jobs:
+        if not order:
+            logger.error(f"Job {job.id} has invalid order {job.order_id}")
+            continue
+
+        # If no product found, we can't check requirements. 
+        # DECISION: Fail safe? Or unsafe? Let's assume unsafe and require product.
+        product = products.get(order.sku)
+        if not product:
+             logger.warning(f"Order {order.id} SKU {order.sku} not found in Products table. Cannot verify materials.")
+             # Skip or fail? Skipping for now.
+             continue
+
+        assignable.append((job, order, print_variant(job, product)))
+
+    optimal_matches = None
+    if DISPATCH_MODE == "optimal":
+        optimal_matches = solve_assignment(
+            [(p.required_filament_type, p.required_filament_color) for _, _, p in assignable],
+            MATERIAL_INDEX
+        )
+
+    assigned = 0
+    assigned_serials = []
+    batched_job_ids = []
+    for pos, (job, order, product) in enumerate(assignable):
+        if not MATERIAL_INDEX:
+            break
+
+        # Find a compatible printer among idle ones
+        if optimal_matches is not None:
+            match = optimal_matches.get(pos)
+        else:
+            match = MATERIAL_INDEX.find(product.required_filament_type, product.required_filament_color)
+        if match is None:
+            logger.debug(f"No compatible printer found for Job {job.id} (Req: {product.required_filament_type} {product.required_filament_color})")
+            continue
+
+        serial, matched_slot_idx = match
+        compatible_printer = idle_printers[serial]
+
+        # Assign
+        logger.info(f"Assigning Job {job.id} (Order {job.order_id}) to Printer {serial} (Slot {matched_slot_idx})")
+
+        job.assigned_printer_serial = serial
+        job.status = JobStatusEnum.UPLOADING # Prevent race condition during upload
+
+        # Update Order Status to PRINTING
+        order.status = OrderStatusEnum.PRINTING
+        session.add(order)
+        if (job.copies or 1) > 1:
+            batched_job_ids.append(job.id)
+
+        compatible_printer.current_status = PrinterStatusEnum.PRINTING
+
+        session.add(job)
+        session.add(compatible_printer)
+
+        # Remove from available pool for this loop
+        MATERIAL_INDEX.remove_printer(serial)
+        assigned_serials.append(serial)
+        assigned += 1
+
+        # COMMAND PRINTER
+        client = PRINTER_CLIENTS.get(serial)
+        if client:
+            logger.info(f"JOB {job.id}: Triggering background print task for {serial}")
+            # Pass matched slot as list [slot]
+            asyncio.create_task(execute_print_job(
+                client, job.id, job.gcode_path,
+                ams_mapping=[matched_slot_idx],
+                plate=primary_plate(product.plates),
+                file_md5=product.file_md5,
+                staged_upload=PRESTAGER.take(client, job.gcode_path, product.file_md5)
+            ))
+        else:
+            logger.error(f"JOB {job.id}: Fatal - No active client found for {serial}")
+
+    # Commit the assignments, or just release the claims
+    if batched_job_ids:
+        # The other orders on batched plates
+        await session.execute(
+            update(Order)
+            .where(col(Order.id).in_(select(JobOrder.order_id).where(col(JobOrder.job_id).in_(batched_job_ids))))
+            .values(status=OrderStatusEnum.PRINTING)
+            .execution_options(synchronize_session=False)
+        )
+    if assigned:
+        await notify_printers(session, assigned_serials)
+        await notify(session, ORDER_CHANNEL)
+        await session.commit()
+    else:
+        await session.rollback()
+    return assigned
+
+async def prestage_next_jobs(session) -> int:
+    """
+    STEP 3: predicts the next job of each printer within PRESTAGE_LEAD_TIME minutes
+    of finishing and lets PRESTAGER upload its 3MF in the background.
+    Returns the number of printers with a predicted job.
+    """
+    if PRESTAGE_LEAD_TIME <= 0:
+        return 0
+
+    # Skip printers whose current job is still uploading (remaining_time is from the last print)
+    uploading = exists().where(and_(
+        Job.assigned_printer_serial == Printer.serial,
+        Job.status == JobStatusEnum.UPLOADING
+    ))
+    busy_query = select(Printer).where(
+        Printer.current_status == PrinterStatusEnum.PRINTING,
+        Printer.remaining_time > 0,
+        Printer.remaining_time <= PRESTAGE_LEAD_TIME,
+        ~uploading
+    )
+    if leases_enabled():
+        busy_query = busy_query.where(leased_by_us(datetime.now()))
+    result = await session.execute(busy_query)
+    busy_printers = result.scalars().all()
+
+    predictions = {}
+    if busy_printers:
+        result = await session.execute(
+            select(Job, Order.sku)
+            .join(Order, Order.id == Job.order_id)
+            .where(JOB_IS_PENDING)
+            .order_by(Job.created_at.asc())
+            .limit(PRESTAGE_QUEUE_WINDOW)
+        )
+        products = await product_cache.get_products_by_sku(session)
+        pending = [(job, print_variant(job, products[sku])) for job, sku in result.all() if sku in products]
+        predictions = predict_next_jobs(busy_printers, pending)
+
+    # Also discards staging for printers that are no longer about to finish
+    PRESTAGER.apply(predictions, PRINTER_CLIENTS)
+    return len(predictions)
 
 async def sync_loop():
     """
-    Background task that runs every 5 seconds.
-    1. Syncs cached state to DB.
-    2. Assigns PENDING jobs to IDLE printers.
+    Event-driven background task.
+    1. Syncs dirty cached state to DB (every TELEMETRY_FLUSH_INTERVAL).
+    2. Creates Jobs and assigns PENDING jobs to IDLE printers whenever
+       request_dispatch() fires, or at least every DISPATCH_SAFETY_INTERVAL.
+    3. On the same passes, pre-stages the predicted next jobs of busy printers.
+    With PRINTER_LEASE_TTL set, renews this dispatcher's printer leases every TTL/3
+    and only flushes and dispatches the printers it holds (see leases.py).
     """
     logger.info("Starting Sync Loop...")
+    loop = asyncio.get_running_loop()
+    last_dispatch = 0.0
+    last_lease = float("-inf")
+
     while True:
+        try:
+            await asyncio.wait_for(DISPATCH_EVENT.wait(), timeout=TELEMETRY_FLUSH_INTERVAL)
+            await asyncio.sleep(DISPATCH_DEBOUNCE)
+        except asyncio.TimeoutError:
+            pass
+
+        dispatch_due = DISPATCH_EVENT.is_set() or (loop.time() - last_dispatch) >= DISPATCH_SAFETY_INTERVAL
+        DISPATCH_EVENT.clear()
+
+        if leases_enabled() and loop.time() - last_lease >= PRINTER_LEASE_TTL / 3:
+            last_lease = loop.time()
+            try:
+                async with async_session_maker() as session:
+                    owned = await renew_leases(session)
+                acquired = owned - OWNED_PRINTERS
+                OWNED_PRINTERS.clear()
+                OWNED_PRINTERS.update(owned)
+                if acquired:
+                    # Our cached view of newly leased printers may be ahead of what the previous owner wrote
+                    TELEMETRY.restore_dirty({s: set(PRINTER_STATE_CACHE.get(s, {})) for s in acquired})
+                    dispatch_due = True
+            except Exception as e:
+                logger.error(f"Lease renewal failed: {e}", exc_info=True)
+
+        if not dispatch_due and not DIRTY_FIELDS:
+            continue  # Nothing changed -> no DB round-trips
+
+        # Everything that changed since the last tick, one write per field
+        dirty_fields = TELEMETRY.take_dirty()
+        if leases_enabled():
+            # Printers leased elsewhere are written by their owner
+            dirty_fields = {s: f for s, f in dirty_fields.items() if s in OWNED_PRINTERS}
+
         # logger.debug("Sync Loop Tick...")
         try:
             async with async_session_maker() as session:
                 # --- STEP 1: Sync Cache to DB ---
-                if PRINTER_STATE_CACHE:
-                    # We iterate over a copy of keys to avoid modification issues if needed, 
-                    # though python dict keys iteration is usually safe if we don't add keys.
-                    for serial, data in PRINTER_STATE_CACHE.items():
-                        printer = await session.get(Printer, serial)
-                        if printer:
-                            data_changed = False
-                            
-                            # Update fields if present in data
-                            if "print_status" in data:
-                                # Map 'print_status' string to Enum if possible
-                                # Assuming data["print_status"] matches raw strings like "IDLE", "RUNNING"
-                                # We might need normalization. 
-                                # For now, direct assignment if it matches Enum, else fallback or ignore?
-                                # Let's assume the raw string is close enough or use a mapper.
-                                # Simple mapping:
-                                raw_status = data["print_status"]
-                                old_status = printer.current_status
-                                new_status = printer.current_status # default
-
-                                # Check for active job to protect UPLOADING state
-                                active_job_q = await session.execute(
-                                    select(Job).where(
-                                        Job.assigned_printer_serial == printer.serial,
-                                        col(Job.status).in_([JobStatusEnum.PRINTING, JobStatusEnum.UPLOADING])
-                                    )
-                                )
-                                active_job_for_update = active_job_q.scalars().first()
-
-                                if raw_status in ["IDLE", "FINISH", "FAILED"]:
-                                    # Grace period: If job is UPLOADING, ignore IDLE
-                                    if active_job_for_update and active_job_for_update.status == JobStatusEnum.UPLOADING:
-                                        new_status = PrinterStatusEnum.PRINTING
-                                    else:
-                                        new_status = PrinterStatusEnum.IDLE
-                                elif raw_status in ["RUNNING", "PAUSE", "PREPARE"]:
-                                    new_status = PrinterStatusEnum.PRINTING
-                                
-                                # Check for Completion Transition (PRINTING -> IDLE)
-                                if old_status == PrinterStatusEnum.PRINTING and new_status == PrinterStatusEnum.IDLE:
-                                    logger.info(f"Printer {printer.serial} stopped printing (Status: {raw_status}). Checking for active job...")
-                                    active_job_result = await session.execute(
-                                        select(Job).where(
-                                            Job.assigned_printer_serial == printer.serial,
-                                            Job.status == JobStatusEnum.PRINTING
-                                        )
-                                    )
-                                    active_job = active_job_result.scalars().first()
-                                    
-                                    if active_job:
-                                        if raw_status == "FAILED":
-                                             logger.error(f"Job {active_job.id} FAILED on printer. Updating status.")
-                                             active_job.status = JobStatusEnum.FAILED
-                                             active_job.error_message = "Printer reported FAILED state"
-                                             session.add(active_job)
-                                             
-                                             order = await session.get(Order, active_job.order_id)
-                                             if order:
-                                                 order.status = OrderStatusEnum.FAILED
-                                                 order.error_message = "Printer reported FAILED state"
-                                                 session.add(order)
-                                        else:
-                                            logger.info(f"Job {active_job.id} COMPLETED. Updating status.")
-                                            active_job.status = JobStatusEnum.FINISHED
-                                            session.add(active_job)
-                                            
-                                            # Update Order to DONE
-                                            order = await session.get(Order, active_job.order_id)
-                                            if order:
-                                                order.status = OrderStatusEnum.DONE
-                                                session.add(order)
-                                
-                                if new_status != old_status:
-                                    printer.current_status = new_status
-                                    data_changed = True
-
-                            if "nozzle_temper" in data:
-                                printer.current_temp_nozzle = float(data["nozzle_temper"])
-                                data_changed = True
-                            
-                            if "bed_temper" in data:
-                                printer.current_temp_bed = float(data["bed_temper"])
-                                data_changed = True
-                            
-                            if "ams_data" in data:
-                                printer.ams_data = data["ams_data"]
-                                data_changed = True
-                            
-                            if "progress" in data:
-                                printer.current_progress = int(data["progress"])
-                                data_changed = True
-                            
-                            if "remaining_time" in data:
-                                printer.remaining_time = int(data["remaining_time"])
-                                data_changed = True
-                            
-                            if data_changed:
-                                session.add(printer)
-                    
+                flush_fields = dirty_fields
+                if dispatch_due:
+                    # Quiet printers with active jobs get their status re-evaluated too
+                    recheck = {s for s in await active_printer_serials(session) if s in PRINTER_STATE_CACHE}
+                    if leases_enabled():
+                        recheck &= OWNED_PRINTERS
+                    flush_fields = {**{s: set() for s in recheck}, **dirty_fields}
+                if flush_fields:
+                    if await flush_telemetry(session, flush_fields):
+                        await notify_printers(session, flush_fields.keys())  # Dashboard streams (main.py)
                     await session.commit()
                 
-                # --- STEP 1.5: Create Jobs from OPEN Orders ---
-                # Check for OPEN orders that need processing
-                result = await session.execute(
-                    select(Order)
-                    .where(Order.status == OrderStatusEnum.OPEN)
-                    .order_by(Order.purchase_date.asc())
-                )
-                open_orders = result.scalars().all()
-                
-                for order in open_orders:
-                    # Check if Job already exists (redundancy check)
-                    # Ideally we update Order status to avoid this, but let's be safe
-                    existing_job = await session.execute(select(Job).where(Job.order_id == order.id))
-                    if existing_job.scalars().first():
-                         # Just update status if needed
-                         if order.status == OrderStatusEnum.OPEN:
-                             order.status = OrderStatusEnum.QUEUED
-                             session.add(order)
-                         continue
-                         
-                    # Find Product
-                    product_result = await session.execute(select(Product).where(Product.sku == order.sku))
-                    product = product_result.scalars().first()
-                    
-                    if product:
-                        logger.info(f"Creating Job for Order {order.id} (SKU: {order.sku})")
-                        new_job = Job(
-                            order_id=order.id,
-                            gcode_path=product.file_path_3mf,
-                            status=JobStatusEnum.PENDING,
-                            created_at=datetime.now()
-                        )
-                        session.add(new_job)
-                        
-                        # Mark Order as QUEUED (Waiting for printer)
-                        order.status = OrderStatusEnum.QUEUED
-                        session.add(order)
-                    else:
-                        logger.error(f"Cannot create Job for Order {order.id}: Product SKU {order.sku} not found. Marking as DONE (Invalid).")
-                        order.status = OrderStatusEnum.DONE
-                        session.add(order)
+                if dispatch_due:
+                    last_dispatch = loop.time()
 
-                
-                await session.commit()
+                    # --- STEP 1.5: Create Jobs from OPEN Orders ---
+                    await create_jobs_from_open_orders(session)
+                    await session.commit()
 
-                # --- STEP 2: Job Matching ---
-                # Find IDLE printers
-                result = await session.execute(
-                    select(Printer).where(Printer.current_status == PrinterStatusEnum.IDLE)
-                )
-                idle_printers = result.scalars().all()
-                
-                if idle_printers:
-                    # Check for waiting Jobs
-                    result = await session.execute(
-                        select(Job)
-                        .where(Job.status == JobStatusEnum.PENDING)
-                        .order_by(Job.created_at.asc())
-                    )
-                    pending_jobs = result.scalars().all()
-                    
-                    for job in pending_jobs:
-                        if not idle_printers:
-                            break
-                        
-                        # Get Order to find SKU -> Product Requirements
-                        order = await session.get(Order, job.order_id)
-                        if not order:
-                            logger.error(f"Job {job.id} has invalid order {job.order_id}")
-                            continue
-
-                        # Find Product by SKU
-                        result = await session.execute(select(Product).where(Product.sku == order.sku))
-                        product = result.scalars().first()
-                        
-                        # Find a compatible printer among idle ones
-                        compatible_printer = None
-                        matched_slot_idx = None
-                        
-                        # If no product found, we can't check requirements. 
-                        # DECISION: Fail safe? Or unsafe? Let's assume unsafe and require product.
-                        if not product:
-                             logger.warning(f"Order {order.id} SKU {order.sku} not found in Products table. Cannot verify materials.")
-                             # Skip or fail? Skipping for now.
-                             continue
-
-                        for p in idle_printers:
-                            slot = check_material_match(p, product)
-                            if slot is not None:
-                                compatible_printer = p
-                                matched_slot_idx = slot
-                                break
-                        
-                        if compatible_printer and matched_slot_idx is not None:
-                            # Assign
-                            logger.info(f"Assigning Job {job.id} (Order {job.order_id}) to Printer {compatible_printer.serial} (Slot {matched_slot_idx})")
-                            
-                            job.assigned_printer_serial = compatible_printer.serial
-                            job.status = JobStatusEnum.UPLOADING # Prevent race condition during upload
-                            
-                            # Update Order Status to PRINTING
-                            order.status = OrderStatusEnum.PRINTING
-                            session.add(order)
+                    # --- STEP 2: Job Matching ---
+                    await assign_pending_jobs(session)
 
-                            compatible_printer.current_status = PrinterStatusEnum.PRINTING
-                            
-                            session.add(job)
-                            session.add(compatible_printer)
-                            
-                            # Remove from available pool for this loop
-                            idle_printers.remove(compatible_printer)
-                            
-                            # COMMAND PRINTER
-                            client = PRINTER_CLIENTS.get(compatible_printer.serial)
-                            if client:
-                                logger.info(f"JOB {job.id}: Triggering background print task for {compatible_printer.serial}")
-                                # Pass matched slot as list [slot]
-                                asyncio.create_task(execute_print_job(client, job.id, job.gcode_path, ams_mapping=[matched_slot_idx]))
-                            else:
-                                logger.error(f"JOB {job.id}: Fatal - No active client found for {compatible_printer.serial}")
-                        else:
-                            logger.debug(f"No compatible printer found for Job {job.id} (Req: {product.required_filament_type} {product.required_filament_color})")
-
-                    if pending_jobs:
-                        await session.commit()
+                    # --- STEP 3: Pre-stage the next jobs of printers about to finish ---
+                    await prestage_next_jobs(session)
 
         except Exception as e:
             logger.error(f"Error in sync_loop: {e}", exc_info=True)
-        
-        await asyncio.sleep(5)
+            # Retry the flush on the next tick
+            TELEMETRY.restore_dirty(dirty_fields)
 
 def check_material_match(printer: Printer, product: Product) -> int:
     """
@@ -407,10 +713,8 @@ def check_material_match(printer: Printer, product: Product) -> int:
         
         # 3. Color Check 
         if req_color:
-            if not slot_color:
-                continue
-            # Simple exact match (case insensitive)
-            if req_color.lower() != slot_color.lower():
+            # Exact match (case insensitive), or within COLOR_TOLERANCE_DE
+            if not colors_match(req_color, slot_color):
                 continue
 
         # Match Found! Return the slot index.
@@ -422,6 +726,9 @@ def check_material_match(printer: Printer, product: Product) -> int:
 async def main():
     logger.info("Initializing Worker Service...")
     
+    # MQTT in WORKER_SHARDS child processes (telemetry arrives here as deltas), or in this loop
+    supervisor = ShardSupervisor(WORKER_SHARDS, handle_mqtt_update) if WORKER_SHARDS > 0 else None
+
     # 1. Load Printers from DB
     clients = []
     async with async_session_maker() as session:
@@ -435,6 +742,12 @@ async def main():
             if p.ip_address and p.access_code:
                 logger.info(f"Starting client for {p.name} ({p.serial}) at {p.ip_address}")
                 
+                if supervisor:
+                    client = ShardedPrinterClient(p.ip_address, p.access_code, p.serial, supervisor)
+                    clients.append(client)
+                    PRINTER_CLIENTS[p.serial] = client
+                    continue
+
                 # Create callback with bound serial
                 def callback(data, serial=p.serial):
                     handle_mqtt_update(serial, data)
@@ -455,8 +768,14 @@ async def main():
                 # Register in Global Dict
                 PRINTER_CLIENTS[p.serial] = client
     
-    # 2. Start Sync Loop
+    if supervisor:
+        await supervisor.start([(c.serial, c.ip, c.access_code) for c in clients])
+
+    # 2. Start Sync Loop (+ wake-ups from the API process via Postgres NOTIFY)
     asyncio.create_task(sync_loop())
+    asyncio.create_task(listen(DISPATCH_CHANNEL, lambda payload: request_dispatch(f"notify {payload}")))
+    # Product changes made through the API invalidate our SKU cache
+    asyncio.create_task(listen(PRODUCT_CHANNEL, product_cache.invalidate))
     
     # 3. Keep Alive
     logger.info("Worker Service Running. Press Ctrl+C to stop.")
@@ -467,8 +786,17 @@ async def main():
         pass
     finally:
         logger.info("Shutting down...")
+        PRESTAGER.cancel_all()
+        if leases_enabled():
+            try:
+                async with async_session_maker() as session:
+                    await release_leases(session)
+            except Exception as e:
+                logger.warning(f"Could not release printer leases: {e}")
         for c in clients:
             c.stop()
+        if supervisor:
+            await supervisor.stop()
 
 if __name__ == "__main__":
     if sys.platform == 'win32':